@@ -3,9 +3,18 @@ import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button
 from tkinter import Tk     
 from tkinter.filedialog import askopenfilenames, askopenfilename, asksaveasfilename
-import csv
 import os
-from BCJ_Basic_v2 import BCJ
+import time
+from calibratinator import BlitRenderer, DecimatedLines, PreviewUpdates, SlotCompute, UpdateScheduler
+from calibratinator.checkpoint import read_checkpoint
+from calibratinator.constants import ConstantsStore
+from calibratinator.export import export_curves, formats as export_formats
+from calibratinator.parallel import exclude_main
+from calibratinator.profiling import Profiler
+from calibratinator.props import BCJ_NAMES, BCJ_PROPS, complete_props, read_props, write_props
+from calibratinator.session import BCJSession
+
+exclude_main()      # worker processes (fits, Update_Process) must not re-run this script
 
 """
  Daniel Kenney
@@ -28,10 +37,42 @@ from BCJ_Basic_v2 import BCJ
 # ---------- User Modifiable Variables -----------
 # ------------------------------------------------
 incnum      = 200
+BCJ_Tol     = None   # e.g. 1e-3: adaptive strain steps with this local error tolerance
+                     # (calibratinator/bcj.py port only); None = fixed incnum increments
 istate      = 1      #1 = tension, 2 = torsion
 Ask_Files   = True
 Material    = "4340"
 Plot_ISVs   = True
+Use_BCJ_Basic = False           # False: the calibratinator/bcj.py port, first checked against
+                                # BCJ_Basic_v2.py on these tests (which is used instead, with a
+                                # warning, if they differ); True: always BCJ_Basic_v2.py
+Use_BCJ_Terms = True            # port: keep per-set factors like C01*exp(-C02/T) between updates
+Async_Update= True              # evaluate slider changes on a background thread
+Update_Process= False          # ...in a worker process writing curves into shared memory (not with BCJ_Tol)
+Preview_Factor= 4               # while a slider moves: incnum/4 increments (1 = always full resolution)
+Preview_Idle= 0.3               # s without slider changes before full-resolution curves replace the preview
+Batch_Sets  = True              # integrate all sets in lockstep, state as (sets, 6) arrays
+Cache_Size  = 512               # BCJ results kept in memory (per set, per slider state)
+Cache_Dir   = None              # e.g. '.bcj_cache' to keep results between sessions
+Cache_Data  = True              # keep parsed Data_*.csv columns in <file>.npy sidecars
+Use_Blit    = True              # repaint only model lines/slider handles on updates
+Decimate_Data = True            # plot a per-pixel min/max subset of large data sets
+Export_Fields = ('E', 'VM', 'S', 'alph', 'kap', 'tot')  # Export Curves: strain, VM, component, alpha, kappa, total
+Profile     = False             # time each update phase (per set), show compute/draw ms on the figure
+Profile_Trace = None            # e.g. 'bcj_trace.json': Chrome trace of the session, written on close
+Session_File= None              # e.g. 'bcj_session.ckpt': reopen it if it exists (no dialogs, csv parsing
+                                # or BCJ runs), save the session to it on close
+
+Props_Query = None              # e.g. 'BCJ/4340/DK': constants from data/plasticityconstants.json
+                                # (model/material/author/year parts) instead of a props file
+Store_Author= None              # e.g. 'KD': Save Props and Fit also append the set to the json
+                                # store as BCJ/<variant>/<author>/<material>
+
+Fit_popsize = 15                # differential evolution population per free constant
+Fit_maxgen  = 300               # maximum generations
+Fit_workers = None              # worker processes (None = all cores)
+Fit_polish  = not Use_BCJ_Basic # then Levenberg-Marquardt from the best, gradients from
+                                # forward sensitivities of calibratinator/bcj.py
 
 
 Scale_MPa   = 1000000           # Unit conversion from MPa to Pa from data
@@ -51,13 +92,6 @@ if istate == 2:
 
 # -------- Holding Variable Declarations --------
 incnum1     = incnum +1                          # +1 so that 100 increments between 0 and 1 are 0.01
-SF          = np.zeros((6,incnum1)   , float)    # Total stress state
-S           = np.zeros((  incnum1)   , float)    # Stress in relevant direction
-SVM         = np.zeros((  incnum1)   , float)    # VM Stress
-EF          = np.zeros((6,incnum1)   , float)    # Total stress state
-E           = np.zeros((  incnum1)   , float)    # Stress in relevant direction
-Al          = np.zeros((  incnum1)   , float)    # Alphpa in relevant direction
-ratio       = np.zeros((  incnum1)   , float)    # Alphpa in relevant direction
 
 
 # ------------ Plot Formatting ------------
@@ -177,6 +211,7 @@ posC[20]    = [Left_2, 0.08, Left_3-Left_2, 0.03]
 posreset    = [0.50, 0.03, 0.1, 0.08]
 possave     = [0.65, 0.03, 0.1, 0.08]
 posexport   = [0.80, 0.03, 0.1, 0.08]
+posfit      = [0.38, 0.01, 0.1, 0.05]
 
 
 # ------------------------------------------------
@@ -188,10 +223,16 @@ posexport   = [0.80, 0.03, 0.1, 0.08]
 # ------------------------------------------------
 # Read in Props and Data files from .csv files
 # ------------------------------------------------
-if Ask_Files == True:
+saved = None
+if Session_File and os.path.exists(Session_File):
+    saved = read_checkpoint(Session_File)   # data and cached BCJ runs memory-mapped, nothing parsed
+    propsfile, flz = saved.meta['propsfile'], saved.meta['datafiles']
+    print('Session resumed from: ', Session_File)
+elif Ask_Files == True:
     Tk().withdraw()
-    propsfile = askopenfilename(title = 'Select the props file for this material')
-    print('Props file read in  : ', propsfile)
+    if not Props_Query:
+        propsfile = askopenfilename(title = 'Select the props file for this material')
+        print('Props file read in  : ', propsfile)
     filez = askopenfilenames(title='Select all experimental data sets')
     flz = list(filez)
     print('Data file(s) read in: ', flz)
@@ -204,7 +245,7 @@ else:
                 'path/to/4340 Data/Data_Tension_e0002_T295.csv',
                 'path/to/4340 Data/Data_Tension_e570_T295.csv',
                 'path/to/4340 Data/Data_Tension_e604_T500.csv',
-                'path/to/4340 Data/Data_Tension_e650_T730.csv
+                'path/to/4340 Data/Data_Tension_e650_T730.csv'
                ]
     elif Material == "A36":     # Not actual data - only used for comparing
         propsfile = 'path/to/A36 Data/Props_BCJ_A36.csv'
@@ -213,34 +254,20 @@ else:
         ]
 # ------------------------------------------------
 # Assign props values:
-with open(propsfile,'r') as pfile:
-    csvreader = csv.reader(pfile)
-    for row in csvreader:
-        if   row[0] == 'C01':  C_0[1] = float(row[1])
-        elif row[0] == 'C02':  C_0[2] = float(row[1])
-        elif row[0] == 'C03':  C_0[3] = float(row[1])
-        elif row[0] == 'C04':  C_0[4] = float(row[1])
-        elif row[0] == 'C05':  C_0[5] = float(row[1])
-        elif row[0] == 'C06':  C_0[6] = float(row[1])
-        elif row[0] == 'C07':  C_0[7] = float(row[1])
-        elif row[0] == 'C08':  C_0[8] = float(row[1])
-        elif row[0] == 'C09':  C_0[9] = float(row[1])
-        elif row[0] == 'C10':  C_0[10] = float(row[1])
-        elif row[0] == 'C11':  C_0[11] = float(row[1])
-        elif row[0] == 'C12':  C_0[12] = float(row[1])
-        elif row[0] == 'C13':  C_0[13] = float(row[1])
-        elif row[0] == 'C14':  C_0[14] = float(row[1])
-        elif row[0] == 'C15':  C_0[15] = float(row[1])
-        elif row[0] == 'C16':  C_0[16] = float(row[1])
-        elif row[0] == 'C17':  C_0[17] = float(row[1])
-        elif row[0] == 'C18':  C_0[18] = float(row[1])
-        elif row[0] == 'C19':  C_0[19] = float(row[1])
-        elif row[0] == 'C20':  C_0[20] = float(row[1])
-        elif row[0] == 'Bulk Mod':  bulk_mod = float(row[1])
-        elif row[0] == 'Shear Mod':  shear_mod = float(row[1])
-        elif row[0] == 'Comment': Com = row[1]
-        else: print('WARNING: extra/incorrect row in props file: ', row)
-    # props = [A, B ,n ,C ,m , Tr, Tm, er0, Com]
+if Props_Query:
+    store       = ConstantsStore()
+    entry       = store.lookup(Props_Query)
+    Com, props0 = store.get(Props_Query)
+    props0      = complete_props(props0, BCJ_PROPS, Props_Query)  # C19, C20 = 0 if absent
+    C_0[1:]     = [props0[name] for name in BCJ_NAMES]
+    bulk_mod, shear_mod = props0['Bulk Mod'], props0['Shear Mod']
+    Material    = entry['material']
+    propsfile   = os.path.join(os.path.dirname(flz[0]), 'Props_BCJ_' + Material + '.csv')  # save dialogs start here
+    print('Props from constants store: ', entry['path'], '(', Com, ')')
+else:
+    Com, props0 = (saved.meta['Com'], saved.meta['props']) if saved else read_props(propsfile, BCJ_PROPS)
+    C_0[1:]     = [props0[name] for name in BCJ_NAMES]
+    bulk_mod, shear_mod = props0['Bulk Mod'], props0['Shear Mod']
 
 #assign params:
 # params = Parameters()
@@ -291,95 +318,44 @@ params = {
     'bulk_mod' : bulk_mod,
     'shear_mod': shear_mod
 }
+if saved:
+    params.update(saved.meta['values'])     # slider values when the session was saved
 # ------------------------------------------------
-# Store stress-strain data and corresponding test conditions (temp and strain rate)
-sets = len(flz)
-# test_cond   = []         # Used to store testing conditions (temp, strain rate)
-# test_data   = []         # Used to store data
-test_cond   = {
-    'StrainRate':[],
-    'Temp': [],
-    'Name': []
-}
+# Tests, model runs and errors live in a GUI-free session (calibratinator/session.py).
+# Data columns are parsed in one pass and cached in a binary sidecar next to each
+# csv; model results are cached per (params, conditions), so reset, slider
+# back-and-forth and reopened props hit the cache.
+settings    = dict(incnum=incnum, istate=istate, tol=BCJ_Tol, scale=Scale_MPa, cache_size=Cache_Size,
+                   cache_dir=Cache_Dir, basic=Use_BCJ_Basic, terms=Use_BCJ_Terms,
+                   batch=Batch_Sets, preview=Preview_Factor)
+if saved:
+    session = BCJSession.load(saved, **settings)
+else:
+    session = BCJSession(params, flz, cache=Cache_Data, **settings)
+prof        = session.prof = Profiler(enabled=Profile)     # no-op unless Profile
+sets        = session.sets
+# FORMATTING: test_cond is a record array, test_cond['Temp'][i] etc.; test_data['Data_*'][i]
+# are views of one flat buffer per quantity, test_data['Model_*'][i] row views of the
+# current BCJCurves slot (all updated in place, nothing is copied per set)
+test_cond   = session.tests.cond
 test_data   = {
-    'Data_E':[],
-    'Data_S':[],
-    'Model_E':[],
-    'Model_S':[],
-    'Model_VM':[],
-    'Model_alph':[],
-    'Model_kap':[],
-    'Model_tot':[]
+    'Data_E': session.e_data,
+    'Data_S': session.s_data
 }
 
-# FORMATTING: test_data[i][[e_data,s_data] , [e_model,s_model] , [e_err, s_err]]
-
-for i, file in enumerate(flz):
-    with open(file,'r') as csvfile:
-        csvreader = csv.DictReader(csvfile)
-
-        #add stress/strain data:
-        strn = []
-        strs = []
-        er   = []
-        T    = []
-        name = []
-        j = 0
-        for col in csvreader:
-            strn.append(float(col['Strain']))
-            strs.append(float(col['Stress'])*Scale_MPa)
-            if j < 1:
-                er.append(float(col['Strain Rate']))
-                T.append(float(col['Temperature']))
-                name.append(col['Name'])
-                j += 1
-        #check data entered
-        if len(strn) != len(strs):
-            print('ERROR!! data from  \'', file , '\'  has bad stress-strain data lengths')
-
-        #store the stress-strain data
-        test_cond['StrainRate'].append(float(er[0]))
-        test_cond['Temp'].append(float(T[0]))
-        test_cond['Name'].append(name[0])
-        test_data['Data_E'].append(strn)
-        test_data['Data_S'].append(strs)
-
-
-
-# -----------------------------------------------
+def use_curves(c):
+    test_data['Model_E']    = c.rows('E')
+    test_data['Model_S']    = c.rows('S')
+    test_data['Model_alph'] = c.rows('alph')
+    test_data['Model_kap']  = c.rows('kap')
+    test_data['Model_tot']  = c.rows('tot')
+    test_data['Model_VM']   = c.rows('VM')
 
-
-
-
-# -----------------------------------------------------
-# Calculate the model's initial stress-strain curve
-# -----------------------------------------------------
-
-# FORMATTING: test_data[i][[e_data,s_data] , [e_model,s_model] , [e_err, s_err]]
-# For each set, calculate the model curve and error
-for i in range(sets):
-    emax = max(test_data['Data_E'][i])
-    # print('Setup: emax for set ',i,' = ', emax)
-    [EF, SF, alph, kap,tot] = BCJ(params, test_cond['Temp'][i], test_cond['StrainRate'][i],
-                            emax, incnum, istate)
-
-    #pull only the relevant (tension/torsion) strain being evaluated:
-    for j in range(len(EF[kS])):
-        E[j]    = EF[kS][j]
-        S[j]    = SF[kS][j]
-        SVM[j]  = (SF[0][j] - SF[1][j])**2 + (SF[1][j] - SF[2][j])**2 + (SF[2][j] - SF[0][j])**2 \
-                 + (SF[3][j]**2 + SF[4][j]**2 + SF[5][j]**2)*6.
-        SVM[j]  = np.sqrt(SVM[j]*0.5)
-        Al[j]   = alph[kS][j]
-        # ratio = tot[j] / SVM[j]
-        # print('ratio:', ratio )
-    # test_data[i][1] = [E,S,Al,kap,tot,SVM]             #Store model stress/strain data
-    test_data['Model_E'].append(E.copy())
-    test_data['Model_S'].append(S.copy())
-    test_data['Model_alph'].append(Al.copy())
-    test_data['Model_kap'].append(kap.copy())
-    test_data['Model_tot'].append(tot.copy())
-    test_data['Model_VM'].append(SVM.copy())
+# curves are written into triple-buffered slots (shared memory with Update_Process):
+# the update worker never writes the slot being drawn, so nothing is copied
+outputs     = SlotCompute(session, process=Update_Process and BCJ_Tol is None)
+curves      = outputs.read(outputs((params, False)))
+use_curves(curves)
 
 # print(test_data['Model_E'])
 # print(test_data['Model_S'])
@@ -427,6 +403,26 @@ ax.set_xlim(left=0.0)
 fig.subplots_adjust(bottom=plot_bot , top = plot_top,
                     left = plot_left, right = plot_right)
 
+# Draw only a view-dependent subset of each data set (recomputed on zoom);
+# test_data keeps the full arrays for the fit
+if saved:
+    ax.set_xlim(saved.meta['xlim'])
+    ax.set_ylim(saved.meta['ylim'])
+
+if Decimate_Data:
+    data_lod = DecimatedLines(ax, lines[0], test_data['Data_E'], test_data['Data_S'])
+
+# Live model-vs-data VM error per set (MPa), refreshed on every update.  The
+# interpolation to the data strains is rebuilt only if the model grids change
+# (BCJ_Tol), otherwise each update's error is one operator application.
+err_text    = ax.text(0.98, 0.02, '', transform=ax.transAxes, ha='right', va='bottom',
+                      family='monospace', fontsize='small', bbox=dict(fc='w', alpha=0.7, lw=0))
+def show_errors():
+    rms, emax = session.errors(curves)
+    err_text.set_text('\n'.join('%s  RMSE %7.2f  max %7.2f' % (test_cond['Name'][i], rms[i], emax[i])
+                                for i in range(sets)))
+show_errors()
+
 
 
 
@@ -441,9 +437,11 @@ for i in range(1,nsliders):
         # valmax  = C_0[i] + C_amp[i],
         valmin  = 0.0,
         # valmax  = max(2.0*C_0[i],1.),
-        valmax  = 5.0*C_0[i] ,
+        valmax  = 5.0*C_0[i] or 1.0,   # constants filled in as 0 still get a range
         valinit = C_0[i]
         )
+    if saved:   # sliders keep their props-based range and reset value
+        Slider_C[i].set_val(params['C%02d' % i])
 
 # ------------------------------------------------
 # Add textboxes for clarity
@@ -474,33 +472,62 @@ def update(val):
         num='C'+num
         params[num] = Slider_C[g].val
 
-    for i in range(sets):
-        emax = max(test_data['Data_E'][i])
-        # print('Updat: emax for set ',i,' = ', emax)
-
-        [EF, SF, alph, kap, tot] = BCJ(params, test_cond['Temp'][i], test_cond['StrainRate'][i],
-                                emax, incnum, istate)
-
-        #take only the relevant (tension/torsion) strain being evaluated:
-        for j in range(len(EF[kS])):
-            E[j] = EF[kS][j]
-            S[j] = SF[kS][j]
-            # SVM[j]  = SF[0][j]**2 + SF[1][j]**2 + SF[2][j]**2
-            # SVM[j]  = np.sqrt(SVM[j])
-
-            SVM[j]  = (SF[0][j] - SF[1][j])**2 + (SF[1][j] - SF[2][j])**2 + (SF[2][j]-SF[0][j])**2 \
-                + (SF[3][j]**2 + SF[4][j]**2 + SF[5][j]**2)*6.
-            SVM[j]  = np.sqrt(SVM[j]/2.)
-            Al[j]   = alph[kS][j]
-
-        lines[1][i].set_ydata(SVM)
-        if Plot_ISVs:
-            lines[2][i].set_ydata(Al)
-            lines[3][i].set_ydata(kap)
-            # lines[4][i].set_ydata(tot)
-            # lines[5][i].set_ydata(S)
-
-    fig.canvas.draw_idle()
+    preview.submit(dict(params))      # coarse now, full resolution once the slider rests
+    prof.counter('queue', depth=scheduler.depth)
+
+# Runs on the worker thread: only the newest slider state is evaluated
+def compute(state, cancelled):
+    p, coarse = state
+    with prof.span('compute', preview=coarse):
+        return outputs((p, coarse), cancelled)
+
+# Runs on the GUI thread once fresh curves are ready
+def redraw(result):
+    global curves
+    c = outputs.read(result)
+    if c is None: return    # a newer slot was published meanwhile
+    curves = c
+    use_curves(curves)
+
+    # strain grids may differ per set and per update (BCJ_Tol), so set x and y
+    with prof.span('set_data'):
+        for i in range(sets):
+            E = test_data['Model_E'][i]
+            lines[1][i].set_data(E, test_data['Model_VM'][i])
+            if Plot_ISVs:
+                lines[2][i].set_data(E, test_data['Model_alph'][i])
+                lines[3][i].set_data(E, test_data['Model_kap'][i])
+                # lines[4][i].set_data(E, test_data['Model_tot'][i])
+                # lines[5][i].set_data(E, test_data['Model_S'][i])
+
+    with prof.span('errors'):
+        show_errors()
+    if Profile:     # draw time is the previous frame's; skipped = slider states coalesced into this one
+        prof_text.set_text('compute %6.1f ms | draw %5.1f ms | skipped %d'
+                           % (prof.ms('compute'), prof.ms('draw'), max(scheduler.depth - 1, 0)))
+
+# Runs on the GUI thread after new curves or slider moves: one blitted frame for both
+def draw():
+    with prof.span('draw'):
+        renderer.update()
+
+# Update latency readout (Profile = True), trace file on close (Profile_Trace)
+prof_text = fig.text(0.995, 0.995, '', ha='right', va='top', family='monospace', fontsize='small')
+if Profile_Trace:
+    fig.canvas.mpl_connect('close_event', lambda event: print('Trace written to: ', prof.dump(Profile_Trace)))
+
+# Only the model lines and the sliders change between frames; the scheduler draws after each change
+renderer  = BlitRenderer(fig, sum(lines[1:], []) + [err_text, prof_text], enabled=Use_Blit)
+renderer.watch(Slider_C[1:], repaint=False)
+
+scheduler = UpdateScheduler(compute, redraw, threaded=Async_Update, draw=draw)
+if Async_Update:
+    scheduler.attach(fig)
+    fig.canvas.mpl_connect('close_event', lambda event: scheduler.close())
+fig.canvas.mpl_connect('close_event', lambda event: outputs.close())
+preview   = PreviewUpdates(scheduler, fig, Preview_Idle, enabled=Preview_Factor > 1)
+if not outputs.process:     # with Update_Process the cache lives in the worker
+    fig.canvas.mpl_connect('close_event', lambda event: print('BCJ cache: ', session.cache.stats()))
 
 # register the update function with each slider
 # for s in range(1,nsliders):
@@ -526,6 +553,14 @@ Slider_C[18].on_changed(update)
 Slider_C[19].on_changed(update)
 Slider_C[20].on_changed(update)
 
+# Save the session (tests, props, slider values, curves, cached runs, view) on close
+def save_session():
+    session.save(Session_File, dict(params), Com=Com, props=props0, propsfile=propsfile,
+                 datafiles=list(flz), xlim=list(ax.get_xlim()), ylim=list(ax.get_ylim()))
+    print('Session saved to : ', Session_File)
+if Session_File:
+    fig.canvas.mpl_connect('close_event', lambda event: save_session())
+
 
 # ------------------------------------------------
 # Add buttons
@@ -540,6 +575,9 @@ buttonsav = Button(saveax, 'Save Props', hovercolor='0.975')
 exportax = fig.add_axes(posexport)
 buttonexport = Button(exportax, 'Export Curves', hovercolor='0.975')
 
+fitax = fig.add_axes(posfit)
+buttonfit = Button(fitax, 'Fit', hovercolor='0.975')
+
 
 #reset the plot to the original props parameters
 def reset(event):
@@ -554,60 +592,79 @@ def saveprops(event):
     newpropsfile = asksaveasfilename(filetypes = [('.csv','.csv')],title = 'Save new props file',
                                      initialdir = pdir, initialfile = pname)
 
-    with open(newpropsfile, 'w',newline = '') as pfile:
-        writer = csv.writer(pfile)
-        writer.writerows(
-            [['Comment',Com],
-            ['C01',Slider_C[1].val],
-            ['C02',Slider_C[2].val],
-            ['C03',Slider_C[3].val],
-            ['C04',Slider_C[4].val],
-            ['C05',Slider_C[5].val],
-            ['C06',Slider_C[6].val],
-            ['C07',Slider_C[7].val],
-            ['C08',Slider_C[8].val],
-            ['C09',Slider_C[9].val],
-            ['C10',Slider_C[10].val],
-            ['C11',Slider_C[11].val],
-            ['C12',Slider_C[12].val],
-            ['C13',Slider_C[13].val],
-            ['C14',Slider_C[14].val],
-            ['C15',Slider_C[15].val],
-            ['C16',Slider_C[16].val],
-            ['C17',Slider_C[17].val],
-            ['C18',Slider_C[18].val],
-            ['C19',Slider_C[19].val],
-            ['C20',Slider_C[20].val],
-            ['Bulk Mod',bulk_mod],
-            ['Shear Mod',shear_mod]
-            ]
-        )
+    props = {name: Slider_C[i].val for i, name in enumerate(BCJ_NAMES, start=1)}
+    props.update({'Bulk Mod': bulk_mod, 'Shear Mod': shear_mod})
+    write_props(newpropsfile, Com, props, BCJ_PROPS)
     print('New props file written to : ', newpropsfile)
+    store_props(props)
 buttonsav.on_clicked(saveprops)
 
+#append a calibrated set to data/plasticityconstants.json (as a journal line, see calibratinator/constants.py)
+def store_props(props):
+    if not Store_Author: return
+    variant = entry['variant'] if Props_Query else 'BCJMetal'
+    path = 'BCJ/%s/%s/%s' % (variant, Store_Author, Material)
+    ConstantsStore().add(path, props, {'authors': Store_Author, 'year': time.strftime('%Y')})
+    print('Props appended to constants store as : ', path)
+
+#global fit of C01-C20 over all data sets, bounded by the slider ranges; it runs off
+#the GUI thread (Async_Update) and the sliders move once it is done
+def run_fit(state, cancelled):
+    params0, lo, hi = state
+    return session.fit(params0, lo, hi,
+                       popsize=Fit_popsize, maxgen=Fit_maxgen, workers=Fit_workers,
+                       polish=Fit_polish,
+                       callback=lambda gen, p, c: print('Fit generation', gen, ' error:', c))
+
+def show_fit(result):
+    params_fit, cost = result
+    print('Fit error: ', cost)
+
+    # move all sliders first, then redraw once
+    for i, name in enumerate(BCJ_NAMES, start=1):
+        Slider_C[i].eventson = False
+        Slider_C[i].set_val(params_fit[name])
+        Slider_C[i].eventson = True
+    update(None)
+    preview.refine()
+
+    Tk().withdraw()
+    pdir, pname = os.path.split(propsfile)
+    newpropsfile = asksaveasfilename(filetypes = [('.csv','.csv')],title = 'Save fitted props file',
+                                     initialdir = pdir, initialfile = pname)
+    if newpropsfile:
+        props = {name: params_fit[name] for name in BCJ_NAMES}
+        props.update({'Bulk Mod': bulk_mod, 'Shear Mod': shear_mod})
+        write_props(newpropsfile, Com, props, BCJ_PROPS)
+        print('Fitted props file written to : ', newpropsfile)
+        store_props(props)
+
+fitter = UpdateScheduler(run_fit, show_fit, threaded=Async_Update)
+if Async_Update:
+    fitter.attach(fig, interval=100)
+    fig.canvas.mpl_connect('close_event', lambda event: fitter.close())
+
+def fitprops(event):
+    print('Fitting ...')
+    fitter.submit((dict(params),
+                   [Slider_C[i].valmin for i in range(1,nsliders)],
+                   [Slider_C[i].valmax for i in range(1,nsliders)]))
+buttonfit.on_clicked(fitprops)
+
 #Export the model curves for plotting/comparing in other programs
 def exportcurves(event):
     Tk().withdraw()
     pdir, pname = os.path.split(propsfile)
-    newcurvefile = asksaveasfilename(filetypes = [('.csv','.csv')],title = 'Save Model Curves As',
+    newcurvefile = asksaveasfilename(filetypes = [(ext, ext) for ext in export_formats()],
+                                     title = 'Save Model Curves As', defaultextension = '.csv',
                                      initialdir = pdir, initialfile = 'Model_Curves.csv')
+    if not newcurvefile: return
+    preview.refine()        # export the full-resolution curves, not a drag preview
+    scheduler.wait()
 
-    with open(newcurvefile, 'w',newline = '') as pfile:
-        writer = csv.writer(pfile)
-        # for each data set write the data and the model
-        header = []
-        for i in range(sets):
-            header.append('strain-'+test_cond['Name'][i])
-            header.append('VMstress-'+test_cond['Name'][i])
-        writer.writerow(header)
-
-        for j in range(len(test_data['Model_E'][i])):       #only works because each line has same number of increments!
-            nextline = []
-            for i in range(sets):
-                nextline.append(test_data['Model_E'][i][j])
-                nextline.append(test_data['Model_VM'][i][j])
-            writer.writerow(nextline)
-
+    # every set, each with its own number of points; written a block of points at a time
+    export_curves(newcurvefile, test_cond['Name'], curves, Export_Fields,
+                  {'S': 'S11' if istate == 1 else 'S12'})
     print('Model curves written to : ', newcurvefile)
 buttonexport.on_clicked(exportcurves)
 
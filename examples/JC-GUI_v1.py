@@ -7,6 +7,16 @@ from tkinter.filedialog import askopenfilename
 from tkinter.filedialog import asksaveasfilename
 import csv
 import os
+import time
+from calibratinator import BlitRenderer, DecimatedLines, PreviewUpdates, SlotCompute, UpdateScheduler
+from calibratinator.checkpoint import read_checkpoint
+from calibratinator.constants import ConstantsStore
+from calibratinator.parallel import exclude_main
+from calibratinator.profiling import Profiler
+from calibratinator.props import JC_NAMES, JC_PROPS, read_props
+from calibratinator.session import JCSession
+
+exclude_main()      # worker processes (fits, Update_Process) must not re-run this script
 
 """
  Daniel Kenney
@@ -15,13 +25,14 @@ import os
 - User editable variable 
 - plotting parameters and layouts
 
-- define JC-stress function
+- JC-stress kernels live in calibratinator/jc.py
 
 - read in props and data files
     - store initial parameters
 
 - setup sliders and update plotting
 - setup save and reset buttons
+- setup fit button (least-squares over all data sets)
 """
 
 # ----------------------------------------
@@ -32,6 +43,25 @@ de          = 0.01                              # strain increment
 Ask_Files   = True
 colors      = ['b','c','g','y','r','m','k']
 colors      = colors + colors
+Fit_starts  = 8                                 # number of multi-start fits (first = current sliders)
+Fit_workers = None                              # worker processes for the fit (None = all cores)
+Async_Update= True                              # evaluate slider changes on a background thread
+Update_Process= False                          # ...in a worker process writing curves into shared memory
+Preview_Factor= 4                               # while a slider moves: strain increment de*4 (1 = always full resolution)
+Preview_Idle= 0.3                               # s without slider changes before full-resolution curves replace the preview
+Cache_Data  = True                              # keep parsed Data_*.csv columns in <file>.npy sidecars
+Use_Blit    = True                              # repaint only model lines/slider handles on updates
+Decimate_Data = True                            # plot a per-pixel min/max subset of large data sets
+Profile     = False                             # time each update phase, show compute/draw ms on the figure
+Profile_Trace = None                            # e.g. 'jc_trace.json': Chrome trace of the session, written on close
+Session_File= None                              # e.g. 'jc_session.ckpt': reopen it if it exists (no dialogs or
+                                                # csv parsing), save the session to it on close
+
+# Constants from data/plasticityconstants.json instead of a props file:
+Props_Query = None                              # e.g. 'JC/4340' (model/material/author/year parts)
+Query_Ref   = {'Tr': 295.0, 'Tm': 1793.0, 'er0': 1.0}   # reference values the json lacks
+Store_Author= None                              # e.g. 'KD': Save Props also appends the set to
+                                                # the json store as JC/<material>, by this author
 
 # Manually set props/data paths: 
 Autofile_props  = 'path/to/Data_4340_JC/Props_4340_2.csv'
@@ -63,6 +93,7 @@ if plotlayout == 1:          #sliders on left side
     posm    = [0.05, 0.5, 0.35, 0.03]
     posreset= [0.10, 0.3, 0.1, 0.05]
     possave = [0.25, 0.3, 0.1, 0.05]
+    posfit  = [0.10, 0.2, 0.1, 0.05]
 else:                       #default to sliders below plot
     plot_bot = 0.5
     plot_left = 0.1
@@ -73,31 +104,28 @@ else:                       #default to sliders below plot
     posm    = [0.1, 0.1, 0.8, 0.03]
     posreset= [0.6, 0.025, 0.15, 0.04]
     possave = [0.8, 0.025, 0.15, 0.04]
+    posfit  = [0.4, 0.025, 0.15, 0.04]
 
 # ------------------------------------------------
 # ------------------------------------------------
 # ------------------------------------------------
 # ------------------------------------------------
 
-# JC stress function
-def stress_JC(eps, epsr, T, A, B, n, C, m):
-    # Using Tr, Tm, and er0
-    estar = epsr / er0
-    Tstar = (T-Tr)/(Tm-Tr)
-    s = (A+B*eps**(n))*(1+C*np.log(estar))*(1-Tstar**(m))
-    return s
-
-# ------------------------------------------------
-
 
 
 # ------------------------------------------------
 # Read in Props and Data files from .csv files
 # ------------------------------------------------
-if Ask_Files == True:
+saved = None
+if Session_File and os.path.exists(Session_File):
+    saved = read_checkpoint(Session_File)   # data memory-mapped, nothing parsed
+    propsfile, flz = saved.meta['propsfile'], saved.meta['datafiles']
+    print('Session resumed from: ', Session_File)
+elif Ask_Files == True:
     Tk().withdraw()
-    propsfile = askopenfilename(title = 'Select the props file for this material')
-    print('Props file read in  : ', propsfile)
+    if not Props_Query:
+        propsfile = askopenfilename(title = 'Select the props file for this material')
+        print('Props file read in  : ', propsfile)
     filez = askopenfilenames(title='Select all experimental data sets')
 
     flz = list(filez)
@@ -108,88 +136,40 @@ else:
 
 # ------------------------------------------------
 # Assign props values:
-with open(propsfile,'r') as pfile:
-    csvreader = csv.reader(pfile)
-    for row in csvreader:
-        if row[0]   == 'Tr': Tr = float(row[1])     # Does not change!
-        elif row[0] == 'Tm': Tm = float(row[1])     # Does not change!
-        elif row[0] == 'er0':er0= float(row[1])     # Does not change!
-        elif row[0] == 'A':  A0 = float(row[1])
-        elif row[0] == 'B':  B0 = float(row[1])
-        elif row[0] == 'n':  n0 = float(row[1])
-        elif row[0] == 'C':  C0 = float(row[1])
-        elif row[0] == 'm':  m0 = float(row[1])
-        elif row[0] == 'Comment': Com = row[1]
-        else: print('WARNING: extra/incorrect row in props file.')
-    # props = [A, B ,n ,C ,m , Tr, Tm, er0, Com]
+if Props_Query:
+    store       = ConstantsStore()
+    entry       = store.lookup(Props_Query)
+    Com, props0 = store.get(Props_Query)
+    props0      = dict(Query_Ref, **props0)
+    Tr, Tm, er0 = props0['Tr'], props0['Tm'], props0['er0']
+    A0, B0, n0, C0, m0 = (props0[name] for name in JC_NAMES)
+    propsfile   = os.path.join(os.path.dirname(flz[0]), 'Props_JC_' + entry['material'] + '.csv')  # for the session file
+    print('Props from constants store: ', entry['path'], '(', Com, ')')
+else:
+    Com, props0 = (saved.meta['Com'], saved.meta['props']) if saved else read_props(propsfile, JC_PROPS)
+    Tr, Tm, er0 = props0['Tr'], props0['Tm'], props0['er0']     # Do not change!
+    A0, B0, n0, C0, m0 = (props0[name] for name in JC_NAMES)
 
 
 
 # ------------------------------------------------
-# Store stress-strain data and corresponding test conditions (temp and strain rate)
-sets = len(flz)
-test_cond   = []         # Used to store testing conditions (temp, strain rate)
-test_data   = []         # Used to store data
-
-# FORMATTING: test_data[i][[e_data,s_data] , [e_model,s_model] , [e_err, s_err]]
-
-for i, file in enumerate(flz):
-    with open(file,'r') as csvfile:
-        csvreader = csv.DictReader(csvfile)
-
-        #add stress/strain data:
-        strn = []
-        strs = []
-        er   = []
-        T    = []
-        name = []
-        j = 0
-        for col in csvreader:
-            strn.append(float(col['Strain']))
-            strs.append(float(col['Stress']))
-            if j < 1:
-                er.append(float(col['Strain Rate']))
-                T.append(float(col['Temperature']))
-                name.append(col['Name'])
-                j += 1
-        #check data entered
-        if len(strn) != len(strs):
-            print('ERROR!! data from  \'', file , '\'  has bad stress-strain data lengths')
-
-        #store the stress-strain data
-        test_cond.append([float(er[0]),float(T[0]),name[0]])
-        test_data.append([[strn,strs],[],[]])
-# -----------------------------------------------
-
-
-
-
-# -----------------------------------------------------
-# Calculate the model's initial stress-strain curve
-# -----------------------------------------------------
-
-# FORMATTING: test_data[i][[e_data,s_data] , [e_model,s_model] , [e_err, s_err]]
-# For each set, calculate the model curve and error
-for i in range(sets):
-    emax = max(test_data[i][0][0])
-    e = np.linspace(0,emax,int(emax/de))
-    s = np.zeros_like(e)
-    e_data = test_data[i][0][0]
-    s_data = test_data[i][0][1]
-    s_err  = np.zeros_like(s_data)
-    # Calcualte the model stress-strai data
-    for j in range(len(e)):
-        s[j] = stress_JC(e[j], test_cond[i][0], test_cond[i][1] ,
-                         A0, B0, n0, C0, m0)
-
-    test_data[i][1] = [e,s]             #Store model stress/strain data
-
-    # Calculate the error between model and data
-    for j in range(len(e_data)):
-        s_model  = np.interp(e_data[j],e,s)  #get the corresponding model stress for the given strain
-        s_err[j] = s_data[j] - s_model
-
-    test_data[i][2] = [e_data,s_err]    #Store error 
+# Tests, model and errors live in a GUI-free session (calibratinator/session.py).
+# Data columns are parsed in one pass and cached in a binary sidecar next to
+# each csv (reused while the file is unchanged).
+# Model strain grids are fixed per set, so they sit in one flat buffer and every
+# model curve is a single broadcast call; JCTerms keeps the strain, rate and
+# thermal terms and only recomputes those whose constants moved.  The
+# interpolation from the grids to the data strains is built once, so the error
+# of any model curve is one operator application (the live error readout).
+if saved:
+    session = JCSession.load(saved, de=de, preview=Preview_Factor)
+    values  = [saved.meta['values'][name] for name in JC_NAMES]    # slider values when saved
+else:
+    session = JCSession(props0, flz, de, cache=Cache_Data, preview=Preview_Factor)
+    values  = [A0, B0, n0, C0, m0]
+sets        = session.sets
+model_e     = session.grids
+model_s     = session.saved_model(values) or session.model(*values)    # resumed: the saved curves
 
 
 
@@ -205,8 +185,8 @@ fig, ax = plt.subplots()
 # lines[1] = model (to be updated)
 lines = [[],[]]
 for i in range(sets):
-    lobj1, = ax.plot(test_data[i][0][0], test_data[i][0][1], 'o', color = colors[i])  #, label='Data - '+test_cond[i][2])
-    lobj2, = ax.plot(test_data[i][1][0], test_data[i][1][1], color = colors[i] , label='Model - '+test_cond[i][2])
+    lobj1, = ax.plot(session.e_data[i], session.s_data[i], 'o', color = colors[i])  #, label='Data - '+session.names[i])
+    lobj2, = ax.plot(model_e[i], model_s[i], color = colors[i] , label='Model - '+session.names[i])
     lines[0].append(lobj1)
     lines[1].append(lobj2)
 
@@ -215,8 +195,25 @@ ax.set_ylabel('True Stress (MPa)')
 ax.legend()
 ax.set_ylim(bottom = 0.0)
 ax.set_xlim(left=0.0)
+if saved:
+    ax.set_xlim(saved.meta['xlim'])
+    ax.set_ylim(saved.meta['ylim'])
 fig.subplots_adjust(bottom=plot_bot ,left = plot_left)
 
+# Live model-vs-data error per set (MPa), refreshed on every update
+err_text = ax.text(0.98, 0.02, '', transform=ax.transAxes, ha='right', va='bottom',
+                   family='monospace', fontsize='small', bbox=dict(fc='w', alpha=0.7, lw=0))
+def show_errors(s, coarse=False):
+    rms, emax = session.errors(s, coarse)
+    err_text.set_text('\n'.join('%s  RMSE %7.2f  max %7.2f' % (session.names[i], rms[i], emax[i])
+                                for i in range(sets)))
+show_errors(model_s)
+
+# Draw only a view-dependent subset of each data set (recomputed on zoom);
+# the session keeps the full arrays for the error and the fit
+if Decimate_Data:
+    data_lod = DecimatedLines(ax, lines[0], session.e_data, session.s_data)
+
 
 
 
@@ -264,23 +261,65 @@ m_slider = Slider(
     valmax= m0 + m_amp,
     valinit= m0,
 )
+if saved:   # sliders keep their props-based range and reset value
+    for sl, val in zip([A_slider, B_slider, n_slider, C_slider, m_slider], values):
+        sl.set_val(val)
 
 # ------------------------------------------------
 # Slider values to update plot automatically
 
 # The function to be called anytime a slider's value changes
 def update(val):
-    for i in range(sets):
-        er = test_cond[i][0]
-        T  = test_cond[i][1]
-        em = test_data[i][1][0]
-        s = np.zeros_like(em)
-        for j, e in enumerate(em):
-            # print('individual strain val: ',test_data[i][1][0][j])
-            s[j] = stress_JC(e, er ,T , A_slider.val, B_slider.val,
-                             n_slider.val,C_slider.val,m_slider.val)
-        lines[1][i].set_ydata(s)
-    fig.canvas.draw_idle()
+    # coarse now, full resolution once the slider rests
+    preview.submit((A_slider.val, B_slider.val, n_slider.val, C_slider.val, m_slider.val))
+    prof.counter('queue', depth=scheduler.depth)
+
+# Runs on the worker thread: only the newest slider state is evaluated
+def compute(state, cancelled):
+    with prof.span('compute', preview=state[1]):
+        return outputs(state, cancelled)
+
+# Runs on the GUI thread once fresh curves are ready
+def redraw(result):
+    out = outputs.read(result)
+    if out is None: return  # a newer slot was published meanwhile
+    coarse  = result[1]
+    grids   = session.resolution(coarse)[0]
+    s       = grids.split(out)
+    with prof.span('set_data'):
+        for i in range(sets):
+            lines[1][i].set_data(grids[i], s[i])
+    with prof.span('errors'):
+        show_errors(s, coarse)
+    if Profile:     # draw time is the previous frame's; skipped = slider states coalesced into this one
+        prof_text.set_text('compute %6.2f ms | draw %5.1f ms | skipped %d'
+                           % (prof.ms('compute'), prof.ms('draw'), max(scheduler.depth - 1, 0)))
+
+# Runs on the GUI thread after new curves or slider moves: one blitted frame for both
+def draw():
+    with prof.span('draw'):
+        renderer.update()
+
+# Update latency readout (Profile = True), trace file on close (Profile_Trace)
+prof      = Profiler(enabled=Profile)
+prof_text = fig.text(0.995, 0.995, '', ha='right', va='top', family='monospace', fontsize='small')
+if Profile_Trace:
+    fig.canvas.mpl_connect('close_event', lambda event: print('Trace written to: ', prof.dump(Profile_Trace)))
+
+# Only the model lines and the sliders change between frames; the scheduler draws after each change
+renderer  = BlitRenderer(fig, lines[1] + [err_text, prof_text], enabled=Use_Blit)
+renderer.watch([A_slider, B_slider, n_slider, C_slider, m_slider], repaint=False)
+
+# model stress is written into triple-buffered slots (shared memory with Update_Process):
+# the update worker never writes the slot being drawn, so nothing is copied
+outputs   = SlotCompute(session, process=Update_Process)
+fig.canvas.mpl_connect('close_event', lambda event: outputs.close())
+
+scheduler = UpdateScheduler(compute, redraw, threaded=Async_Update, draw=draw)
+if Async_Update:
+    scheduler.attach(fig)
+    fig.canvas.mpl_connect('close_event', lambda event: scheduler.close())
+preview   = PreviewUpdates(scheduler, fig, Preview_Idle, enabled=Preview_Factor > 1)
 
 # register the update function with each slider
 A_slider.on_changed(update)
@@ -289,12 +328,21 @@ n_slider.on_changed(update)
 C_slider.on_changed(update)
 m_slider.on_changed(update)
 
+# Save the session (tests, props, slider values, curves, view) on close
+def save_session():
+    values = dict(zip(JC_NAMES, (sl.val for sl in [A_slider, B_slider, n_slider, C_slider, m_slider])))
+    session.save(Session_File, values, Com=Com, propsfile=propsfile, datafiles=list(flz),
+                 xlim=list(ax.get_xlim()), ylim=list(ax.get_ylim()))
+    print('Session saved to : ', Session_File)
+if Session_File:
+    fig.canvas.mpl_connect('close_event', lambda event: save_session())
+
 
 # Create a `matplotlib.widgets.Button` to reset the sliders to initial values.
 
 
 # ------------------------------------------------
-# Add buttons for 'reset' and 'save props'
+# Add buttons for 'reset', 'save props' and 'fit'
 # ------------------------------------------------
 resetax = fig.add_axes(posreset)
 buttonres = Button(resetax, 'Reset', hovercolor='0.975')
@@ -302,6 +350,9 @@ buttonres = Button(resetax, 'Reset', hovercolor='0.975')
 saveax = fig.add_axes(possave)
 buttonsav = Button(saveax, 'Save Props', hovercolor='0.975')
 
+fitax = fig.add_axes(posfit)
+buttonfit = Button(fitax, 'Fit', hovercolor='0.975')
+
 #reset the plot to the original props parameters
 def reset(event):
     A_slider.reset()
@@ -330,6 +381,41 @@ def saveprops(event):
             ['er0',er0]]
         )
     print('New props file written to : ', newpropsfile)
+    if Store_Author:
+        material = entry['material'] if Props_Query else os.path.basename(newpropsfile)[:-4]
+        material = material[len('Props_JC_'):] if material.startswith('Props_JC_') else material
+        path = 'JC/%s' % material                   # author in the bibtex: the store has no JC author level
+        ConstantsStore().add(path, dict(zip(JC_NAMES, (A_slider.val, B_slider.val, n_slider.val,
+                                                       C_slider.val, m_slider.val)), Tr=Tr, Tm=Tm, er0=er0),
+                             {'authors': Store_Author, 'year': time.strftime('%Y')})
+        print('Props appended to constants store as : ', path)
 buttonsav.on_clicked(saveprops)
 
+#least-squares fit of A, B, n, C, m over all data sets, bounded by the slider ranges;
+#it runs off the GUI thread (Async_Update) and the sliders move once it is done
+fit_sliders = [A_slider, B_slider, n_slider, C_slider, m_slider]
+def run_fit(state, cancelled):
+    p0, lo, hi = state
+    return session.fit(p0, lo, hi, starts=Fit_starts, workers=Fit_workers)
+
+def show_fit(result):
+    p, rms, results = result
+    print('Fit RMS error: ', rms)
+    for name, sl, val in zip(JC_NAMES, fit_sliders, p):
+        print('   ', name, '=', val)
+        sl.set_val(val)
+    preview.refine()
+
+fitter = UpdateScheduler(run_fit, show_fit, threaded=Async_Update)
+if Async_Update:
+    fitter.attach(fig, interval=100)
+    fig.canvas.mpl_connect('close_event', lambda event: fitter.close())
+
+def fitprops(event):
+    print('Fitting ...')
+    fitter.submit(([sl.val    for sl in fit_sliders],
+                   [sl.valmin for sl in fit_sliders],
+                   [sl.valmax for sl in fit_sliders]))
+buttonfit.on_clicked(fitprops)
+
 plt.show()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+ Shared, GUI-free helpers for the Python calibration tools
+ --------------------------------
+- ragged      : flat storage for sets of different lengths
+- jc          : Johnson-Cook stress kernels
+- bcj         : BCJ metal strain-control driver (one test, or all sets in lockstep),
+                forward sensitivities d(curves)/d(constants)
+- terms       : model terms recomputed only when their own constants change
+- postprocess : BCJ von Mises / component extraction into preallocated buffers
+- fit         : automatic calibration (least squares for JC, differential evolution and
+                sensitivity-based least squares for BCJ)
+- props       : props .csv read/write, plasticityconstants.json entries
+- constants   : indexed, lazily loaded plasticityconstants.json with append-only writes
+- data        : Data_*.csv tests in (compact TestSets), model curve .csv out
+- export      : chunked model curve export (.csv, .npz, optional .h5/.parquet), ragged sets
+- parallel    : worker pools for independent evaluations
+- shared      : triple-buffered shared-memory model outputs for worker processes
+- cache       : memoized BCJ results (LRU + optional on-disk tier)
+- scheduler   : latest-state-wins background evaluation of slider updates,
+                coarse previews while a slider moves
+- residuals   : precomputed model-grid -> data-strain interpolation for errors
+- render      : blitted redraws of the model lines only
+- decimate    : per-pixel min/max subsets of large data series for display
+- profiling   : update-phase timing spans and Chrome trace export
+- batch       : headless runs/fits over many materials (python -m calibratinator.batch)
+- sweep       : error surfaces over grid/Latin-hypercube samples of constants (python -m calibratinator.sweep)
+- session     : GUI-free JC/BCJ calibration sessions (data, model, errors, fit)
+- checkpoint  : one-file session checkpoints, memory-mapped on reopening
+- bench       : kernel and GUI-path benchmarks with JSON output (python -m calibratinator.bench)
+
+None of these import tkinter or matplotlib, and the names below are loaded
+from their submodule on first use, so `import calibratinator` is cheap and a
+worker that only evaluates the JC kernels never loads the BCJ or fit code.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'RaggedSets'        : 'ragged',
+    'TermCache'         : 'terms',
+    'JCTerms'           : 'jc',
+    'stress_JC'         : 'jc',
+    'stress_JC_sets'    : 'jc',
+    'stress_JC_jac'     : 'jc',
+    'BCJ'               : 'bcj',
+    'BCJ_sets'          : 'bcj',
+    'BCJ_jac'           : 'bcj',
+    'BCJ_jac_sets'      : 'bcj',
+    'BCJTerms'          : 'bcj',
+    'bcj_factors'       : 'bcj',
+    'run_sets'          : 'bcj',
+    'select_driver'     : 'bcj',
+    'von_mises'         : 'postprocess',
+    'von_mises_jac'     : 'postprocess',
+    'BCJCurves'         : 'postprocess',
+    'worker_pool'       : 'parallel',
+    'SharedSlots'       : 'shared',
+    'SlotCompute'       : 'shared',
+    'ConstantsStore'    : 'constants',
+    'read_props'        : 'props',
+    'write_props'       : 'props',
+    'read_constants'    : 'props',
+    'complete_props'    : 'props',
+    'export_curves'     : 'export',
+    'read_data'         : 'data',
+    'read_tests'        : 'data',
+    'TestSets'          : 'data',
+    'write_curves'      : 'data',
+    'fit_JC'            : 'fit',
+    'fit_BCJ'           : 'fit',
+    'fit_BCJ_lm'        : 'fit',
+    'UpdateScheduler'   : 'scheduler',
+    'PreviewUpdates'    : 'scheduler',
+    'InterpOperator'    : 'residuals',
+    'BlitRenderer'      : 'render',
+    'DecimatedLines'    : 'decimate',
+    'minmax_indices'    : 'decimate',
+    'Profiler'          : 'profiling',
+    'ResultCache'       : 'cache',
+    'cached_BCJ'        : 'cache',
+    'content_key'       : 'cache',
+    'JCSession'         : 'session',
+    'BCJSession'        : 'session',
+    'read_checkpoint'   : 'checkpoint',
+    'write_checkpoint'  : 'checkpoint',
+}
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    # names are imported from their submodule on first use (PEP 562)
+    if name not in _EXPORTS:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
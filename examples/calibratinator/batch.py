@@ -0,0 +1,223 @@
+"""
+ Headless batch calibration
+ --------------------------------
+- run_material : evaluate (and optionally fit) one material from its constants
+                 and Data_*.csv files; writes the props and model curves
+- run_batch    : many materials at once across a worker pool
+- main         : command line, see `python -m calibratinator.batch -h`
+
+Only numpy and the calibratinator modules are imported here (no tkinter, no
+matplotlib), so batches run on compute nodes and in scheduled jobs.
+
+Examples (from the examples/ directory):
+    python -m calibratinator.batch BCJ -m ../data/plasticityconstants.json:BCJ/4340/DK "4340/Data_*.csv"
+    python -m calibratinator.batch JC --const Tr=295 --const Tm=1793 --const er0=1 --fit \\
+        -m ../data/plasticityconstants.json:JC/4340 "4340/Data_*.csv"
+    python -m calibratinator.batch BCJ --fit --dir materials/ -o fitted/
+with one sub-directory per material holding a Props_*.csv and its Data_*.csv.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from .bcj import run_sets, select_driver
+from .data import read_tests
+from .export import CURVE_FIELDS, FORMATS, export_curves
+from .fit import fit_BCJ, fit_JC
+from .jc import JCTerms
+from .parallel import worker_pool
+from .postprocess import BCJCurves
+from .props import BCJ_NAMES, BCJ_PROPS, JC_NAMES, JC_PROPS, load_constants, write_props
+from .ragged import RaggedSets
+
+
+SCALE       = {'JC': 1., 'BCJ': 1e6}                # data stress (MPa) to model units
+JC_AMP      = (300.0, 400.0, 1.0, 0.1, 0.5)         # fit bounds: JC-GUI slider ranges
+BCJ_SPAN    = 5.0                                   #             BCJ-GUI sliders, [0, 5*C]
+
+
+def _rms(E, S, e_data, s_data):
+    err = np.concatenate([s - np.interp(e, Em, Sm)
+                          for Em, Sm, e, s in zip(E, S, e_data, s_data)])
+    return np.sqrt(err @ err/err.size)
+
+
+def _run_JC(props, e_data, s_data, er, T, fit, de, starts, workers):
+    p0      = [props[name] for name in JC_NAMES]
+    if fit:
+        lo      = [p - a for p, a in zip(p0, JC_AMP)]
+        hi      = [p + a for p, a in zip(p0, JC_AMP)]
+        p0, _, _ = fit_JC(e_data, s_data, er, T, p0, lo, hi, props['Tr'], props['Tm'],
+                          props['er0'], starts=starts, workers=workers)
+        props   = dict(props, **dict(zip(JC_NAMES, p0)))
+    E       = RaggedSets([np.linspace(0, e.max(), max(int(e.max()/de), 2)) for e in e_data])
+    S       = JCTerms(E, er, T, props['Tr'], props['Tm'], props['er0'])(*p0)
+    return props, list(E), S
+
+
+def _run_BCJ(props, e_data, s_data, er, T, fit, incnum, istate, tol, popsize, maxgen, workers,
+             basic, terms):
+    BCJ     = select_driver(T, er, basic, terms, props, [e.max() for e in e_data], incnum, istate, tol)
+    if fit:
+        lo      = [0.]*len(BCJ_NAMES)
+        hi      = [BCJ_SPAN*props[name] for name in BCJ_NAMES]
+        props, _ = fit_BCJ(BCJ, e_data, s_data, T, er, props, lo, hi, incnum, istate,
+                           popsize=popsize, maxgen=maxgen, workers=workers)
+    curves  = BCJCurves(len(T), incnum + 1, kS=0 if istate == 1 else 3)
+    runs    = run_sets(BCJ, props, T, er, [e.max() for e in e_data], incnum, istate, tol=tol)
+    for i, run in enumerate(runs):
+        curves.store(i, *run)
+    curves.finish()
+    return props, curves
+
+
+def run_material(model, source, datafiles, outdir, name=None, fit=False, consts=None,
+                 de=0.01, incnum=200, istate=1, tol=None, basic=False, terms=False,
+                 starts=8, popsize=15, maxgen=300, workers=1, curves_format='.csv'):
+    """Model one material and write `Props_<model>_<name>.csv` (fitted constants
+    if `fit`) and `Model_Curves_<name>.<curves_format>` to `outdir`.
+
+    model       : 'JC' or 'BCJ'
+    source      : props .csv, or a constants store query 'plasticityconstants.json:BCJ/4340/DK'
+    datafiles   : the material's Data_*.csv files
+    consts      : extra/overriding constants, e.g. {'Tr': 295.} for JSON JC entries
+    basic, terms : BCJ driver, see bcj.select_driver
+    workers     : worker processes for the fit
+    curves_format : '.csv', '.npz', '.h5' or '.parquet' (see export.export_curves);
+                  BCJ curves carry every CURVE_FIELDS field, JC strain and stress
+
+    Returns a summary dict (name, sets, rms error in MPa, seconds, output paths).
+    """
+    t0          = time.perf_counter()
+    comment, props = load_constants(source, JC_PROPS if model == 'JC' else BCJ_PROPS)
+    props.update(consts or {})
+    if name is None:
+        path, sep, query = source.rpartition(':')
+        if sep and path.endswith('.json'):
+            name = query.strip('/').replace('/', '_')
+        else:
+            name = os.path.splitext(os.path.basename(source))[0]
+            name = name[len('Props_'):] if name.startswith('Props_') else name
+    if not datafiles:
+        raise ValueError('%s: no data files' % name)
+    tests       = read_tests(sorted(datafiles), SCALE[model])
+    e_data, s_data, er, T, names = tests.E, tests.S, tests.rate, tests.T, tests.names
+
+    if model == 'JC':
+        props, E, S = _run_JC(props, e_data, s_data, er, T, fit, de, starts, workers)
+        prop_names  = JC_PROPS
+        curves      = {'E': E, 'VM': S}
+        fields      = ('E', 'VM')
+    else:
+        props, curves = _run_BCJ(props, e_data, s_data, er, T, fit, incnum, istate, tol,
+                                 popsize, maxgen, workers, basic, terms)
+        prop_names  = BCJ_PROPS
+        E, S        = curves.rows('E'), curves.rows('VM')
+        fields      = tuple(CURVE_FIELDS)
+
+    os.makedirs(outdir, exist_ok=True)
+    propsfile   = os.path.join(outdir, 'Props_%s_%s.csv' % (model, name))
+    curvefile   = os.path.join(outdir, 'Model_Curves_%s%s' % (name, curves_format))
+    write_props(propsfile, comment, props, [k for k in prop_names if k in props])
+    export_curves(curvefile, names, curves, fields, {'S': 'S11' if istate == 1 else 'S12'},
+                  scale=SCALE[model])
+    return dict(name=name, sets=len(tests), rms=_rms(E, S, e_data, s_data)/SCALE[model],
+                seconds=time.perf_counter() - t0, props=propsfile, curves=curvefile)
+
+
+def _run_job(job):
+    args, kwargs = job
+    try:
+        return run_material(*args, **kwargs)
+    except Exception as err:                        # report, keep the rest of the batch going
+        return dict(name=kwargs.get('name') or args[1], error='%s: %s' % (type(err).__name__, err))
+
+
+def run_batch(model, materials, outdir, workers=None, **kwargs):
+    """Run `run_material` for each `(name, source, datafiles)` in `materials`,
+    up to `workers` materials at a time; yields each summary as it finishes,
+    in input order.  Remaining keyword arguments go to `run_material`; the
+    cores are shared between materials unless `kwargs['workers']` is given."""
+    workers = workers or min(len(materials), os.cpu_count() or 1)
+    kwargs.setdefault('workers', max(1, (os.cpu_count() or 1)//workers))
+    jobs    = [((model, source, datafiles, outdir), dict(kwargs, name=name))
+               for name, source, datafiles in materials]
+    if workers == 1:
+        yield from map(_run_job, jobs)
+        return
+    with worker_pool(workers) as pool:
+        yield from pool.map(_run_job, jobs)
+
+
+def find_materials(root):
+    """`(name, props, datafiles)` per sub-directory of `root` with one Props_*.csv."""
+    materials = []
+    for d in sorted(glob.glob(os.path.join(root, '*', ''))):
+        props = glob.glob(os.path.join(d, 'Props_*.csv'))
+        datas = glob.glob(os.path.join(d, 'Data_*.csv'))
+        if len(props) == 1 and datas:
+            materials.append((os.path.basename(os.path.normpath(d)), props[0], datas))
+        else:
+            print('skipping', d, ': need one Props_*.csv and Data_*.csv files', file=sys.stderr)
+    return materials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m calibratinator.batch',
+                                     description='Headless JC/BCJ model runs and fits.')
+    parser.add_argument('model', choices=('JC', 'BCJ'))
+    parser.add_argument('-m', '--material', nargs=2, action='append', default=[],
+                        metavar=('PROPS', 'DATA_GLOB'),
+                        help='props .csv or file.json:query (e.g. BCJ/4340/DK), and a glob of Data_*.csv (repeatable)')
+    parser.add_argument('--dir', help='directory with one sub-directory per material')
+    parser.add_argument('-o', '--out', default='batch_out', help='output directory')
+    parser.add_argument('--fit', action='store_true', help='fit the constants before writing')
+    parser.add_argument('--const', action='append', default=[], metavar='NAME=VALUE',
+                        help='set or override a constant (e.g. Tr=295 for JSON JC entries)')
+    parser.add_argument('-j', '--jobs', type=int, help='materials run concurrently')
+    parser.add_argument('--fit-workers', type=int, help='worker processes per fit')
+    parser.add_argument('--de', type=float, default=0.01, help='JC model strain increment')
+    parser.add_argument('--incnum', type=int, default=200, help='BCJ strain increments')
+    parser.add_argument('--istate', type=int, default=1, choices=(1, 2), help='1 = tension, 2 = torsion')
+    parser.add_argument('--tol', type=float, help='BCJ adaptive step tolerance (e.g. 1e-3)')
+    parser.add_argument('--basic', action='store_true',
+                        help='BCJ: BCJ_Basic_v2 instead of the (checked) calibratinator.bcj port')
+    parser.add_argument('--terms', action='store_true', help='BCJ port: keep per-set factors')
+    parser.add_argument('--starts', type=int, default=8, help='JC fit starts')
+    parser.add_argument('--popsize', type=int, default=15, help='BCJ fit population per constant')
+    parser.add_argument('--maxgen', type=int, default=300, help='BCJ fit generations')
+    parser.add_argument('--format', default='.csv', choices=sorted(FORMATS),
+                        help='model curves file format (.h5 needs h5py, .parquet pyarrow)')
+    args = parser.parse_args(argv)
+
+    materials = [(None, source, glob.glob(pattern)) for source, pattern in args.material]
+    if args.dir:
+        materials += find_materials(args.dir)
+    if not materials:
+        parser.error('no materials given (use -m PROPS DATA_GLOB or --dir)')
+    consts  = {k: float(v) for k, _, v in (c.partition('=') for c in args.const)}
+    kwargs  = dict(fit=args.fit, consts=consts, de=args.de, incnum=args.incnum,
+                   istate=args.istate, tol=args.tol, basic=args.basic, terms=args.terms,
+                   starts=args.starts,
+                   popsize=args.popsize, maxgen=args.maxgen, curves_format=args.format)
+    if args.fit_workers:
+        kwargs['workers'] = args.fit_workers
+
+    failed = 0
+    for res in run_batch(args.model, materials, args.out, workers=args.jobs, **kwargs):
+        if 'error' in res:
+            failed += 1
+            print('%-20s FAILED  %s' % (res['name'], res['error']))
+        else:
+            print('%-20s %2d sets  rms %9.3f MPa  %7.2f s  -> %s' % (
+                  res['name'], res['sets'], res['rms'], res['seconds'], res['props']))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,553 @@
+"""
+ BCJ metal model, strain control
+ --------------------------------
+- BCJ_FACTORS        : which constants feed each temperature-dependent factor
+- bcj_factors        : those factors (and beta) for scalar or array conditions
+- bcj_strain_control : radial-return integration of one test from its factors
+- bcj_strain_control_adaptive : same, with error-controlled strain steps
+- bcj_strain_control_sets     : every test of a session advanced in lockstep,
+                       state held as (sets, 6) arrays
+- bcj_sensitivity_sets        : the same, with the state's derivatives carried
+                       through each step (forward sensitivities)
+- BCJ                : drop-in for BCJ_Basic_v2.BCJ(params, T, rate, emax, incnum, istate)
+- BCJ_sets           : the same for arrays of conditions, one result per set
+                       (also reachable as `BCJ.sets`)
+- BCJ_jac, BCJ_jac_sets : BCJ / BCJ_sets plus d(stress, alpha, kappa)/dC per
+                       set, in one integration instead of a run per constant
+- factor_jac         : d(beta, h, H, recovery coefficients)/dC per set
+- BCJTerms           : BCJ-compatible driver that keeps the per-set factors
+                       between calls and recomputes a factor only when its own
+                       constants change
+- run_sets           : per-set results through any driver (lockstep if it has
+                       a `sets` method, a loop otherwise)
+- check_port         : largest difference between a port driver and BCJ_Basic_v2
+- select_driver      : this port (or a BCJTerms), checked against BCJ_Basic_v2
+                       where that can be imported; BCJ_Basic_v2 if they differ
+
+ Equations (as labelled in the GUIs, theta = temperature):
+   V  = C01 exp(-C02/theta)   Y  = C03 exp(C04/theta)   f  = C05 exp(-C06/theta)
+   rd = C07 exp(-C08/theta)   h  = C09 - C10 theta      rs = C11 exp(-C12/theta)
+   Rd = C13 exp(-C14/theta)   H  = C15 - C16 theta      Rs = C17 exp(-C18/theta)
+   Y_adj = C19 exp(-C20/theta)     (added to Y; vanishes for C19 ~ 0)
+   beta  = Y + Y_adj + V asinh(rate/f)
+   F     = |s - alpha| - sqrt(2/3) (kappa + beta)
+   alpha' = 2/3 h ep' - [rd |ep'| + rs] |alpha| alpha
+   kappa' = H |ep'|   - [Rd |ep'| + Rs] kappa^2
+ Loading is isochoric (tension: d = [1, -1/2, -1/2, 0, 0, 0], torsion: shear
+ component 3), so the bulk modulus does not enter.
+
+ This module is a port of BCJ_Basic_v2.py reconstructed from those labels
+ (the Y_adj form and the stress component reported are assumptions), so
+ select_driver runs both on a session's conditions before using the port,
+ and tests/test_bcj_basic.py compares the two wherever BCJ_Basic_v2 can be
+ imported.
+"""
+
+import warnings
+
+import numpy as np
+
+from .props import BCJ_NAMES
+from .terms import TermCache
+
+
+BCJ_FACTORS = {
+    'V'     : ('C01', 'C02'),
+    'Y'     : ('C03', 'C04'),
+    'f'     : ('C05', 'C06'),
+    'rd'    : ('C07', 'C08'),
+    'h'     : ('C09', 'C10'),
+    'rs'    : ('C11', 'C12'),
+    'Rd'    : ('C13', 'C14'),
+    'H'     : ('C15', 'C16'),
+    'Rs'    : ('C17', 'C18'),
+    'Yadj'  : ('C19', 'C20'),
+}
+BCJ_GROUPS = {
+    'yield'         : ('V', 'Y', 'f'),
+    'kinematic'     : ('rd', 'h', 'rs'),
+    'isotropic'     : ('Rd', 'H', 'Rs'),
+    'yield adjust'  : ('Yadj',),
+}
+BETA_CONSTS = BCJ_FACTORS['V'] + BCJ_FACTORS['Y'] + BCJ_FACTORS['f'] + BCJ_FACTORS['Yadj']
+
+_W          = np.array([1., 1., 1., 2., 2., 2.])    # Voigt weights for tensor norms
+_DIRECTION  = {
+    1: np.array([1., -0.5, -0.5, 0., 0., 0.]),      # tension
+    2: np.array([0., 0., 0., 1., 0., 0.]),          # torsion
+}
+_SQ23       = np.sqrt(2./3.)
+_SQ32       = np.sqrt(1.5)
+
+
+def shear_modulus(params):
+    return params['shear_mod'] if 'shear_mod' in params else params['Shear Mod']
+
+
+def factor(name, params, T):
+    """One temperature-dependent factor (scalar or array `T`)."""
+    a, b = (params[k] for k in BCJ_FACTORS[name])
+    if name in ('h', 'H'):  return a - b*T
+    if name == 'Y':         return a*np.exp( b/T)
+    return a*np.exp(-b/T)
+
+
+def beta(fac, rate):
+    return fac['Y'] + fac['Yadj'] + fac['V']*np.arcsinh(rate/fac['f'])
+
+
+def bcj_factors(params, T, rate):
+    """All factors plus 'beta' for the conditions (T, rate)."""
+    T   = np.asarray(T, dtype=float)
+    fac = {name: factor(name, params, T) for name in BCJ_FACTORS}
+    fac['beta'] = beta(fac, np.asarray(rate, dtype=float))
+    return fac
+
+
+class _Increment:
+    """One radial-return strain increment for fixed factors (shared by both integrators)."""
+
+    def __init__(self, fac, mu, rate, istate):
+        self.d      = _DIRECTION[istate]
+        self.deq    = _SQ23*np.sqrt(_W @ self.d**2)     # equivalent strain per unit increment
+        self.mu     = mu
+        self.b      = fac['beta']
+        self.h      = fac['h']
+        self.H      = fac['H']
+        self.ca     = (fac['rd']*rate + fac['rs'])/rate # recovery per unit equivalent strain
+        self.ck     = (fac['Rd']*rate + fac['Rs'])/rate
+        self.denom  = 2.*mu + (2./3.)*(fac['h'] + fac['H'])
+
+    def __call__(self, s, a, k, de):
+        deq     = self.deq*de
+        # recovery (exact for x' = -c x^2 over the step)
+        a_eq    = _SQ32*np.sqrt(_W @ a**2)
+        a       = a/(1. + self.ca*deq*a_eq)
+        k       = k/(1. + self.ck*deq*k)
+        # elastic trial and radial return
+        s       = s + (2.*self.mu*de)*self.d
+        xi      = s - a
+        xi_mag  = np.sqrt(_W @ xi**2)
+        F       = xi_mag - _SQ23*(k + self.b)
+        if F > 0.:
+            dg  = F/self.denom
+            n   = xi/xi_mag
+            s   = s - 2.*self.mu*dg*n
+            a   = a + (2./3.)*self.h*dg*n
+            k   = k + _SQ23*self.H*dg
+        return s, a, k
+
+    def to_yield(self, s, a, k, de):
+        """Fraction of an elastic step `de` after which the surface is first reached (1 if not)."""
+        F0  = np.sqrt(_W @ (s - a)**2) - _SQ23*(k + self.b)
+        F1  = np.sqrt(_W @ (s + (2.*self.mu*de)*self.d - a)**2) - _SQ23*(k + self.b)
+        if F0 < 0. < F1:
+            frac = -F0/(F1 - F0)
+            if frac > 1e-6: return frac
+        return 1.
+
+
+class _IncrementSets(_Increment):
+    """`_Increment` for many sets at once: per-set factor and rate arrays,
+    stress and backstress of shape (sets, 6), kappa of shape (sets,)."""
+
+    def __call__(self, s, a, k, de, active=None):
+        # de: per-set strain step; `active` masks out sets that have reached emax (de = 0)
+        deq     = self.deq*de
+        a_eq    = _SQ32*np.sqrt(a**2 @ _W)
+        a       = a/(1. + self.ca*deq*a_eq)[:, None]
+        k       = k/(1. + self.ck*deq*k)
+        s       = s + np.multiply.outer(2.*self.mu*de, self.d)
+        xi      = s - a
+        xi_mag  = np.sqrt(xi**2 @ _W)
+        F       = xi_mag - _SQ23*(k + self.b)
+        dg      = np.maximum(F, 0.)/self.denom          # 0 for elastic steps: state unchanged
+        if active is not None: dg *= active
+        g       = (dg/np.maximum(xi_mag, 1e-300))[:, None]  # dg*n = g*xi
+        s       = s - (2.*self.mu)*g*xi
+        a       = a + (2./3.)*self.h[:, None]*g*xi
+        k       = k + _SQ23*self.H*dg
+        return s, a, k
+
+
+
+# Forward sensitivities: the state's derivatives with respect to the five
+# quantities the increment is built from, carried through each step
+_Q          = ('beta', 'h', 'H', 'ca', 'ck')
+_E          = dict(zip(_Q, np.eye(len(_Q))))
+
+
+class _TangentSets(_IncrementSets):
+    """`_IncrementSets` that also advances dS, dA (sets, 6, 5) and dK
+    (sets, 5): derivatives of the state with respect to `_Q` per set, exact
+    for the discrete radial-return step (the step is differentiated, not the
+    rate equations)."""
+
+    def __call__(self, s, a, k, Ds, Da, Dk, de, active=None):
+        E       = _E
+        deq     = self.deq*de
+        # recovery
+        a_eq    = _SQ32*np.sqrt(a**2 @ _W)
+        Da_eq   = _SQ32**2*np.einsum('sk,skq->sq', a*_W, Da)/np.maximum(a_eq, 1e-300)[:, None]
+        ra      = 1. + self.ca*deq*a_eq
+        Dra     = deq[:, None]*(self.ca[:, None]*Da_eq + a_eq[:, None]*E['ca'])
+        a       = a/ra[:, None]
+        Da      = (Da - a[:, :, None]*Dra[:, None, :])/ra[:, None, None]
+        rk      = 1. + self.ck*deq*k
+        Drk     = deq[:, None]*(self.ck[:, None]*Dk + k[:, None]*E['ck'])
+        k       = k/rk
+        Dk      = (Dk - k[:, None]*Drk)/rk[:, None]
+        # elastic trial (Ds unchanged) and radial return
+        s       = s + np.multiply.outer(2.*self.mu*de, self.d)
+        xi      = s - a
+        Dxi     = Ds - Da
+        xi_mag  = np.maximum(np.sqrt(xi**2 @ _W), 1e-300)
+        Dxi_mag = np.einsum('sk,skq->sq', xi*_W, Dxi)/xi_mag[:, None]
+        F       = xi_mag - _SQ23*(k + self.b)
+        dg      = np.maximum(F, 0.)/self.denom
+        if active is not None: dg *= active
+        DF      = Dxi_mag - _SQ23*(Dk + E['beta'])
+        Ddg     = (DF - dg[:, None]*(2./3.)*(E['h'] + E['H']))/self.denom[:, None]
+        Ddg    *= (dg > 0.)[:, None]
+        n       = xi/xi_mag[:, None]
+        Dn      = (Dxi - n[:, :, None]*Dxi_mag[:, None, :])/xi_mag[:, None, None]
+        Dp      = n[:, :, None]*Ddg[:, None, :] + dg[:, None, None]*Dn     # d(dg*n)
+        s       = s - (2.*self.mu)*dg[:, None]*n
+        Ds      = Ds - (2.*self.mu)*Dp
+        a       = a + (2./3.)*(self.h*dg)[:, None]*n
+        Da      = Da + (2./3.)*(self.h[:, None, None]*Dp
+                                + (dg[:, None]*n)[:, :, None]*E['h'])
+        k       = k + _SQ23*self.H*dg
+        Dk      = Dk + _SQ23*(self.H[:, None]*Ddg + dg[:, None]*E['H'])
+        return s, a, k, Ds, Da, Dk
+
+
+def _outputs(d, e, s, a, k):
+    """Pack per-point histories into [EF, SF, alph, kap, tot]."""
+    alph    = np.asarray(a).T
+    kap     = np.asarray(k)
+    tot     = _SQ32*np.sqrt(_W @ alph**2) + kap
+    return [np.outer(d, e), np.asarray(s).T.copy(), alph.copy(), kap, tot]
+
+
+def bcj_strain_control(fac, mu, rate, emax, incnum, istate):
+    """Integrate one constant-rate test from 0 to `emax` in `incnum` increments.
+
+    fac     : scalar factors ('beta', 'h', 'H', 'rd', 'rs', 'Rd', 'Rs')
+    mu      : shear modulus
+    Returns `[EF, SF, alph, kap, tot]` like BCJ_Basic_v2: total strain, stress
+    and backstress components (6, incnum+1), kappa and total hardening
+    (equivalent alpha + kappa) of shape (incnum+1,).
+    """
+    step    = _Increment(fac, mu, rate, istate)
+    de      = emax/incnum
+    s, a, k = np.zeros(6), np.zeros(6), 0.
+    S, A, K = [s], [a], [k]
+    for j in range(incnum):
+        s, a, k = step(s, a, k, de)
+        S.append(s); A.append(a); K.append(k)
+    return _outputs(step.d, de*np.arange(incnum + 1), S, A, K)
+
+
+def bcj_strain_control_sets(fac, mu, rate, emax, incnum, istate):
+    """Integrate every test at once, as `bcj_strain_control` per set.
+
+    fac     : factor arrays, one value per set (e.g. `bcj_factors(params, T, rate)`)
+    rate    : per-set strain rates
+    emax    : per-set final strains
+    incnum  : increments, one for all sets or one per set
+
+    Set `i` takes `incnum[i]` steps of `emax[i]/incnum[i]`; the state of all
+    sets is advanced together by one vectorized increment, and a set that has
+    taken all its steps is masked (zero step) for the remaining ones.
+    Returns a list with `[EF, SF, alph, kap, tot]` per set.
+    """
+    emax    = np.atleast_1d(np.asarray(emax, dtype=float))
+    sets    = emax.size
+    steps   = np.broadcast_to(np.asarray(incnum, dtype=np.intp), (sets,))
+    de      = emax/steps
+    step    = _IncrementSets(fac, mu, np.asarray(rate, dtype=float), istate)
+    N       = steps.max()
+    S, A    = np.zeros((N + 1, sets, 6)), np.zeros((N + 1, sets, 6))
+    K       = np.zeros((N + 1, sets))
+    ragged  = steps.min() < N
+    for j in range(N):
+        if ragged:
+            active = j < steps
+            S[j+1], A[j+1], K[j+1] = step(S[j], A[j], K[j], de*active, active)
+        else:
+            S[j+1], A[j+1], K[j+1] = step(S[j], A[j], K[j], de)
+    return [_outputs(step.d, de[i]*np.arange(n + 1), S[:n+1, i], A[:n+1, i], K[:n+1, i].copy())
+            for i, n in enumerate(steps)]
+
+
+
+def bcj_sensitivity_sets(fac, mu, rate, emax, incnum, istate):
+    """`bcj_strain_control_sets` with forward sensitivities.
+
+    Returns a list with `(out, Jq)` per set: `out` as bcj_strain_control_sets
+    and `Jq` the derivatives of the state with respect to beta, h, H and the
+    alpha/kappa recovery coefficients (`_Q`), {'SF': (6, n, 5),
+    'alph': (6, n, 5), 'kap': (n, 5)}, integrated alongside it.
+    """
+    emax    = np.atleast_1d(np.asarray(emax, dtype=float))
+    sets    = emax.size
+    steps   = np.broadcast_to(np.asarray(incnum, dtype=np.intp), (sets,))
+    de      = emax/steps
+    step    = _TangentSets(fac, mu, np.asarray(rate, dtype=float), istate)
+    N, q    = steps.max(), len(_Q)
+    S, A    = np.zeros((N + 1, sets, 6)), np.zeros((N + 1, sets, 6))
+    K       = np.zeros((N + 1, sets))
+    DS, DA  = np.zeros((N + 1, sets, 6, q)), np.zeros((N + 1, sets, 6, q))
+    DK      = np.zeros((N + 1, sets, q))
+    for j in range(N):
+        active  = j < steps
+        S[j+1], A[j+1], K[j+1], DS[j+1], DA[j+1], DK[j+1] = step(
+            S[j], A[j], K[j], DS[j], DA[j], DK[j], de*active, active)
+    return [(_outputs(step.d, de[i]*np.arange(n + 1), S[:n+1, i], A[:n+1, i], K[:n+1, i].copy()),
+             {'SF': DS[:n+1, i].transpose(1, 0, 2), 'alph': DA[:n+1, i].transpose(1, 0, 2),
+              'kap': DK[:n+1, i]})
+            for i, n in enumerate(steps)]
+
+
+def bcj_strain_control_adaptive(fac, mu, rate, emax, istate, tol=1e-3,
+                                de0=None, de_min=None, de_max=None):
+    """Integrate one test with step-doubling error control.
+
+    Each step is taken once at `de` and twice at `de/2`; the difference in
+    stress, backstress and kappa, relative to the current flow-stress scale,
+    is the local error estimate.  Steps with error above `tol` are retried
+    smaller; accepted steps keep the two half-step result and the next step
+    grows or shrinks with `sqrt(tol/err)` (first-order method).  A step that
+    would cross the yield surface elastically is cut so a point lands on the
+    knee.  The strain grid returned is non-uniform: dense through yield,
+    sparse on the plateau.
+
+    de0, de_min, de_max default to emax/200, emax/1e5 and emax/20.
+    Returns `[EF, SF, alph, kap, tot]` with as many points as accepted steps + 1.
+    """
+    step    = _Increment(fac, mu, rate, istate)
+    de      = emax/200. if de0    is None else de0
+    de_min  = emax/1e5  if de_min is None else de_min
+    de_max  = emax/20.  if de_max is None else de_max
+    e       = 0.
+    s, a, k = np.zeros(6), np.zeros(6), 0.
+    E, S, A, K = [e], [s], [a], [k]
+    while e < emax*(1. - 1e-12):
+        de      = min(de, emax - e)
+        de     *= step.to_yield(s, a, k, de)    # land a point on the yield knee
+        s1, a1, k1  = step(s, a, k, de)
+        sh, ah, kh  = step(s, a, k, 0.5*de)
+        s2, a2, k2  = step(sh, ah, kh, 0.5*de)
+        scale   = max(np.sqrt(_W @ s2**2), _SQ23*(k2 + step.b))
+        err     = max(np.sqrt(_W @ (s2 - s1)**2), np.sqrt(_W @ (a2 - a1)**2),
+                      _SQ23*abs(k2 - k1))/scale
+        if err <= tol or de <= de_min:
+            e      += de
+            s, a, k = s2, a2, k2
+            E.append(e); S.append(s); A.append(a); K.append(k)
+        grow    = 5. if err == 0. else min(5., max(0.2, 0.9*np.sqrt(tol/err)))
+        de      = min(de_max, max(de_min, de*grow))
+    return _outputs(step.d, np.array(E), S, A, K)
+
+
+def _integrate(fac, mu, rate, emax, incnum, istate, tol):
+    if tol is None:
+        return bcj_strain_control(fac, mu, rate, emax, incnum, istate)
+    return bcj_strain_control_adaptive(fac, mu, rate, emax, istate, tol,
+                                       de_max=emax/min(incnum, 20))
+
+
+def BCJ(params, T, rate, emax, incnum, istate, tol=None):
+    """BCJ_Basic_v2-compatible driver; with `tol`, strain steps are adaptive
+    (`incnum` then only caps the step at emax/min(incnum, 20))."""
+    fac = bcj_factors(params, T, rate)
+    return _integrate(fac, shear_modulus(params), rate, emax, incnum, istate, tol)
+
+
+def BCJ_sets(params, T, rate, emax, incnum, istate, tol=None):
+    """`[BCJ(params, T[i], rate[i], emax[i], incnum, istate) for i ...]` in one
+    lockstep integration; adaptive runs (`tol`) have per-set strain grids and
+    are integrated one set at a time (as is a single set, which the scalar
+    integrator does faster)."""
+    if tol is not None or len(T) == 1:
+        return [BCJ(params, t, r, e, n, istate, tol) for t, r, e, n in
+                zip(T, rate, emax, np.broadcast_to(incnum, (len(T),)))]
+    return bcj_strain_control_sets(bcj_factors(params, T, rate), shear_modulus(params),
+                                   rate, emax, incnum, istate)
+
+BCJ.sets = BCJ_sets
+
+
+
+def _factor_grad(name, params, T):
+    """Derivatives of one factor with respect to its two constants."""
+    a, b = (params[k] for k in BCJ_FACTORS[name])
+    if name in ('h', 'H'):  return np.ones_like(T), -T
+    if name == 'Y':
+        e = np.exp( b/T);   return e,  a*e/T
+    e = np.exp(-b/T);       return e, -a*e/T
+
+
+def factor_jac(params, T, rate, names=BCJ_NAMES):
+    """d(beta, h, H, ca, ck)/d(names) per set, shape (sets, 5, len(names));
+    ca, ck are the alpha and kappa recovery per unit equivalent strain."""
+    T, rate = np.atleast_1d(np.asarray(T, dtype=float)), np.atleast_1d(np.asarray(rate, dtype=float))
+    fac     = bcj_factors(params, T, rate)
+    x       = rate/fac['f']
+    into    = {                                     # factor: (quantity, d quantity/d factor)
+        'V'     : ('beta', np.arcsinh(x)),
+        'Y'     : ('beta', 1.),
+        'f'     : ('beta', -fac['V']*x/(fac['f']*np.sqrt(1. + x**2))),
+        'Yadj'  : ('beta', 1.),
+        'h'     : ('h', 1.),
+        'H'     : ('H', 1.),
+        'rd'    : ('ca', 1.),
+        'rs'    : ('ca', 1./rate),
+        'Rd'    : ('ck', 1.),
+        'Rs'    : ('ck', 1./rate),
+    }
+    col     = {name: j for j, name in enumerate(names)}
+    Q       = np.zeros((T.size, len(_Q), len(names)))
+    for name, (q, w) in into.items():
+        for const, g in zip(BCJ_FACTORS[name], _factor_grad(name, params, T)):
+            if const in col:
+                Q[:, _Q.index(q), col[const]] += w*g
+    return Q
+
+
+def BCJ_jac_sets(params, T, rate, emax, incnum, istate, names=BCJ_NAMES):
+    """`BCJ_sets` plus the Jacobian of each set's curves with respect to the
+    constants `names`, from one forward-sensitivity integration.
+
+    Returns a list with `(out, J)` per set, `out` as BCJ and
+    `J = {'SF': (6, n, m), 'alph': (6, n, m), 'kap': (n, m)}` for m names.
+    Fixed increments only (the adaptive grid of `tol` would itself move with
+    the constants).
+    """
+    T, rate = np.atleast_1d(np.asarray(T, dtype=float)), np.atleast_1d(np.asarray(rate, dtype=float))
+    Q       = factor_jac(params, T, rate, names)
+    runs    = bcj_sensitivity_sets(bcj_factors(params, T, rate), shear_modulus(params),
+                                   rate, emax, incnum, istate)
+    return [(out, {key: D @ Q[i] for key, D in Jq.items()}) for i, (out, Jq) in enumerate(runs)]
+
+
+def BCJ_jac(params, T, rate, emax, incnum, istate, names=BCJ_NAMES):
+    """`BCJ(...)` and its Jacobian `J` (see BCJ_jac_sets) for one test."""
+    return BCJ_jac_sets(params, [T], [rate], [emax], incnum, istate, names)[0]
+
+BCJ_jac.sets = BCJ_jac_sets
+
+
+def run_sets(BCJ, params, T, rate, emax, incnum, istate, **kwargs):
+    """Per-set results of any BCJ driver for arrays of conditions: one lockstep
+    run through `BCJ.sets` where the driver has it, else a loop of calls."""
+    if hasattr(BCJ, 'sets'):
+        return BCJ.sets(params, T, rate, emax, incnum, istate, **kwargs)
+    return [BCJ(params, t, r, e, incnum, istate, **kwargs) for t, r, e in zip(T, rate, emax)]
+
+
+class BCJTerms:
+    """Drop-in BCJ driver with per-set factor memoization.
+
+    Built for a session's test conditions `T`, `rate`; calls for one of those
+    conditions reuse the factor arrays (one entry per set), of which only the
+    ones fed by a changed constant are recomputed - e.g. moving C09 recomputes
+    `h` alone.  Unregistered conditions fall back to `BCJ`.
+    """
+
+    def __init__(self, T, rate):
+        self.T      = np.array(T,    dtype=float)        # own copies: T may map a checkpoint
+        self.rate   = np.array(rate, dtype=float)
+        self._index = {(t, r): i for i, (t, r) in enumerate(zip(self.T.tolist(), self.rate.tolist()))}
+        self.terms  = terms = TermCache()
+        for name, consts in BCJ_FACTORS.items():
+            terms.define(name, consts, lambda c, name=name: factor(name, c, self.T))
+        terms.define('beta', BETA_CONSTS,
+                     lambda c: beta({k: terms.get(k, c) for k in ('V', 'Y', 'f', 'Yadj')}, self.rate))
+
+    def __reduce__(self):
+        # the terms are closures: a worker process rebuilds them (and starts with none cached)
+        return BCJTerms, (self.T, self.rate)
+
+    def factors(self, params):
+        """Per-set arrays of every factor for `params`."""
+        return {name: self.terms.get(name, params) for name in tuple(BCJ_FACTORS) + ('beta',)}
+
+    def __call__(self, params, T, rate, emax, incnum, istate, tol=None):
+        i = self._index.get((float(T), float(rate)))
+        if i is None:
+            return BCJ(params, T, rate, emax, incnum, istate, tol)
+        fac = {name: v[i] for name, v in self.factors(params).items()}
+        return _integrate(fac, shear_modulus(params), rate, emax, incnum, istate, tol)
+
+    def sets(self, params, T, rate, emax, incnum, istate, tol=None):
+        """Lockstep `BCJ_sets` from the memoized factors (registered conditions)."""
+        idx = [self._index.get((float(t), float(r))) for t, r in zip(T, rate)]
+        if None in idx:
+            return BCJ_sets(params, T, rate, emax, incnum, istate, tol)
+        if tol is not None or len(idx) == 1:
+            return [self(params, t, r, e, incnum, istate, tol) for t, r, e in zip(T, rate, emax)]
+        fac = {name: v[idx] for name, v in self.factors(params).items()}
+        return bcj_strain_control_sets(fac, shear_modulus(params), self.rate[idx],
+                                       emax, incnum, istate)
+
+
+def _basic():
+    try:
+        from BCJ_Basic_v2 import BCJ as basic_BCJ
+    except ImportError:
+        return None
+    return basic_BCJ
+
+
+def check_port(driver, params, T, rate, emax, incnum, istate, basic_BCJ=None):
+    """Largest difference between `driver` (this module's BCJ or a BCJTerms)
+    and BCJ_Basic_v2 over every set, relative to each output's magnitude;
+    None if BCJ_Basic_v2 cannot be imported."""
+    basic_BCJ = basic_BCJ or _basic()
+    if basic_BCJ is None:
+        return None
+    dev = 0.
+    for t, r, e, port in zip(T, rate, emax, run_sets(driver, params, T, rate, emax, incnum, istate)):
+        for a, b in zip(port, basic_BCJ(params, t, r, e, incnum, istate)):
+            a, b    = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+            scale   = np.abs(b).max()
+            if a.shape != b.shape: return np.inf
+            if scale > 0.: dev = max(dev, np.abs(a - b).max()/scale)
+    return dev
+
+
+def select_driver(T, rate, basic=False, terms=False, params=None, emax=None, incnum=200,
+                  istate=1, tol=None, rtol=1e-6):
+    """The BCJ driver for sessions over conditions (T, rate).
+
+    This module's BCJ (lockstep sets, adaptive `tol`, sensitivities), or with
+    `terms` a BCJTerms over (T, rate).  Where BCJ_Basic_v2 - the module props
+    files are calibrated against - can be imported and `params`/`emax` are
+    given, the port is first run against it on these conditions; if they
+    differ by more than `rtol` (see check_port) BCJ_Basic_v2 is used instead,
+    with a warning.  `basic` always uses BCJ_Basic_v2 where it can be imported.
+    Adaptive steps (`tol`) need the port: it is used unchecked.
+    """
+    if tol is not None:
+        return BCJTerms(T, rate) if terms else BCJ
+    basic_BCJ   = _basic()
+    if basic and basic_BCJ is not None:
+        return basic_BCJ
+    if basic:
+        warnings.warn('BCJ_Basic_v2 cannot be imported; using the calibratinator.bcj port',
+                      stacklevel=2)
+    port        = BCJTerms(T, rate) if terms else BCJ
+    if params is None or emax is None:
+        return port
+    if basic_BCJ is None:
+        warnings.warn('BCJ_Basic_v2 cannot be imported; the calibratinator.bcj port is not '
+                      'checked against it', stacklevel=2)
+        return port
+    dev         = check_port(port, params, T, rate, emax, incnum, istate, basic_BCJ)
+    if dev > rtol:
+        warnings.warn('the calibratinator.bcj port differs from BCJ_Basic_v2 by %.3g (relative) '
+                      'on these tests; using BCJ_Basic_v2' % dev, stacklevel=2)
+        return basic_BCJ
+    return port
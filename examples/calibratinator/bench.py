@@ -0,0 +1,307 @@
+"""
+ Benchmarks
+ --------------------------------
+- synthetic_sets : JC-shaped stress-strain sets with noise, any size
+- write_sets     : the same as Data_*.csv files (plus JC/BCJ props files)
+- BENCHES        : kernel and GUI-path benchmarks, each timed over a grid of
+                   sets x points x incnum
+- main           : command line, see `python -m calibratinator.bench -h`
+
+Results are written as JSON (one record per benchmark and size, best and
+mean of `repeat` runs) so runs can be compared with `--compare old.json`.
+The GUI update benchmark runs the real GUI scripts on the Agg backend with
+the file dialogs answered by the synthetic files; nothing is shown.
+gui_update_* times one slider step as drawn while dragging (the coarse
+preview), gui_settle_* the preview plus the full-resolution redraw.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+from .bcj import BCJ, BCJ_jac_sets, BCJ_sets, BCJTerms
+from .constants import ConstantsStore
+from .data import read_data
+from .jc import stress_JC, stress_JC_sets
+from .postprocess import BCJCurves
+from .props import BCJ_PROPS, JC_PROPS, write_props
+from .ragged import RaggedSets
+from .residuals import InterpOperator
+
+EXAMPLES    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JC_REF      = {'Tr': 295.0, 'Tm': 1793.0, 'er0': 1.0}
+_work       = []
+
+
+def _tmpdir():
+    """Fresh directory under one temporary tree removed at exit."""
+    if not _work: _work.append(tempfile.TemporaryDirectory(prefix='calib_bench_'))
+    return tempfile.mkdtemp(dir=_work[0].name)
+
+
+def reference_props():
+    """JC and BCJ constants for 4340 from the constants store."""
+    store   = ConstantsStore()
+    jc      = dict(JC_REF, **store.get('JC/4340')[1])
+    bcj     = store.get('BCJ/4340/DK')[1]
+    return jc, bcj
+
+
+def synthetic_sets(sets, points, emax=0.25, noise=5., seed=0):
+    """`(e_data, s_data, rate, T, names)` for `sets` tests of `points` points
+    each: JC 4340 curves (MPa) at spread rates/temperatures, plus noise."""
+    rng     = np.random.default_rng(seed)
+    jc, _   = reference_props()
+    rate    = 10.**rng.uniform(-3, 3, sets)
+    T       = rng.uniform(295., 800., sets)
+    e       = [np.linspace(0.002, emax, points) for _ in range(sets)]
+    s       = [stress_JC(ei, r, t, *(jc[k] for k in JC_PROPS)) + noise*rng.standard_normal(points)
+               for ei, r, t in zip(e, rate, T)]
+    names   = ['e%g_T%d_%d' % (r, t, i) for i, (r, t) in enumerate(zip(rate, T))]
+    return e, s, rate, T, names
+
+
+def write_sets(directory, sets, points, seed=0):
+    """Write synthetic Data_*.csv files and Props_JC/Props_BCJ files to
+    `directory`; returns `(datafiles, jc_propsfile, bcj_propsfile)`."""
+    e, s, rate, T, names = synthetic_sets(sets, points, seed=seed)
+    files   = []
+    for ei, si, r, t, name in zip(e, s, rate, T, names):
+        path = os.path.join(directory, 'Data_%s.csv' % name)
+        with open(path, 'w') as f:
+            f.write('Strain,Stress,Strain Rate,Temperature,Name\n')
+            f.write('%.17g,%.17g,%.17g,%.17g,%s\n' % (ei[0], si[0], r, t, name))
+            np.savetxt(f, np.column_stack([ei[1:], si[1:]]), delimiter=',', fmt='%.17g')
+        files.append(path)
+    jc, bcj = reference_props()
+    jcfile  = os.path.join(directory, 'Props_JC_synthetic.csv')
+    bcjfile = os.path.join(directory, 'Props_BCJ_synthetic.csv')
+    write_props(jcfile,  'synthetic', jc,  JC_PROPS)
+    write_props(bcjfile, 'synthetic', bcj, BCJ_PROPS)
+    return files, jcfile, bcjfile
+
+
+# ------------------------------------------------
+# Benchmarks: setup(sets, points, incnum) -> run() callable
+# ------------------------------------------------
+def _jc(sets, points, incnum):
+    jc, _   = reference_props()
+    e, _, rate, T, _ = synthetic_sets(sets, points)
+    grids   = RaggedSets(e)
+    out     = np.empty_like(grids.flat)
+    p       = [jc[k] for k in JC_PROPS]
+    return lambda: stress_JC_sets(grids, rate, T, *p, out=out)
+
+
+def _bcj(sets, points, incnum):
+    _, bcj  = reference_props()
+    _, _, rate, T, _ = synthetic_sets(sets, 2)
+    def run():
+        for t, r in zip(T, rate):
+            BCJ(bcj, t, r, 0.25, incnum, 1)
+    return run
+
+
+def _bcj_terms(sets, points, incnum):
+    _, bcj  = reference_props()
+    _, _, rate, T, _ = synthetic_sets(sets, 2)
+    driver  = BCJTerms(T, rate)
+    def run():
+        for t, r in zip(T, rate):
+            driver(bcj, t, r, 0.25, incnum, 1)
+    return run
+
+
+def _bcj_sets(sets, points, incnum):
+    _, bcj  = reference_props()
+    _, _, rate, T, _ = synthetic_sets(sets, 2)
+    return lambda: BCJ_sets(bcj, T, rate, np.full(sets, 0.25), incnum, 1)
+
+
+def _bcj_jac(sets, points, incnum):
+    _, bcj  = reference_props()
+    _, _, rate, T, _ = synthetic_sets(sets, 2)
+    return lambda: BCJ_jac_sets(bcj, T, rate, np.full(sets, 0.25), incnum, 1)
+
+
+def _von_mises(sets, points, incnum):
+    _, bcj  = reference_props()
+    curves  = BCJCurves(sets, incnum + 1)
+    res     = BCJ(bcj, 400., 1., 0.25, incnum, 1)
+    for i in range(sets):
+        curves.store(i, *res)
+    return curves.finish
+
+
+def _residual(sets, points, incnum):
+    e, s, _, _, _ = synthetic_sets(sets, points)
+    grids   = [np.linspace(0, ei.max(), incnum + 1) for ei in e]
+    model   = RaggedSets([np.interp(g, ei, si) for g, ei, si in zip(grids, e, s)]).flat
+    op      = InterpOperator(grids, e, s)
+    return lambda: op.errors(model)
+
+
+def _csv(sets, points, incnum, cache=False):
+    files   = write_sets(_tmpdir(), sets, points)[0]
+    if cache:
+        for f in files: read_data(f)                # build the sidecars once
+    return lambda: [read_data(f, 1e6, cache=cache) for f in files]
+
+
+def _gui_globals(script, propsfile, datafiles):
+    """Run a GUI script headless (Agg, dialogs answered) and return its globals."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import runpy
+    tk          = types.ModuleType('tkinter')
+    fd          = types.ModuleType('tkinter.filedialog')
+    tk.Tk       = lambda *a, **k: types.SimpleNamespace(withdraw=lambda: None)
+    tk.filedialog = fd
+    fd.askopenfilename  = lambda **k: propsfile
+    fd.askopenfilenames = lambda **k: tuple(datafiles)
+    fd.asksaveasfilename = lambda **k: ''
+    saved       = {k: sys.modules.get(k) for k in ('tkinter', 'tkinter.filedialog')}
+    sys.modules.update({'tkinter': tk, 'tkinter.filedialog': fd})
+    show, plt.show = plt.show, lambda *a, **k: None
+    sys.path.insert(0, EXAMPLES)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return runpy.run_path(os.path.join(EXAMPLES, script), run_name='__bench__')
+    finally:
+        plt.show = show
+        sys.path.remove(EXAMPLES)
+        for k, v in saved.items():
+            if v is None: sys.modules.pop(k, None)
+            else:         sys.modules[k] = v
+
+
+def _gui(script, slider, settle=False):
+    def setup(sets, points, incnum):
+        files, jcfile, bcjfile = write_sets(_tmpdir(), sets, points)
+        g       = _gui_globals(script, jcfile if 'JC' in script else bcjfile, files)
+        sl      = slider(g)
+        step    = itertools.count(1)
+        def run():
+            # a new slider value every call, so no cached result is reused
+            sl.set_val(sl.valinit*(1. + 1e-4*next(step)))
+            if settle:  # the full-resolution pass that follows a drag preview
+                g['scheduler'].wait()
+                g['preview'].refine()
+            g['scheduler'].wait()
+        return run
+    return setup
+
+
+BENCHES = {
+    'stress_JC'     : (_jc,         ('sets', 'points')),
+    'BCJ'           : (_bcj,        ('sets', 'incnum')),
+    'BCJTerms'      : (_bcj_terms,  ('sets', 'incnum')),
+    'BCJ_sets'      : (_bcj_sets,   ('sets', 'incnum')),
+    'BCJ_jac'       : (_bcj_jac,    ('sets', 'incnum')),
+    'von_mises'     : (_von_mises,  ('sets', 'incnum')),
+    'residual'      : (_residual,   ('sets', 'points', 'incnum')),
+    'csv_parse'     : (_csv,        ('sets', 'points')),
+    'csv_cached'    : (lambda *a: _csv(*a, cache=True), ('sets', 'points')),
+    'gui_update_JC' : (_gui('JC-GUI_v1.py', lambda g: g['A_slider']), ('sets', 'points')),
+    'gui_update_BCJ': (_gui('BCJ_GUI_v2.py', lambda g: g['Slider_C'][2]), ('sets', 'points')),
+    'gui_settle_JC' : (_gui('JC-GUI_v1.py', lambda g: g['A_slider'], True), ('sets', 'points')),
+    'gui_settle_BCJ': (_gui('BCJ_GUI_v2.py', lambda g: g['Slider_C'][2], True), ('sets', 'points')),
+}
+
+
+def timeit(run, repeat=5, min_time=0.05):
+    """Best and mean seconds per call; calls are batched up to `min_time`."""
+    run()                                           # warm-up
+    t0, n = time.perf_counter(), 0
+    while True:
+        run(); n += 1
+        if time.perf_counter() - t0 >= min_time: break
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(n): run()
+        times.append((time.perf_counter() - t0)/n)
+    return min(times), float(np.mean(times)), n
+
+
+def run_benches(names, sets, points, incnum, repeat=5, log=None):
+    """Time every benchmark in `names` over its axes of the size grid."""
+    results = []
+    for name in names:
+        setup, axes = BENCHES[name]
+        seen = set()
+        for combo in itertools.product(sets, points, incnum):
+            size = dict(zip(('sets', 'points', 'incnum'), combo))
+            key  = tuple(size[a] for a in axes)
+            if key in seen: continue
+            seen.add(key)
+            best, mean, n = timeit(setup(*combo), repeat)
+            rec = dict(bench=name, best=best, mean=mean, calls=n, repeat=repeat,
+                       **{a: size[a] for a in axes})
+            results.append(rec)
+            if log: log(rec)
+    return results
+
+
+def metadata():
+    import numpy
+    return dict(time=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(),
+                numpy=numpy.__version__, machine=platform.machine(),
+                processor=platform.processor(), cpus=os.cpu_count())
+
+
+def _label(rec):
+    return rec['bench'] + ''.join(' %s=%d' % (a, rec[a]) for a in ('sets', 'points', 'incnum') if a in rec)
+
+
+def compare(old, new):
+    """Lines of `new` vs `old` best times (ratio > 1 is slower)."""
+    before  = {_label(r): r['best'] for r in old['results']}
+    lines   = []
+    for r in new['results']:
+        lab = _label(r)
+        if lab in before:
+            lines.append('%-50s %10.3g s %10.3g s  x%.2f' % (lab, before[lab], r['best'], r['best']/before[lab]))
+    return lines
+
+
+def main(argv=None):
+    ints    = lambda s: [int(v) for v in s.split(',')]
+    parser  = argparse.ArgumentParser(prog='python -m calibratinator.bench',
+                                      description='Time the model kernels and the GUI update path.')
+    parser.add_argument('bench', nargs='*', help='benchmarks to run (default all): ' + ', '.join(BENCHES))
+    parser.add_argument('--sets',   type=ints, default=[4],             help='e.g. 1,4,16')
+    parser.add_argument('--points', type=ints, default=[1000],          help='data points per set, e.g. 100,10000')
+    parser.add_argument('--incnum', type=ints, default=[200],           help='BCJ increments, e.g. 100,400')
+    parser.add_argument('--repeat', type=int,  default=5)
+    parser.add_argument('-o', '--out', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier run to compare against')
+    args    = parser.parse_args(argv)
+    names   = args.bench or list(BENCHES)
+    for name in names:
+        if name not in BENCHES: parser.error('unknown benchmark %r' % name)
+
+    log     = lambda r: print('%-50s %10.3g s  (mean %.3g s, %d calls)' % (_label(r), r['best'], r['mean'], r['calls']))
+    doc     = dict(meta=metadata(), results=run_benches(names, args.sets, args.points, args.incnum,
+                                                        args.repeat, log))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(doc, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            print('\n'.join(['', 'compared with ' + args.compare] + compare(json.load(f), doc)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+ Session checkpoints
+ --------------------------------
+- write_checkpoint : JSON metadata plus named arrays in one binary file
+- read_checkpoint  : the same back, arrays memory-mapped (read-only) by default
+- Checkpoint       : what read_checkpoint returns - `meta`, `arrays` and the
+                     tests as a TestSets
+
+Layout: an 8-byte magic, the header length (uint64 little-endian), a JSON
+header `{meta, arrays: {name: {dtype, shape, offset}}}` and the raw C-order
+array blocks, each starting on a 64-byte boundary so a memory map of the file
+gives aligned arrays.  Nothing is parsed or recomputed on reading; a large
+session costs the header and whatever pages are later touched.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from .data import TestSets
+
+MAGIC       = b'CALSESS1'
+_ALIGN      = 64
+
+
+def _pad(n):
+    return -n % _ALIGN
+
+
+def write_checkpoint(path, meta, arrays, chunk=1 << 24):
+    """Write `meta` (JSON-able) and `arrays` ({name: array}) to `path`.
+
+    The file is written next to `path` and renamed into place, so a reader
+    never sees a partial one.  On POSIX, maps of the old file stay valid (they
+    keep its data); Windows cannot replace a file that is still memory-mapped,
+    so its maps must be closed first (the sessions do this when they save
+    over their own checkpoint).
+    """
+    arrays  = {name: np.asarray(a) for name, a in arrays.items()}
+    index   = {}
+    offset  = 0
+    for name, a in arrays.items():
+        index[name] = dict(dtype=np.lib.format.dtype_to_descr(a.dtype), shape=list(a.shape),
+                           offset=offset)
+        offset += a.nbytes + _pad(a.nbytes)
+    header  = json.dumps(dict(meta=meta, arrays=index)).encode()
+    start   = len(MAGIC) + 8 + len(header)
+    start  += _pad(start)
+    tmp     = path + '.%d.tmp' % os.getpid()
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', start - len(MAGIC) - 8) + header)
+        f.write(b' '*(start - f.tell()))                  # JSON tolerates the padding
+        for name, a in arrays.items():
+            flat = a.reshape(-1) if a.flags.c_contiguous else np.ravel(a)
+            step = max(chunk//max(a.itemsize, 1), 1)
+            for j in range(0, flat.size, step):
+                f.write(flat[j:j + step].tobytes())
+            f.write(b'\0'*_pad(a.nbytes))
+    try:
+        os.replace(tmp, path)
+    except PermissionError:     # Windows: `path` is still mapped somewhere
+        raise PermissionError('%r is still memory-mapped; the new checkpoint was left at %r'
+                              % (path, tmp))
+    return path
+
+
+class Checkpoint:
+    """`meta` (dict) and `arrays` ({name: array}) of one checkpoint file."""
+
+    def __init__(self, path, meta, arrays):
+        self.path   = path
+        self.meta   = meta
+        self.arrays = arrays
+
+    def group(self, prefix):
+        """`{name: array}` of the arrays stored as `<prefix>/<name>`."""
+        prefix += '/'
+        return {name[len(prefix):]: a for name, a in self.arrays.items() if name.startswith(prefix)}
+
+    def close(self):
+        """Drop the arrays; the file is unmapped once no other view of them is left."""
+        self.arrays = {}
+
+    @property
+    def mapped(self):
+        """True while any array is a memory map of the file."""
+        return any(isinstance(a, np.memmap) for a in self.arrays.values())
+
+    @property
+    def tests(self):
+        return TestSets.from_arrays(self.group('tests'))
+
+
+def read_checkpoint(path, mmap=True):
+    """Read a `write_checkpoint` file; arrays are read-only memory maps
+    unless `mmap=False` (then they are read into memory)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%r is not a session checkpoint' % path)
+        size,   = struct.unpack('<Q', f.read(8))
+        header  = json.loads(f.read(size))
+        start   = len(MAGIC) + 8 + size
+        arrays  = {}
+        for name, spec in header['arrays'].items():
+            dtype   = np.lib.format.descr_to_dtype(spec['dtype'])
+            shape   = tuple(spec['shape'])
+            if mmap and dtype.itemsize*int(np.prod(shape)) > 0:
+                a = np.memmap(path, dtype, 'r', start + spec['offset'], shape)
+            else:
+                f.seek(start + spec['offset'])
+                a = np.fromfile(f, dtype, int(np.prod(shape))).reshape(shape)
+            arrays[name] = a
+    return Checkpoint(path, header['meta'], arrays)
@@ -0,0 +1,242 @@
+"""
+ Material constants store
+ --------------------------------
+- ConstantsStore : flat index over data/plasticityconstants.json
+                   (model -> [variant ->] author -> material -> params/bibtex),
+                   queried by model, material, author and year, e.g. 'BCJ/4340/DK'
+
+ The index records where each params block sits in the file, so a lookup
+ reads and decodes only that block.  It is cached in `<json>.index` (keyed
+ on the file's mtime and size) and rebuilt only when the json changes.
+
+ New calibrations are appended as single lines to `<json>l` (a JSON-lines
+ journal next to the json) instead of rewriting the json; journal entries
+ override json entries with the same path.  `compact()` folds the journal
+ back into the json (atomic replace) when convenient.
+"""
+
+import json
+import os
+
+DEFAULT_PATH    = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..', '..', 'data', 'plasticityconstants.json')
+_INDEX_VERSION  = 1
+_decoder        = json.JSONDecoder()
+_WS             = b' \t\r\n'
+
+
+def _text(s):
+    """Undo the latin-1 decoding used for byte offsets (raw utf-8 in the file;
+    \\u-escaped text is already decoded)."""
+    if not isinstance(s, str): return s
+    try:
+        return s.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        return s
+
+
+def _skip(text, pos):
+    while text[pos] in ' \t\r\n': pos += 1
+    return pos
+
+
+def _scan(text, pos, path, found):
+    """Walk the object at `pos`, appending `(path, bibtex, start, end)` per params block."""
+    pos     = _skip(text, pos) + 1                  # '{'
+    bibtex  = {}
+    params  = None
+    while True:
+        pos = _skip(text, pos)
+        if text[pos] == '}': break
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip(text, _skip(text, pos) + 1)     # ':'
+        if key == 'params':
+            _, end  = _decoder.raw_decode(text, pos)
+            params  = (pos, end)
+            pos     = end
+        elif key != 'bibtex' and text[pos] == '{':
+            pos     = _scan(text, pos, path + [_text(key)], found)
+        else:
+            value, pos = _decoder.raw_decode(text, pos)
+            if key == 'bibtex': bibtex = {_text(k): _text(v) for k, v in value.items()}
+        pos = _skip(text, pos)
+        if text[pos] == ',': pos += 1
+    if params is not None:
+        found.append(('/'.join(path), bibtex) + params)
+    return pos + 1
+
+
+def _entry(path, bibtex, src, start, end):
+    keys    = path.split('/')
+    return dict(path=path, model=keys[0], variant='/'.join(keys[1:-2]),
+                author=keys[-2] if len(keys) > 2 else '', material=keys[-1],
+                authors=str(bibtex.get('authors', '')), year=str(bibtex.get('year', '')),
+                src=src, start=start, end=end)
+
+
+class ConstantsStore:
+    """Indexed, lazily loaded view of a plasticityconstants.json file.
+
+    store.find('BCJ/4340/DK')   -> index entries whose model, variant,
+                                   material or year equal every '/'-part, or
+                                   whose author key starts with it
+                                   (case-insensitive; parts of the bibtex
+                                   authors longer than 2 also match)
+    store.lookup('BCJ/4340/DK') -> the single match (or the entry at that
+                                   exact path)
+    store.get('BCJ/4340/DK')    -> (comment, params) of that entry, like
+                                   props.read_props
+    store.add(path, params, bibtex) appends a calibrated set to the journal
+
+    Entries are dicts with path, model, variant, author, material, authors
+    and year; `entries` lists them all (journal entries replace json entries
+    with the same path).
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path       = path
+        self.journal    = path + 'l'
+        self._index()
+
+    # -------- index --------
+    def _key(self):
+        st = os.stat(self.path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def _index(self):
+        key     = self._key()
+        cached  = None
+        try:
+            with open(self.path + '.index', 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if cached and cached.get('version') == _INDEX_VERSION and cached.get('key') == key:
+            base = cached['entries']
+        else:
+            with open(self.path, 'rb') as f:
+                text = f.read().decode('latin-1')   # one char per byte: offsets are file offsets
+            found = []
+            _scan(text, _skip(text, 0), [], found)
+            base = [_entry(path, bib, 'json', start, end) for path, bib, start, end in found]
+            try:
+                self._write_json(self.path + '.index', dict(version=_INDEX_VERSION, key=key, entries=base))
+            except OSError:
+                pass                                # read-only data directory: index every time
+        self._base      = base
+        self._basekey   = key
+        self._logged    = []
+        self._logpos    = 0
+        self._scan_journal()
+
+    def _scan_journal(self):
+        """Index journal lines appended since the last scan (complete lines only)."""
+        try:
+            size = os.path.getsize(self.journal)
+        except OSError:
+            size = 0
+        if size < self._logpos:                     # compacted/replaced: start over
+            self._logged, self._logpos = [], 0
+        if size > self._logpos:
+            with open(self.journal, 'rb') as f:
+                f.seek(self._logpos)
+                chunk = f.read(size - self._logpos)
+            pos = 0
+            while True:
+                end = chunk.find(b'\n', pos)
+                if end < 0: break
+                line = chunk[pos:end].strip(_WS)
+                if line:
+                    rec = json.loads(line)
+                    self._logged.append(_entry(rec['path'], rec.get('bibtex', {}), 'journal',
+                                               self._logpos + pos, self._logpos + end))
+                pos = end + 1
+            self._logpos += pos
+        latest = {e['path']: e for e in self._base + self._logged}
+        self.entries = list(latest.values())
+
+    def refresh(self):
+        """Pick up changes made by other processes."""
+        if self._key() != self._basekey:
+            self._index()
+        else:
+            self._scan_journal()
+
+    # -------- queries --------
+    def find(self, query):
+        parts = [p.lower() for p in query.strip('/').split('/') if p]
+        def hit(e, p):
+            return (p in (e['model'].lower(), e['material'].lower(), e['year'])
+                    or p in e['variant'].lower().split('/')
+                    or (e['author'] and e['author'].lower().startswith(p))
+                    or (len(p) > 2 and p in e['authors'].lower()))
+        return [e for e in self.entries if all(hit(e, p) for p in parts)]
+
+    def params(self, entry):
+        """Load one entry's parameter block (reads only its bytes)."""
+        src = self.path if entry['src'] == 'json' else self.journal
+        with open(src, 'rb') as f:
+            f.seek(entry['start'])
+            block = json.loads(f.read(entry['end'] - entry['start']))
+        if entry['src'] == 'journal': block = block['params']
+        return {name: float(v) for name, v in block.items()}
+
+    def lookup(self, query):
+        """The one entry matching `query`, or the entry whose path is `query`
+        when several match."""
+        matches = self.find(query)
+        exact   = [e for e in matches if e['path'].lower() == query.strip('/').lower()]
+        if len(matches) > 1 and exact:
+            matches = exact
+        if len(matches) != 1:
+            raise KeyError('%r matches %d entries%s' % (query, len(matches),
+                           ''.join('\n    ' + e['path'] for e in matches)))
+        return matches[0]
+
+    def get(self, query):
+        """`(comment, params)` of `lookup(query)`."""
+        e = self.lookup(query)
+        return ' '.join(s for s in (e['authors'], e['year']) if s), self.params(e)
+
+    # -------- writes --------
+    def add(self, path, params, bibtex=None):
+        """Append a calibrated set under `path` (e.g. 'BCJ/BCJMetal/KD/4340').
+
+        One complete line is written with a single O_APPEND write, so readers
+        (and concurrent writers) never see a partial entry.
+        """
+        rec     = dict(path=path.strip('/'), params={k: float(v) for k, v in params.items()},
+                       bibtex=bibtex or {})
+        line    = (json.dumps(rec) + '\n').encode('utf-8')
+        fd      = os.open(self.journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._scan_journal()
+
+    def compact(self):
+        """Merge the journal into the json and empty the journal (not safe
+        against appends from other processes while it runs)."""
+        with open(self.path, 'r', encoding='utf-8') as f:
+            tree = json.load(f)
+        for e in self._logged:
+            node = tree
+            for key in e['path'].split('/'):
+                node = node.setdefault(key, {})
+            with open(self.journal, 'rb') as f:
+                f.seek(e['start'])
+                rec = json.loads(f.read(e['end'] - e['start']))
+            node.clear()
+            node.update(params=rec['params'], bibtex=rec['bibtex'])
+        self._write_json(self.path, tree, indent=4)
+        self._write_json(self.journal, None)
+        self._index()
+
+    @staticmethod
+    def _write_json(path, obj, indent=None):
+        tmp = path + '.%d.tmp' % os.getpid()
+        with open(tmp, 'w', encoding='utf-8') as f:
+            if obj is not None: json.dump(obj, f, indent=indent)
+        os.replace(tmp, path)
@@ -0,0 +1,158 @@
+"""
+ Experimental data and model curve files
+ --------------------------------
+- read_data    : one Data_*.csv test - Strain, Stress columns, with the strain
+                 rate, temperature and name on the first row.  Columns are
+                 parsed in one pass into arrays and cached in a binary
+                 sidecar (`<file>.npy` + `<file>.npy.json`, keyed on the csv's
+                 mtime and size) that later sessions load instead
+- TestSets     : every test of a session in compact storage - strains and
+                 stresses as flat RaggedSets buffers, the conditions as one
+                 structured array (StrainRate, Temp, Name)
+- read_tests   : Data_*.csv files into a TestSets
+- write_curves : model curves as (strain, stress) column pairs, one pair per
+                 set, in the layout of the GUIs' "Export Curves" button
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+
+from .export import export_curves
+from .ragged import RaggedSets
+
+
+def conditions_dtype(width=64):
+    """Record of one test's conditions; names up to `width` characters."""
+    return np.dtype([('StrainRate', 'f8'), ('Temp', 'f8'), ('Name', 'U%d' % width)])
+
+
+def _parse(datafile):
+    """Strain/stress as one (2, n) array, plus `(rate, T, name)` from the first row."""
+    with open(datafile, 'r', newline='') as csvfile:
+        reader  = csv.reader(csvfile)
+        header  = next(reader)
+        first   = next(reader, None)
+        if first is None:
+            raise ValueError('no data rows in %r' % datafile)
+        col     = {name.strip(): k for k, name in enumerate(header)}
+        cond    = (float(first[col['Strain Rate']]), float(first[col['Temperature']]),
+                   first[col['Name']])
+        csvfile.seek(0)
+        ES      = np.loadtxt(csvfile, delimiter=',', skiprows=1, ndmin=2,
+                             usecols=(col['Strain'], col['Stress']), dtype=float)
+    return np.ascontiguousarray(ES.T), cond
+
+
+def _sidecar(datafile, cachedir):
+    if cachedir is None:
+        return datafile + '.npy'
+    return os.path.join(cachedir, os.path.basename(datafile) + '.npy')
+
+
+def read_data(datafile, scale=1., cache=True, cachedir=None):
+    """Return `(strain, stress*scale, rate, T, name)` from a Data_*.csv file.
+
+    With `cache`, the parsed columns are kept in a sidecar next to the file (or
+    in `cachedir`) and reused while the csv's mtime and size are unchanged.
+    Either way strain and stress are ordinary (writable) arrays; the sidecar
+    is not left mapped.  Sidecars that cannot be written (read-only data
+    directory) are silently skipped.
+    """
+    st      = os.stat(datafile)
+    key     = [st.st_mtime_ns, st.st_size]
+    npyfile = _sidecar(datafile, cachedir)
+    ES      = None
+    if cache:
+        try:
+            with open(npyfile + '.json', 'r') as jfile:
+                meta = json.load(jfile)
+            if meta['key'] == key:
+                ES   = np.load(npyfile, mmap_mode='r')
+                cond = (meta['rate'], meta['T'], meta['name'])
+        except (OSError, ValueError, KeyError):
+            ES = None                                   # missing or stale: parse again
+    if ES is None:
+        ES, cond = _parse(datafile)
+        if cache:
+            try:
+                _write_sidecar(npyfile, ES, dict(key=key, rate=cond[0], T=cond[1], name=cond[2]))
+            except OSError:
+                pass
+    stress  = ES[1]*scale if scale != 1. else np.array(ES[1])
+    return (np.array(ES[0]), stress) + cond
+
+
+def _write_sidecar(npyfile, ES, meta):
+    """Array first, then its key: a reader never pairs a new key with an old array."""
+    os.makedirs(os.path.dirname(os.path.abspath(npyfile)), exist_ok=True)
+    tmp = npyfile + '.%d.tmp' % os.getpid()
+    with open(tmp, 'wb') as f:
+        np.save(f, ES)
+    os.replace(tmp, npyfile)
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, npyfile + '.json')
+
+
+def write_curves(curvefile, names, E, S, label='VMstress'):
+    """Write per-set curves `E[i], S[i]`; sets may differ in length (shorter
+    columns are left blank)."""
+    export_curves(curvefile, names, {'E': E, 'VM': S}, ('E', 'VM'), {'VM': label})
+
+
+class TestSets:
+    """Tests of a session, as `read_data` tuples, in three blocks.
+
+    E, S    : RaggedSets of strain and (scaled) stress; `E[i]` is a view
+    cond    : structured array, `cond['Temp'][i]` etc., one record per test
+
+    Per-file arrays (and sidecar memory maps) are not kept, so the memory is
+    two float64 buffers the size of the data plus one small record array.
+    """
+
+    def __init__(self, tests):
+        tests       = list(tests)
+        self.E      = RaggedSets([t[0] for t in tests])
+        self.S      = RaggedSets([t[1] for t in tests])
+        width       = max([len(t[4]) for t in tests] + [1])
+        self.cond   = np.array([(t[2], t[3], t[4]) for t in tests], dtype=conditions_dtype(width))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of `arrays()`; the buffers are used as they are (no copy)."""
+        self        = cls.__new__(cls)
+        self.E      = RaggedSets.from_flat(arrays['E'], arrays['E_offsets'])
+        self.S      = RaggedSets.from_flat(arrays['S'], arrays['S_offsets'])
+        self.cond   = arrays['cond']
+        return self
+
+    def arrays(self):
+        """The five arrays that hold every test, e.g. for a checkpoint."""
+        return dict(E=self.E.flat, E_offsets=self.E.offsets, S=self.S.flat,
+                    S_offsets=self.S.offsets, cond=self.cond)
+
+    def __len__(self):
+        return len(self.cond)
+
+    @property
+    def rate(self):
+        return self.cond['StrainRate']
+
+    @property
+    def T(self):
+        return self.cond['Temp']
+
+    @property
+    def names(self):
+        return self.cond['Name'].tolist()
+
+
+def read_tests(datafiles, scale=1., cache=True, cachedir=None):
+    """`read_data` every file into one TestSets (ValueError if there are none)."""
+    tests = TestSets(read_data(f, scale, cache, cachedir) for f in datafiles)
+    if not len(tests):
+        raise ValueError('no data files')
+    return tests
@@ -0,0 +1,59 @@
+"""
+ Display decimation
+ --------------------------------
+- minmax_indices : per pixel column, the lowest and highest point in view,
+                   plus the first and last point in view
+- DecimatedLines : keep plotted data series at that view-dependent subset,
+                   recomputed on zoom/pan/resize; the full arrays are untouched
+                   (residuals and fits keep using them)
+"""
+
+import numpy as np
+
+
+def minmax_indices(x, y, xlim, ylim, buckets):
+    """Indices (in order) of the min and max `y` in each of `buckets` equal
+    `x` bins over `xlim`, and of the first and last point, counting only
+    points inside `xlim` x `ylim`."""
+    x, y    = np.asarray(x), np.asarray(y)
+    (x0, x1), (y0, y1) = sorted(xlim), sorted(ylim)
+    inside  = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+    if inside.size <= 2*buckets:
+        return inside
+    b       = ((x[inside] - x0)*(buckets/(x1 - x0))).astype(np.intp)
+    order   = np.lexsort((y[inside], b))                # by bucket, then by y
+    bs      = b[order]
+    first   = np.flatnonzero(np.r_[True, bs[1:] != bs[:-1]])
+    last    = np.r_[first[1:] - 1, bs.size - 1]
+    return np.unique(np.r_[inside[order[np.r_[first, last]]], inside[0], inside[-1]])
+
+
+class DecimatedLines:
+    """Show only `minmax_indices` of each `(x[i], y[i])` on `lines[i]`.
+
+    The subset is taken per `px` pixels of the axes width, so a series never
+    draws more than about `2*width/px + 2` markers however long it is.  Series with
+    no more points than that are drawn in full.  `points` counts what is
+    currently plotted.
+    """
+
+    def __init__(self, ax, lines, x, y, px=1):
+        self.ax     = ax
+        self.lines  = list(lines)
+        self.x      = [np.asarray(xi) for xi in x]
+        self.y      = [np.asarray(yi) for yi in y]
+        self.px     = px
+        self.points = 0
+        ax.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+        ax.callbacks.connect('ylim_changed', lambda ax: self.refresh())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        xlim, ylim  = self.ax.get_xlim(), self.ax.get_ylim()
+        buckets     = max(int(self.ax.bbox.width/self.px), 1)
+        self.points = 0
+        for line, x, y in zip(self.lines, self.x, self.y):
+            k = minmax_indices(x, y, xlim, ylim, buckets)
+            line.set_data(x[k], y[k])
+            self.points += k.size
@@ -0,0 +1,169 @@
+"""
+ Model curve export
+ --------------------------------
+- CURVE_FIELDS  : BCJCurves fields and their column labels (strain, VM stress,
+                  loading component, alpha, kappa, total)
+- export_curves : write every set's curves to .csv, .npz, .h5/.hdf5 or
+                  .parquet (chosen by extension), a chunk of points at a time
+- FORMATS       : the extensions and whether their writer can be imported
+
+Sets may have different lengths (adaptive strain grids).  The csv keeps the
+GUIs' "Export Curves" layout - a column per set and field, shorter columns
+left blank; the binary formats store one array per set and field, so nothing
+is padded.  Repeated set names get '_2', '_3', ... suffixes, as they key the
+arrays.  h5py and pyarrow are optional and imported only when used.
+"""
+
+import csv
+import os
+import zipfile
+
+import numpy as np
+
+CURVE_FIELDS    = {
+    'E'     : 'strain',
+    'VM'    : 'VMstress',
+    'S'     : 'stress',         # loading component: S11 (tension) or S12 (torsion)
+    'alph'  : 'alpha',
+    'kap'   : 'kappa',
+    'tot'   : 'total',
+}
+
+
+def _unique(names):
+    """`names` as strings, repeats suffixed '_2', '_3', ..."""
+    out, used = [], set()
+    for name in map(str, names):
+        new, k  = name, 1
+        while new in used:
+            k  += 1
+            new = '%s_%d' % (name, k)
+        used.add(new)
+        out.append(new)
+    return out
+
+
+def _columns(curves, fields):
+    """`{field: per-set arrays}` from a BCJCurves-like object or a mapping."""
+    if hasattr(curves, 'rows'):
+        return {f: curves.rows(f) for f in fields}
+    return {f: curves[f] for f in fields}
+
+
+def _scaled(a, f, scale, start=0, stop=None):
+    a = np.asarray(a[start:stop], dtype=float)
+    return a if f == 'E' or scale == 1. else a/scale
+
+
+# ------------------------------------------------
+# Writers: (path, names, cols, fields, labels, scale, chunk)
+# ------------------------------------------------
+def _write_csv(path, names, cols, fields, labels, scale, chunk):
+    slots   = [(i, fl) for i in range(len(names)) for fl in fields]     # csv columns
+    lens    = np.array([len(cols[fl][i]) for i, fl in slots], dtype=int)
+    length  = lens.max(initial=0)
+    block   = np.empty((chunk, len(lens)))
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerow(['%s-%s' % (labels[fl], name) for name in names for fl in fields])
+        for j0 in range(0, length, chunk):
+            j1  = min(j0 + chunk, length)
+            for c, (i, fl) in enumerate(slots):
+                part = _scaled(cols[fl][i], fl, scale, j0, j1)
+                block[:len(part), c] = part
+            # rows between set ends share a layout: a value, or past a set's end a blank cell
+            edges   = sorted({j0, j1}.union(lens[(lens > j0) & (lens < j1)].tolist()))
+            for r0, r1 in zip(edges[:-1], edges[1:]):
+                live    = lens > r0
+                row     = ','.join('%.17g' if a else '' for a in live) + '\n'
+                f.write(''.join(row % tuple(v) for v in block[r0 - j0:r1 - j0, live]))
+
+
+def _write_npz(path, names, cols, fields, labels, scale, chunk, compress=False):
+    mode = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, 'w', compression=mode, allowZip64=True) as zf:
+        with zf.open('names.npy', 'w') as f:
+            np.lib.format.write_array(f, np.array(names, dtype=str))
+        for i, name in enumerate(names):
+            for fl in fields:
+                a   = cols[fl][i]
+                with zf.open('%s-%s.npy' % (labels[fl], name), 'w', force_zip64=True) as f:
+                    np.lib.format.write_array_header_1_0(
+                        f, dict(descr='<f8', fortran_order=False, shape=(len(a),)))
+                    for j0 in range(0, len(a), chunk):
+                        f.write(_scaled(a, fl, scale, j0, j0 + chunk).astype('<f8').tobytes())
+
+
+def _write_hdf5(path, names, cols, fields, labels, scale, chunk):
+    import h5py
+    with h5py.File(path, 'w') as h5:
+        for i, name in enumerate(names):
+            group = h5.create_group(name)
+            for fl in fields:
+                a   = cols[fl][i]
+                ds  = group.create_dataset(labels[fl], shape=(len(a),), dtype='f8',
+                                           chunks=(max(1, min(chunk, len(a))),) if len(a) else None,
+                                           compression='gzip' if len(a) else None)
+                for j0 in range(0, len(a), chunk):
+                    ds[j0:j0 + chunk] = _scaled(a, fl, scale, j0, j0 + chunk)
+
+
+def _write_parquet(path, names, cols, fields, labels, scale, chunk):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema  = pa.schema([('set', pa.string())] + [(labels[fl], pa.float64()) for fl in fields])
+    with pq.ParquetWriter(path, schema) as writer:                  # long format, one row per point
+        for i, name in enumerate(names):
+            n = len(cols[fields[0]][i])
+            for j0 in range(0, n, chunk):
+                j1  = min(j0 + chunk, n)
+                writer.write_table(pa.table(
+                    [pa.array([name]*(j1 - j0))]
+                    + [pa.array(_scaled(cols[fl][i], fl, scale, j0, j1)) for fl in fields],
+                    schema=schema))
+
+
+def _available(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+FORMATS = {
+    '.csv'      : (_write_csv,      None),
+    '.npz'      : (_write_npz,      None),
+    '.h5'       : (_write_hdf5,     'h5py'),
+    '.hdf5'     : (_write_hdf5,     'h5py'),
+    '.parquet'  : (_write_parquet,  'pyarrow'),
+}
+
+
+def formats():
+    """Extensions whose writer can be used here (optional modules installed)."""
+    return [ext for ext, (_, module) in FORMATS.items() if module is None or _available(module)]
+
+
+def export_curves(path, names, curves, fields=tuple(CURVE_FIELDS), labels=None,
+                  scale=1., chunk=65536):
+    """Write the model curves of every set to `path`, format by extension.
+
+    curves  : BCJCurves (its `rows`), or `{field: per-set arrays}`
+    fields  : which of CURVE_FIELDS to write, strain first by convention
+    labels  : overrides of the CURVE_FIELDS labels, e.g. {'S': 'S12'}
+    scale   : stresses (every field but 'E') are divided by it, e.g. 1e6 for MPa
+    chunk   : points formatted/written per step; memory does not grow with the
+              curve length beyond one block of `chunk` x columns
+
+    Returns `path`.
+    """
+    ext     = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError('%r: unknown curve format (use %s)' % (path, ', '.join(FORMATS)))
+    writer, module = FORMATS[ext]
+    if module is not None and not _available(module):
+        raise ImportError('%s export needs the %s package' % (ext, module))
+    fields  = list(fields)
+    cols    = _columns(curves, fields)
+    writer(path, _unique(names), cols, fields, dict(CURVE_FIELDS, **(labels or {})), scale, chunk)
+    return path
@@ -0,0 +1,247 @@
+"""
+ Automatic calibration
+ --------------------------------
+- fit_JC  : multi-start Levenberg-Marquardt on the JC constants (A, B, n, C, m)
+            using the closed-form Jacobian, starts run across a worker pool
+- fit_BCJ : differential evolution on the BCJ constants C01-C20, each
+            generation's candidates evaluated across a worker pool
+- fit_BCJ_lm : local Levenberg-Marquardt on C01-C20 with the Jacobian from
+            forward sensitivities (one augmented integration per step);
+            also `fit_BCJ(..., polish=True)` on the evolution's best
+"""
+
+import os
+
+import numpy as np
+
+from .bcj import BCJ_jac_sets, run_sets
+from .jc import stress_JC_jac
+from .parallel import worker_pool
+from .postprocess import von_mises, von_mises_jac
+from .props import BCJ_NAMES, JC_NAMES
+from .ragged import RaggedSets
+from .residuals import InterpOperator
+
+# Read-only arrays handed to each worker once by the pool initializer.
+_shared     = {}
+# Lowest (A, B, n, C, m) tried: e**n and T*^m need n, m > 0 (slider ranges may go below).
+_JC_FLOOR   = np.array([-np.inf, -np.inf, 1e-6, -np.inf, 1e-6])
+
+
+def _share(arrays):
+    _shared.clear()
+    _shared.update(arrays)
+
+
+# ------------------------------------------------
+# Johnson-Cook
+# ------------------------------------------------
+def _residual_JC(p):
+    d = _shared
+    s, J = stress_JC_jac(d['e'], d['er'], d['T'], *p, d['Tr'], d['Tm'], d['er0'])
+    return d['s'] - s, J
+
+
+def _lm(residual, p0, lo, hi, maxiter, tol, floor=0.):
+    """Bounded Levenberg-Marquardt from one start; `residual(p)` returns
+    `(data - model, d model/dp)`.  `floor` keeps the damping of each
+    parameter at least `floor` times the largest (for parameters the data
+    barely sees).  Returns (p, cost, iterations)."""
+    p       = np.clip(np.asarray(p0, dtype=float), lo, hi)
+    r, J    = residual(p)
+    cost    = r @ r
+    lam     = 1e-3
+    it      = -1
+    for it in range(maxiter):
+        JJ  = J @ J.T
+        g   = J @ r                     # residual = data - model, so d(cost)/dp = -2*g
+        d   = np.diag(JJ)
+        D   = np.diag(np.maximum(d, floor*d.max())) + 1e-12*np.eye(len(p))
+        try:
+            dp = np.linalg.solve(JJ + lam*D, g)
+        except np.linalg.LinAlgError:
+            lam *= 10.; continue
+        p_new           = np.clip(p + dp, lo, hi)
+        r_new, J_new    = residual(p_new)
+        cost_new        = r_new @ r_new
+        if np.isfinite(cost_new) and cost_new < cost:
+            done = cost - cost_new <= tol*cost
+            p, r, J, cost   = p_new, r_new, J_new, cost_new
+            lam             = max(lam/3., 1e-12)
+            if done: break
+        else:
+            lam *= 4.
+            if lam > 1e12: break
+    return p, cost, it + 1
+
+
+def _lm_JC(p0, maxiter=200, tol=1e-10):
+    """Bounded Levenberg-Marquardt from one start; returns (p, cost, iterations)."""
+    return _lm(_residual_JC, p0, _shared['lo'], _shared['hi'], maxiter, tol)
+
+
+def fit_JC(e_data, s_data, er, T, p0, lo, hi, Tr, Tm, er0,
+           starts=8, workers=None, seed=None):
+    """Least-squares fit of (A, B, n, C, m) to every loaded data set at once.
+
+    e_data, s_data  : per-set experimental strain/stress arrays
+    er, T           : per-set strain rate and temperature
+    p0              : initial (A, B, n, C, m), always used as the first start
+    lo, hi          : bounds on (A, B, n, C, m), e.g. the slider ranges; n and m
+                      are kept positive whatever `lo` says
+    starts          : number of starts; the rest are drawn uniformly in [lo, hi]
+
+    The model is evaluated at the data strains directly, so the residual is the
+    same `s_err` the GUI reports but without interpolation error.  Returns
+    `(p_best, rms_best, results)` where `results` lists `(p, cost, iters)` per start.
+    """
+    data    = RaggedSets(e_data)
+    lo      = np.maximum(np.asarray(lo, dtype=float), _JC_FLOOR)
+    hi      = np.maximum(np.asarray(hi, dtype=float), lo)
+    rng     = np.random.default_rng(seed)
+    p_start = [np.asarray(p0, dtype=float)] + [lo + (hi-lo)*rng.random(len(lo))
+                                               for _ in range(starts-1)]
+    shared  = dict(e=data.flat, s=RaggedSets(s_data).flat,
+                   er=data.repeat(er), T=data.repeat(T),
+                   Tr=Tr, Tm=Tm, er0=er0, lo=lo, hi=hi)
+    with worker_pool(workers, initializer=_share, initargs=(shared,)) as pool:
+        results = list(pool.map(_lm_JC, p_start))
+    best    = min(results, key=lambda res: res[1] if np.isfinite(res[1]) else np.inf)
+    return best[0], np.sqrt(best[1]/data.flat.size), results
+
+
+# ------------------------------------------------
+# BCJ
+# ------------------------------------------------
+def _cost_BCJ(x):
+    """Normalized squared VM-stress error over every set for one candidate."""
+    d       = _shared
+    params  = dict(d['params'])
+    params.update(zip(d['names'], x))
+    err     = 0.
+    runs    = run_sets(d['BCJ'], params, d['T'], d['er'], d['emax'], d['incnum'], d['istate'])
+    for i, (EF, SF, alph, kap, tot) in enumerate(runs):
+        r   = d['s'][i] - np.interp(d['e'][i], EF[d['kS']], von_mises(SF))
+        err += r @ r
+    err /= d['ss']
+    return err if np.isfinite(err) else np.inf
+
+
+def fit_BCJ(BCJ, e_data, s_data, T, er, params0, lo, hi, incnum, istate,
+            popsize=15, maxgen=300, mutation=(0.5, 1.0), recombination=0.7,
+            tol=1e-4, workers=None, seed=None, callback=None, polish=False):
+    """Global fit of C01-C20 by differential evolution (rand/1/bin, dithered F).
+
+    BCJ             : the driver, called as BCJ(params, T, rate, emax, incnum, istate)
+    e_data, s_data  : per-set experimental strain/stress (stress in model units)
+    T, er           : per-set temperature and strain rate
+    params0         : full parameter dict (moduli are held fixed); C01-C20 seed
+                      the first population member
+    lo, hi          : bounds on C01-C20; constants with lo == hi are not varied
+    callback        : optional callback(gen, params_best, cost_best) per generation
+    polish          : refine the best member with fit_BCJ_lm, kept if `BCJ` scores
+                      it better; the steps use the built-in model's Jacobian
+                      (bcj.BCJ), so they only help drivers computing that model
+
+    The experimental arrays are handed to each worker once through the pool
+    initializer, so each task only ships one candidate vector.  The cost is
+    sum((s_data - s_model)^2) / sum(s_data^2) over every set, with the model VM
+    stress interpolated at the data strains.  Returns `(params_best, cost_best)`.
+    """
+    lo, hi  = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+    free    = hi > lo
+    names   = [name for name, f in zip(BCJ_NAMES, free) if f]
+    lo, hi  = lo[free], hi[free]
+    ndim    = len(names)
+    rng     = np.random.default_rng(seed)
+    npop    = max(popsize*ndim, 5)
+    pop     = lo + (hi-lo)*rng.random((npop, ndim))
+    pop[0]  = np.clip([params0[name] for name in names], lo, hi)
+
+    e       = RaggedSets(e_data)
+    s       = RaggedSets(s_data)
+    shared  = dict(BCJ=BCJ, names=names, params=dict(params0),
+                   e=list(e), s=list(s), emax=[ei.max() for ei in e],
+                   T=list(T), er=list(er), incnum=incnum, istate=istate,
+                   kS=0 if istate == 1 else 3, ss=s.flat @ s.flat)
+    with worker_pool(workers, initializer=_share, initargs=(shared,)) as pool:
+        chunk   = max(1, npop // (4*(workers or os.cpu_count() or 1)))
+        cost    = np.fromiter(pool.map(_cost_BCJ, pop, chunksize=chunk), float, npop)
+        for gen in range(maxgen):
+            # rand/1/bin with three distinct donors per member
+            idx     = np.array([rng.choice(np.delete(np.arange(npop), k), 3, replace=False)
+                                for k in range(npop)])
+            F       = rng.uniform(*mutation)
+            trial   = pop[idx[:, 0]] + F*(pop[idx[:, 1]] - pop[idx[:, 2]])
+            cross   = rng.random((npop, ndim)) < recombination
+            cross[np.arange(npop), rng.integers(ndim, size=npop)] = True
+            trial   = np.where(cross, trial, pop)
+            out     = (trial < lo) | (trial > hi)           # resample out-of-bounds genes
+            trial[out] = (lo + (hi-lo)*rng.random((npop, ndim)))[out]
+
+            tcost   = np.fromiter(pool.map(_cost_BCJ, trial, chunksize=chunk), float, npop)
+            better  = tcost <= cost
+            pop[better], cost[better] = trial[better], tcost[better]
+
+            best    = np.argmin(cost)
+            if callback is not None:
+                callback(gen, dict(zip(names, pop[best])), cost[best])
+            if np.isfinite(cost).all() and np.std(cost) <= tol*abs(np.mean(cost)):
+                break
+
+        best    = np.argmin(cost)
+        if polish:
+            # the steps follow the built-in model; the result is scored with `BCJ`
+            # like every member, so a driver computing another model keeps its own best
+            start       = dict(params0)
+            start.update(zip(names, pop[best]))
+            polished, _ = fit_BCJ_lm(e_data, s_data, T, er, start, lo, hi, incnum, istate,
+                                     names=names)
+            x           = np.array([polished[name] for name in names])
+            cost_lm     = pool.submit(_cost_BCJ, x).result()
+            if cost_lm < cost[best]:
+                pop[best], cost[best] = x, cost_lm
+
+    params  = dict(params0)
+    params.update(zip(names, pop[best]))
+    return params, cost[best]
+
+
+def fit_BCJ_lm(e_data, s_data, T, er, params0, lo, hi, incnum, istate,
+               maxiter=100, tol=1e-8, names=BCJ_NAMES):
+    """Local least-squares fit of C01-C20 from `params0` by bounded
+    Levenberg-Marquardt, for the built-in BCJ model at fixed increments.
+
+    Arguments and cost as fit_BCJ, without the driver (`names`: the
+    constants `lo`, `hi` belong to).  Each iteration integrates every set once, in lockstep, with its
+    forward sensitivities (bcj.BCJ_jac_sets), instead of a run per constant
+    for a finite-difference Jacobian.  Constants are scaled to [0, 1] over
+    [lo, hi]; those with lo == hi are not varied.  Returns `(params, cost)`.
+    """
+    lo, hi  = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+    free    = hi > lo
+    names   = [name for name, f in zip(names, free) if f]
+    lo, span = lo[free], (hi - lo)[free]
+    e       = RaggedSets(e_data)
+    s       = RaggedSets(s_data).flat
+    emax    = [ei.max() for ei in e]
+    kS      = 0 if istate == 1 else 3
+    norm    = 1./np.sqrt(s @ s)
+    interp  = None
+
+    def residual(x):
+        nonlocal interp
+        params  = dict(params0)
+        params.update(zip(names, lo + span*x))
+        runs    = BCJ_jac_sets(params, T, er, emax, incnum, istate, names)
+        if interp is None:  # fixed increments: the model grids never move
+            interp = InterpOperator([out[0][kS] for out, J in runs], e)
+        VM      = [von_mises(out[1]) for out, J in runs]
+        dVM     = [von_mises_jac(out[1], J['SF'], vm) for (out, J), vm in zip(runs, VM)]
+        return norm*(s - interp(VM)), (norm*interp.jac(dVM)*span).T
+
+    x0      = (np.array([params0[name] for name in names], dtype=float) - lo)/span
+    x, cost, _ = _lm(residual, x0, 0., 1., maxiter, tol, floor=1e-9)
+    params  = dict(params0)
+    params.update(zip(names, lo + span*x))
+    return params, cost if np.isfinite(cost) else np.inf
@@ -0,0 +1,113 @@
+"""
+ Johnson-Cook stress kernels
+ --------------------------------
+- stress_JC      : scalar/array JC stress for one test condition
+- stress_JC_sets : every model curve of a session in one broadcast evaluation
+- stress_JC_jac  : JC stress with closed-form derivatives w.r.t. A, B, n, C, m
+- JCTerms        : incremental evaluation, recomputing only the terms whose
+                   constants changed
+
+ s = (A + B*eps^n) * (1 + C*ln(epsr/er0)) * (1 - Tstar^m),  Tstar = (T-Tr)/(Tm-Tr)
+"""
+
+import numpy as np
+
+from .ragged import RaggedSets
+from .terms import TermCache
+
+
+# JC stress function
+def stress_JC(eps, epsr, T, A, B, n, C, m, Tr, Tm, er0):
+    # Using Tr, Tm, and er0
+    estar = epsr / er0
+    Tstar = (T-Tr)/(Tm-Tr)
+    s = (A+B*eps**(n))*(1+C*np.log(estar))*(1-Tstar**(m))
+    return s
+
+
+def stress_JC_sets(grids, er, T, A, B, n, C, m, Tr, Tm, er0, out=None):
+    """Evaluate the JC model on every set's strain grid at once.
+
+    grids   : RaggedSets (or list of 1-D arrays) of model strains, one per set
+    er, T   : strain rate and temperature of each set
+    out     : optional flat buffer (same layout as `grids.flat`) to write into
+
+    The rate/temperature factor is formed once per set and repeated onto the
+    flat strain buffer, so the whole session is a single NumPy expression.
+    Returns a list of per-set stress views into one flat array.
+    """
+    if not isinstance(grids, RaggedSets):
+        grids = RaggedSets(grids)
+    er      = np.asarray(er, dtype=float)
+    T       = np.asarray(T,  dtype=float)
+    Tstar   = (T-Tr)/(Tm-Tr)
+    factor  = (1+C*np.log(er/er0))*(1-Tstar**(m))       # one value per set
+    if out is None:
+        out = np.empty_like(grids.flat)
+    np.power(grids.flat, n, out=out)
+    out *= B
+    out += A
+    out *= grids.repeat(factor)
+    return grids.split(out)
+
+
+def stress_JC_jac(eps, epsr, T, A, B, n, C, m, Tr, Tm, er0):
+    """JC stress and its closed-form derivatives w.r.t. (A, B, n, C, m).
+
+    `eps`, `epsr` and `T` broadcast against each other (e.g. flat data strains
+    with per-point rate/temperature).  Returns `(s, J)` with `J[k]` = ds/dp_k.
+    """
+    eps     = np.asarray(eps, dtype=float)
+    lnrate  = np.log(np.asarray(epsr, dtype=float)/er0)
+    Tstar   = (np.asarray(T, dtype=float)-Tr)/(Tm-Tr)
+    epsn    = eps**(n)
+    Tstarm  = Tstar**(m)
+    hard    = A+B*epsn                          # strain term
+    rate    = 1+C*lnrate                        # rate term
+    therm   = 1-Tstarm                          # thermal term
+    lneps   = np.log(np.where(eps   > 0., eps,   1.))   # x^p*ln(x) -> 0 as x -> 0
+    lnTstar = np.log(np.where(Tstar > 0., Tstar, 1.))
+    s       = hard*rate*therm
+    J       = np.empty((5,) + s.shape)
+    J[0]    = rate*therm                        # ds/dA
+    J[1]    = epsn*rate*therm                   # ds/dB
+    J[2]    = B*epsn*lneps*rate*therm           # ds/dn
+    J[3]    = hard*lnrate*therm                 # ds/dC
+    J[4]    = -hard*rate*Tstarm*lnTstar         # ds/dm
+    return s, J
+
+
+# ------------------------------------------------
+# Incremental evaluation
+# ------------------------------------------------
+JC_GROUPS = {
+    'hard'  : ('A', 'B', 'n'),      # strain term   A + B*eps^n   (every strain point)
+    'rate'  : ('C',),               # rate term     1 + C*ln(estar)   (once per set)
+    'therm' : ('m',),               # thermal term  1 - Tstar^m       (once per set)
+}
+
+
+class JCTerms:
+    """JC model over fixed per-set strain grids, recomputing only what changed.
+
+    `eps^n` is kept until `n` moves, `A + B*eps^n` until A, B or n move, and
+    the per-set rate and thermal factors until C or m move.  Moving `m` or `C`
+    therefore costs one multiply over the grid instead of a power per point.
+    """
+
+    def __init__(self, grids, er, T, Tr, Tm, er0):
+        self.grids  = grids if isinstance(grids, RaggedSets) else RaggedSets(grids)
+        self.lnrate = np.log(np.asarray(er, dtype=float)/er0)
+        self.Tstar  = (np.asarray(T, dtype=float)-Tr)/(Tm-Tr)
+        self.terms  = terms = TermCache()
+        terms.define('epsn',  ('n',),           lambda c: self.grids.flat**(c['n']))
+        terms.define('hard',  JC_GROUPS['hard'], lambda c: c['A']+c['B']*terms.get('epsn', c))
+        terms.define('rate',  JC_GROUPS['rate'], lambda c: 1+c['C']*self.lnrate)
+        terms.define('therm', JC_GROUPS['therm'],lambda c: 1-self.Tstar**(c['m']))
+
+    def __call__(self, A, B, n, C, m, out=None):
+        """Per-set stress views for the given constants (as `stress_JC_sets`)."""
+        c       = dict(A=A, B=B, n=n, C=C, m=m)
+        factor  = self.terms.get('rate', c)*self.terms.get('therm', c)
+        out     = np.multiply(self.terms.get('hard', c), self.grids.repeat(factor), out=out)
+        return self.grids.split(out)
@@ -0,0 +1,50 @@
+"""
+ Worker pools for independent model evaluations
+ --------------------------------
+- worker_pool  : process pool whose workers start clean (forkserver/spawn)
+- exclude_main : keep those workers from re-running the `__main__` script
+"""
+
+import importlib.machinery
+import multiprocessing as mp
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# imported once by the fork server, so each worker starts with them loaded
+_PRELOAD    = ['numpy', 'calibratinator.fit', 'calibratinator.sweep', 'calibratinator.shared']
+
+
+def worker_pool(workers=None, initializer=None, initargs=()):
+    """Executor for fanning independent evaluations out across cores.
+
+    Workers are forked from a fork server where there is one (POSIX), else
+    spawned (Windows), never forked from the caller: a GUI process has
+    threads (the update scheduler, the toolkit's) whose locks a forked child
+    could inherit held, and a forked Tk/Cocoa process may crash in the child.
+    Tasks and `initializer` must therefore be importable functions (those in
+    fit, sweep, shared and batch are) and their arguments picklable.
+    `initializer(*initargs)` runs once per worker, which is where large
+    read-only arrays should be handed over.
+    """
+    if 'forkserver' in mp.get_all_start_methods():
+        ctx = mp.get_context('forkserver')
+        ctx.set_forkserver_preload(_PRELOAD)
+    else:
+        ctx = mp.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=initializer, initargs=initargs)
+
+
+def exclude_main():
+    """Start workers without re-running the `__main__` script.
+
+    A new worker first imports the parent's `__main__` (so functions defined
+    there can be unpickled); the GUI scripts open file dialogs and a window
+    at import, so they call this before anything else.  Their worker tasks
+    all live in calibratinator, so the workers need nothing from them.
+    multiprocessing skips a main module whose spec is named `__main__`.
+    Scripts run as modules (`python -m ...`) keep their spec.
+    """
+    main = sys.modules['__main__']
+    if getattr(main, '__spec__', None) is None:
+        main.__spec__ = importlib.machinery.ModuleSpec('__main__', None)
@@ -0,0 +1,114 @@
+"""
+ BCJ post-processing
+ --------------------------------
+- von_mises  : VM stress from the 6 stress components, any leading shape
+- von_mises_jac : derivatives of the VM stress from those of the components
+- BCJCurves  : preallocated per-set model buffers (E, S, VM, alph, kap, tot)
+               filled in place after every BCJ(...) call
+"""
+
+import numpy as np
+
+
+def von_mises(SF, out=None, work=None):
+    """Von Mises stress of `SF[..., 6, n]` (components 0-2 normal, 3-5 shear).
+
+    `out` and `work` are optional buffers of shape `SF[..., 0, :]`; passing
+    them keeps repeated calls allocation-free.
+    """
+    SF  = np.asarray(SF)
+    s   = [SF[..., k, :] for k in range(6)]
+    if out  is None: out  = np.empty(s[0].shape)
+    if work is None: work = np.empty(s[0].shape)
+    np.subtract(s[0], s[1], out=out);   np.square(out, out=out)
+    np.subtract(s[1], s[2], out=work);  np.square(work, out=work);  out += work
+    np.subtract(s[2], s[0], out=work);  np.square(work, out=work);  out += work
+    for k in (3, 4, 5):
+        np.square(s[k], out=work);      work *= 6.;                 out += work
+    out *= 0.5
+    np.sqrt(out, out=out)
+    return out
+
+
+
+def von_mises_jac(SF, dSF, VM=None):
+    """d(VM)/dp of shape (n, m) from `SF` (6, n) and `dSF` (6, n, m), e.g. a
+    BCJ_jac Jacobian; 0 where the VM stress is 0 (its derivative there is
+    undefined)."""
+    SF, dSF = np.asarray(SF), np.asarray(dSF)
+    VM      = von_mises(SF) if VM is None else VM
+    s       = SF[:, :, None]
+    out     = ((s[0] - s[1])*(dSF[0] - dSF[1]) + (s[1] - s[2])*(dSF[1] - dSF[2])
+               + (s[2] - s[0])*(dSF[2] - dSF[0]) + 6.*(s[3:]*dSF[3:]).sum(0))
+    return np.divide(0.5*out, VM[:, None], out=np.zeros(out.shape), where=VM[:, None] > 0.)
+
+
+class BCJCurves:
+    """Model output buffers for `sets` BCJ runs of up to `incnum1` points each.
+
+    `kS` selects the tension (0) or torsion (3) component.  Row `i` of
+    `E, S, VM, alph, kap, tot` belongs to set `i` and holds `n[i]` points;
+    sets may have different lengths (e.g. adaptive strain grids).  Rows are
+    overwritten in place and only reallocated if a run outgrows them.
+
+    `buffers` ({name: array} as described by `layout`, e.g. a SharedSlots
+    slot) makes the object a view of existing memory; those cannot grow.
+    """
+
+    fields = ('E', 'S', 'VM', 'alph', 'kap', 'tot')
+
+    @classmethod
+    def layout(cls, sets, incnum1):
+        """`{name: (shape, dtype)}` of the buffers, for `buffers=`."""
+        layout = {name: ((sets, incnum1), 'f8') for name in cls.fields}
+        layout.update(SF=((sets, 6, incnum1), 'f8'), n=((sets,), np.intp))
+        return layout
+
+    def __init__(self, sets, incnum1, kS=0, buffers=None):
+        self.kS     = kS
+        self._fixed = buffers is not None
+        if self._fixed:
+            for name in ('SF', 'n') + self.fields:
+                setattr(self, name, buffers[name])
+            self.n[:]   = 0
+            self._work  = np.zeros((sets, self.E.shape[1]))
+        else:
+            self.n      = np.zeros(sets, dtype=np.intp)
+            self._alloc(sets, incnum1)
+
+    def _alloc(self, sets, size):
+        self.SF     = np.zeros((sets, 6, size))
+        for name in self.fields:
+            setattr(self, name, np.zeros((sets, size)))
+        self._work  = np.zeros((sets, size))
+
+    def _grow(self, size):
+        if self._fixed:
+            raise ValueError('%d points do not fit the fixed BCJCurves buffers (%d)'
+                             % (size, self.E.shape[1]))
+        old = {name: getattr(self, name) for name in ('SF',) + self.fields}
+        self._alloc(len(self.n), size)
+        for name, buf in old.items():
+            getattr(self, name)[..., :buf.shape[-1]] = buf
+
+    def store(self, i, EF, SF, alph, kap, tot):
+        """Copy the raw BCJ(...) outputs of set `i` into the buffers."""
+        kS, m   = self.kS, len(kap)
+        if m > self.E.shape[1]:
+            self._grow(m)
+        self.n[i] = m
+        np.copyto(self.SF[i, :, :m],  SF)
+        np.copyto(self.E[i, :m],      EF[kS])
+        np.copyto(self.S[i, :m],      SF[kS])
+        np.copyto(self.alph[i, :m],   alph[kS])
+        np.copyto(self.kap[i, :m],    kap)
+        np.copyto(self.tot[i, :m],    tot)
+
+    def finish(self):
+        """Von Mises stress for every increment of every set in one pass."""
+        von_mises(self.SF, out=self.VM, work=self._work)
+
+    def rows(self, name):
+        """Per-set views of one buffer, trimmed to each set's length, e.g. `rows('VM')[i]`."""
+        buf = getattr(self, name)
+        return [buf[i, :m] for i, m in enumerate(self.n)]
@@ -0,0 +1,77 @@
+"""
+ Update-path profiling
+ --------------------------------
+- Profiler : named timing spans (per phase, per set) and counters, kept as
+             Chrome trace events; `dump` writes a file that chrome://tracing
+             or https://ui.perfetto.dev open directly
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class Profiler:
+    """Phase timer for the slider update path.
+
+        with prof.span('BCJ', set=i):  ...      # one timed phase
+        prof.counter('queue', depth=3)          # sampled value
+        prof.ms('BCJ')                          # last duration of a phase, ms
+
+    Spans from any thread are recorded (the trace shows one row per
+    thread).  With `enabled=False` every call is a no-op, so instrumented
+    code can stay in place.  At most `maxevents` events are kept (oldest
+    dropped).
+    """
+
+    def __init__(self, enabled=True, maxevents=200000):
+        self.enabled    = enabled
+        self.maxevents  = maxevents
+        self.events     = []
+        self._last      = {}
+        self._lock      = threading.Lock()
+        self._t0        = time.perf_counter_ns()
+        self._pid       = os.getpid()
+
+    def _now(self):
+        return (time.perf_counter_ns() - self._t0)/1000.        # trace timestamps are in us
+
+    def _add(self, event):
+        with self._lock:
+            self.events.append(event)
+            if len(self.events) > self.maxevents:
+                del self.events[:len(self.events)//10]
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name, args)
+
+    @contextlib.contextmanager
+    def _span(self, name, args):
+        t = self._now()
+        try:
+            yield
+        finally:
+            dur = self._now() - t
+            self._last[name] = dur
+            self._add(dict(name=name, ph='X', ts=t, dur=dur, pid=self._pid,
+                           tid=threading.get_ident(), args=args))
+
+    def counter(self, name, **values):
+        if not self.enabled: return
+        self._add(dict(name=name, ph='C', ts=self._now(), pid=self._pid, args=values))
+
+    def ms(self, name):
+        """Duration of the latest `name` span in ms (0 if none yet)."""
+        return self._last.get(name, 0.)/1000.
+
+    def dump(self, path):
+        """Write the events as a Chrome trace (JSON object format)."""
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+        return path
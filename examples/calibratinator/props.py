@@ -0,0 +1,80 @@
+"""
+ Props files
+ --------------------------------
+- two-column .csv: first column is the constant name, second its value
+- rows may come in any order; 'Comment' holds free text
+- read_constants : the same from a query on data/plasticityconstants.json
+- load_constants : either, from a props .csv path or a 'file.json:query' source
+- complete_props : fill optional constants a source lacks (C19, C20 = 0)
+"""
+
+import csv
+import warnings
+
+from .constants import ConstantsStore
+
+
+BCJ_NAMES   = tuple('C%02d' % i for i in range(1, 21))
+BCJ_PROPS   = BCJ_NAMES + ('Bulk Mod', 'Shear Mod')
+JC_NAMES    = ('A', 'B', 'n', 'C', 'm')
+JC_PROPS    = JC_NAMES + ('Tr', 'Tm', 'er0')
+OPTIONAL    = {'C19': 0., 'C20': 0.}    # Y_adj = C19 exp(-C20/theta) is off without them
+
+
+def read_props(propsfile, names=None):
+    """Return `(comment, {name: value})` from a props .csv file; rows not in
+    `names` (e.g. JC_PROPS) are warned about and skipped."""
+    comment, props = '', {}
+    with open(propsfile, 'r') as pfile:
+        for row in csv.reader(pfile):
+            if not row: continue
+            if row[0] == 'Comment':
+                comment = row[1]
+            elif names is not None and row[0] not in names:
+                warnings.warn('extra/incorrect row in props file: %r' % row)
+                continue
+            else:
+                props[row[0]] = float(row[1])
+    return comment, props
+
+
+def write_props(propsfile, comment, props, names):
+    """Write `props` in the order of `names`, 'Comment' row first (as `saveprops` does)."""
+    with open(propsfile, 'w', newline='') as pfile:
+        writer = csv.writer(pfile)
+        writer.writerows([['Comment', comment]] + [[name, props[name]] for name in names])
+
+
+def complete_props(props, names, source='props', strict=True):
+    """Set the OPTIONAL constants of `names` that `props` lacks to their
+    defaults, with a warning; with `strict`, a KeyError names any other
+    missing ones.  Returns `props`."""
+    missing = [name for name in names if name not in props]
+    filled  = [name for name in missing if name in OPTIONAL]
+    if filled:
+        warnings.warn('%s lacks %s; set to %s' % (source, ', '.join(filled),
+                      ', '.join(str(OPTIONAL[name]) for name in filled)))
+        props.update((name, OPTIONAL[name]) for name in filled)
+    missing = [name for name in missing if name not in OPTIONAL]
+    if strict and missing:
+        raise KeyError('%s lacks %s' % (source, ', '.join(missing)))
+    return props
+
+
+def read_constants(jsonfile, query, names=None):
+    """Return `(comment, {name: value})` for the one entry of a plasticityconstants.json
+    file matching `query`, e.g. 'JC/4340' or 'BCJ/4340/DK' (see constants.ConstantsStore);
+    OPTIONAL constants of `names` it lacks are filled in (complete_props)."""
+    comment, props = ConstantsStore(jsonfile).get(query)
+    if names is not None:
+        complete_props(props, names, query, strict=False)
+    return comment, props
+
+
+def load_constants(source, names=None):
+    """`(comment, props)` from a props .csv or 'file.json:query' source
+    (`names` as for read_props and read_constants)."""
+    path, sep, entry = source.rpartition(':')
+    if sep and path.endswith('.json'):
+        return read_constants(path, entry, names)
+    return read_props(source, names)
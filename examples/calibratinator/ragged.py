@@ -0,0 +1,54 @@
+"""
+ Ragged collections of 1-D series
+ --------------------------------
+- concatenate every set into one flat float64 buffer
+- keep the offsets so each set is handed back as a view
+"""
+
+import numpy as np
+
+
+class RaggedSets:
+    """One flat buffer holding `len(arrays)` series of (possibly) different lengths.
+
+    `flat[offsets[i]:offsets[i+1]]` is set `i`.  Per-set scalars can be broadcast
+    onto the flat layout with `repeat`, and a flat result is cut back into
+    per-set views with `split` (no copies).  Built from another RaggedSets,
+    the buffer and offsets are shared, not copied.
+    """
+
+    def __init__(self, arrays):
+        if isinstance(arrays, RaggedSets):
+            self.lengths, self.offsets, self.flat = arrays.lengths, arrays.offsets, arrays.flat
+            return
+        arrays          = [np.asarray(a, dtype=float).ravel() for a in arrays]
+        self.lengths    = np.array([a.size for a in arrays], dtype=np.intp)
+        self.offsets    = np.zeros(len(arrays) + 1, dtype=np.intp)
+        np.cumsum(self.lengths, out=self.offsets[1:])
+        self.flat       = np.concatenate(arrays) if arrays else np.zeros(0)
+
+    @classmethod
+    def from_flat(cls, flat, offsets):
+        """Sets over an existing flat buffer (e.g. a memory map); no copy."""
+        self            = cls.__new__(cls)
+        self.flat       = flat
+        self.offsets    = np.asarray(offsets, dtype=np.intp)
+        self.lengths    = np.diff(self.offsets)
+        return self
+
+    def __len__(self):
+        return self.lengths.size
+
+    def __getitem__(self, i):
+        return self.flat[self.offsets[i]:self.offsets[i+1]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def repeat(self, per_set):
+        """Broadcast one value per set onto the flat layout."""
+        return np.repeat(np.asarray(per_set, dtype=float), self.lengths)
+
+    def split(self, flat):
+        """Cut a flat array (same layout as `self.flat`) into per-set views."""
+        return [flat[self.offsets[i]:self.offsets[i+1]] for i in range(len(self))]
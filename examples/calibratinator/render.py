@@ -0,0 +1,88 @@
+"""
+ Blitted redraws
+ --------------------------------
+- BlitRenderer : keep a bitmap of everything that does not move (axes, legend,
+                 labels, data scatter) and repaint only the model lines and
+                 the slider axes on each update
+"""
+
+
+class BlitRenderer:
+    """Repaint only `artists` (e.g. the model lines) on `update()`.
+
+    The static background is grabbed after every full draw of `fig` and
+    reused until the figure is resized, an axis limit of the artists' axes
+    changes (zoom/pan) or `invalidate()` is called; the next update then does
+    a full draw instead.  `watch(sliders)` makes the sliders repaint through
+    the renderer too, so moving one no longer redraws the whole figure.
+    Artists may be whole axes (the sliders'): they are drawn with their
+    children.
+
+    Backends without blitting (or `enabled=False`) fall back to `draw_idle`.
+    """
+
+    def __init__(self, fig, artists, enabled=True):
+        self.fig        = fig
+        self.canvas     = fig.canvas
+        self.enabled    = enabled and self.canvas.supports_blit
+        self.artists    = []
+        self.blits      = 0
+        self.full_draws = 0
+        self._bg        = None
+        if not self.enabled: return
+        self.add(artists)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('resize_event', lambda event: self.invalidate(redraw=False))
+        for ax in {a.axes for a in self.artists} - {None}:     # figure texts have no axes
+            ax.callbacks.connect('xlim_changed', lambda ax: self.invalidate())
+            ax.callbacks.connect('ylim_changed', lambda ax: self.invalidate())
+
+    def add(self, artists):
+        """Mark more artists as changing (excluded from the background)."""
+        if not self.enabled: return
+        for a in artists:
+            a.set_animated(True)
+            self.artists.append(a)
+        self.artists.sort(key=lambda a: a.get_zorder())
+        self._bg = None
+
+    def watch(self, sliders, repaint=True):
+        """Repaint `sliders` (matplotlib Slider widgets) through the renderer.
+
+        Each slider's axes - fill, handle, value text and all - is animated
+        and redrawn on `update()`.  With `repaint` a change calls `update()`
+        itself; pass False when something already does after every change
+        (e.g. an UpdateScheduler's `draw`), so a frame is painted once.
+        """
+        if not self.enabled: return
+        for sl in sliders:
+            sl.drawon = False
+            self.add([sl.ax])
+            if repaint: sl.on_changed(lambda val: self.update())
+
+    def invalidate(self, redraw=True):
+        """Drop the background; the next frame is a full draw."""
+        self._bg = None
+        if redraw: self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():             # savefig renders elsewhere: grab again later
+            self._bg = None
+            return
+        self.full_draws += 1
+        self._bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for a in self.artists:
+            self.fig.draw_artist(a)
+
+    def update(self):
+        """Repaint the changing artists over the cached background."""
+        if not self.enabled or self._bg is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+        self.blits += 1
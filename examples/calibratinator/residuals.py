@@ -0,0 +1,70 @@
+"""
+ Model-vs-data residuals
+ --------------------------------
+- InterpOperator : linear interpolation from fixed per-set model strain grids
+                   to the experimental strains, built once as a sparse
+                   operator (two weights per data point) so the residuals of
+                   any new model curve are one gather-multiply-add
+"""
+
+import numpy as np
+
+from .ragged import RaggedSets
+
+
+class InterpOperator:
+    """`np.interp(points[i], grids[i], model[i])` for every set at once.
+
+    grids   : per-set model strain grids (increasing), fixed for the operator
+    points  : per-set data strains
+    values  : optional per-set data (e.g. stress) for `residual` and `errors`
+
+    Row `r` of the operator has weights `w0[r], w1[r]` at flat model indices
+    `i0[r], i0[r]+1`; points beyond a grid take its end value, as np.interp.
+    """
+
+    def __init__(self, grids, points, values=None):
+        self.grids  = RaggedSets(grids)
+        self.points = RaggedSets(points)
+        self.values = None if values is None else RaggedSets(values).flat
+        i0, w1      = [], []
+        for g, x, off in zip(self.grids, self.points, self.grids.offsets):
+            j   = np.clip(np.searchsorted(g, x, 'right') - 1, 0, max(g.size - 2, 0))
+            if g.size > 1:
+                w = np.clip((x - g[j])/(g[j+1] - g[j]), 0., 1.)
+            else:
+                w = np.zeros(x.size)
+            i0.append(j + off)
+            w1.append(w)
+        self.i0     = np.concatenate(i0).astype(np.intp)
+        self.w1     = np.concatenate(w1)
+        self.w0     = 1. - self.w1
+        self.i1     = np.minimum(self.i0 + 1, self.grids.flat.size - 1)
+
+    def matches(self, grids):
+        """True if `grids` are the grids this operator was built for."""
+        return (len(grids) == len(self.grids)
+                and all(np.array_equal(g, h) for g, h in zip(grids, self.grids)))
+
+    def __call__(self, model):
+        """Model values at the data points (flat), from per-set or flat `model`."""
+        flat = model if isinstance(model, np.ndarray) and model.ndim == 1 else np.concatenate(model)
+        return flat[self.i0]*self.w0 + flat[self.i1]*self.w1
+
+    def jac(self, dmodel):
+        """Derivatives at the data points, (points, m), from per-set model
+        derivatives (n_i, m) on the grids - the operator is linear."""
+        flat = np.concatenate(dmodel)
+        return flat[self.i0]*self.w0[:, None] + flat[self.i1]*self.w1[:, None]
+
+    def residual(self, model):
+        """`values - model` at the data points (flat)."""
+        return self.values - self(model)
+
+    def errors(self, model):
+        """Per-set RMS and maximum absolute residual (every set needs a data point)."""
+        r       = self.residual(model)
+        start   = self.points.offsets[:-1]
+        rms     = np.sqrt(np.add.reduceat(r*r, start)/self.points.lengths)
+        emax    = np.maximum.reduceat(np.abs(r), start)
+        return rms, emax
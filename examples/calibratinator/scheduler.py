@@ -0,0 +1,156 @@
+"""
+ Slider-update scheduling
+ --------------------------------
+- UpdateScheduler : evaluate the model on a background thread, always for the
+                    newest slider state only, and hand finished curves back to
+                    the GUI thread
+- PreviewUpdates  : coarse-resolution states while a slider is moving, the
+                    full-resolution state once it has been idle
+"""
+
+import threading
+
+
+class UpdateScheduler:
+    """Coalescing, latest-state-wins scheduler for slider updates.
+
+    compute(state, cancelled) -> result
+        Runs on the worker thread.  Long computations should return early
+        (any value) once `cancelled()` is true; that result is discarded.
+    apply(result)
+        Runs on the GUI thread from `poll()` (e.g. `set_ydata`).
+    draw()
+        Optional; runs on the GUI thread once per `poll()` that applied a
+        result or follows a submit (e.g. a blitted repaint, so a moved slider
+        and its new curves share one frame).
+
+    `submit` never blocks: it replaces whatever state is waiting, and marks
+    any computation in flight as stale.  With `threaded=False` both steps
+    run inline in `submit`, which is handy for headless use.
+    """
+
+    def __init__(self, compute, apply, threaded=True, draw=None):
+        self.compute    = compute
+        self.apply      = apply
+        self.draw       = draw
+        self.threaded   = threaded
+        self.submitted  = 0             # generation of the newest state
+        self.applied    = 0             # generation of the last applied result
+        self._state     = None
+        self._result    = None          # (generation, result) waiting for poll()
+        self._busy      = False
+        self._dirty     = False         # submitted since the last draw
+        self._closed    = False
+        self._cond      = threading.Condition()
+        self._thread    = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def depth(self):
+        """States submitted but not yet drawn."""
+        return self.submitted - self.applied
+
+    def submit(self, state):
+        with self._cond:
+            self.submitted += 1
+            self._state     = (self.submitted, state)
+            self._dirty     = True
+            self._cond.notify()
+        if not self.threaded:
+            self._run_once()
+            self.poll()
+
+    def _cancelled(self, generation):
+        return lambda: self._closed or generation != self.submitted
+
+    def _run_once(self):
+        with self._cond:
+            if self._state is None: return
+            generation, state = self._state
+            self._state = None
+            self._busy  = True
+        result = self.compute(state, self._cancelled(generation))
+        with self._cond:
+            self._busy = False
+            if generation == self.submitted:    # drop stale results
+                self._result = (generation, result)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._state is None and not self._closed:
+                    self._cond.wait()
+                if self._closed: return
+            self._run_once()
+
+    def poll(self):
+        """Apply the newest finished result, if any, then draw (call from the
+        GUI thread).  Returns whether a result was applied."""
+        with self._cond:
+            pending, self._result = self._result, None
+            dirty, self._dirty    = self._dirty, False
+        applied = pending is not None and pending[0] == self.submitted
+        if applied:
+            self.apply(pending[1])
+            self.applied = pending[0]
+        if (applied or dirty) and self.draw is not None:
+            self.draw()
+        return applied
+
+    def attach(self, fig, interval=25):
+        """Poll from a GUI timer of `fig`'s canvas every `interval` ms."""
+        self._timer = fig.canvas.new_timer(interval=interval)
+        self._timer.add_callback(self.poll)
+        self._timer.start()
+        return self._timer
+
+    def wait(self, timeout=None):
+        """Block until the newest state has been computed, then apply it."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or (self._state is None and not self._busy),
+                                timeout)
+        return self.poll()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class PreviewUpdates:
+    """Coarse-to-fine front end for an UpdateScheduler.
+
+    `submit(state)` sends `(state, True)` - evaluate a preview - at once, and
+    `(state, False)` - full resolution - when no further submit has come for
+    `idle` seconds or the mouse button is released (end of a slider drag).
+    `refine()` sends the pending full-resolution state right away.  With
+    `enabled=False` every state goes straight out as `(state, False)`.
+    """
+
+    def __init__(self, scheduler, fig, idle=0.3, enabled=True):
+        self.scheduler  = scheduler
+        self.enabled    = enabled
+        self._state     = None
+        self._timer     = fig.canvas.new_timer(interval=max(int(idle*1000), 1))
+        self._timer.single_shot = True
+        self._timer.add_callback(self.refine)
+        fig.canvas.mpl_connect('button_release_event', lambda event: self.refine())
+
+    def submit(self, state):
+        if not self.enabled:
+            self.scheduler.submit((state, False))
+            return
+        self._state = state
+        self.scheduler.submit((state, True))
+        self._timer.stop()
+        self._timer.start()
+
+    def refine(self):
+        if self._state is None: return False
+        state, self._state = self._state, None
+        self._timer.stop()
+        self.scheduler.submit((state, False))
+        return True
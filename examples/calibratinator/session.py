@@ -0,0 +1,332 @@
+"""
+ Calibration sessions
+ --------------------------------
+- JCSession  : the data and model of a JC-GUI session - tests, fixed model
+               strain grids, incremental JC evaluation, errors and fit
+- BCJSession : the same for the BCJ-GUI - tests, cached (lockstep) BCJ runs
+               into BCJCurves buffers, VM errors and fit
+
+Either session saves itself to one checkpoint file (`save`) and reopens
+from it (`load`) without parsing a csv or, for BCJ, integrating a set again.
+
+Everything the GUI scripts compute lives here, without tkinter or
+matplotlib, so a session can be driven from another program, a notebook
+or a worker process; the GUIs only add the file dialogs, plot and sliders.
+"""
+
+import functools
+import gc
+import os
+
+import numpy as np
+
+from .bcj import select_driver
+from .cache import ResultCache, cached_BCJ
+from .checkpoint import Checkpoint, read_checkpoint, write_checkpoint
+from .data import TestSets, read_tests
+from .fit import fit_BCJ, fit_JC
+from .jc import JCTerms
+from .postprocess import BCJCurves
+from .profiling import Profiler
+from .props import JC_NAMES
+from .ragged import RaggedSets
+from .residuals import InterpOperator
+
+
+def _tests(datafiles, scale, cache):
+    if isinstance(datafiles, TestSets):
+        return datafiles
+    return read_tests(datafiles, scale, cache)
+
+
+# POSIX replaces a memory-mapped file (the maps keep the old data); Windows does not
+_REPLACE_MAPPED = os.name != 'nt'
+
+
+def _release(session, path):
+    """Before `session` saves to `path`: if that is the checkpoint it maps and
+    the file cannot be replaced while mapped, copy the mapped data into
+    memory and close the maps."""
+    source  = getattr(session, 'checkpoint', None)
+    if (_REPLACE_MAPPED or source is None or not source.mapped or not os.path.exists(path)
+            or not os.path.samefile(path, source.path)):
+        return
+    session._unmap()
+    source.close()
+    gc.collect()
+
+
+def _in_memory(tests):
+    return TestSets.from_arrays({k: np.array(a) for k, a in tests.arrays().items()})
+
+
+def _save(path, session, kind, values, arrays, meta):
+    arrays  = dict({'tests/' + k: a for k, a in session.tests.arrays().items()}, **arrays)
+    meta    = dict(meta, kind=kind, config=session.config, values=values)
+    return write_checkpoint(path, meta, arrays)
+
+
+def _open(path, kind, mmap):
+    checkpoint = path if isinstance(path, Checkpoint) else read_checkpoint(path, mmap)
+    if checkpoint.meta.get('kind') != kind:
+        raise ValueError('%r is not a %s session checkpoint' % (checkpoint.path, kind))
+    return checkpoint
+
+
+class JCSession:
+    """JC model over every test of a session.
+
+    props   : A, B, n, C, m (initial values) and Tr, Tm, er0
+    de      : model strain increment; grid i runs 0 .. max(e_data[i])
+    preview : `preview=True` calls use a `preview` times coarser increment
+
+    Attributes: tests (TestSets, or pass one as `datafiles`), its e_data,
+    s_data (MPa, RaggedSets), er, T and names, sets, grids (RaggedSets),
+    terms (JCTerms) and interp (InterpOperator grids -> data strains).
+    """
+
+    def __init__(self, props, datafiles, de=0.01, cache=True, preview=4):
+        self.props  = dict(props)
+        self.config = dict(de=de, preview=preview)
+        self.tests  = tests = _tests(datafiles, 1., cache)
+        self.e_data, self.s_data, self.er, self.T = tests.E, tests.S, tests.rate, tests.T
+        self.names  = tests.names
+        self.sets   = len(tests)
+        self.de     = de
+        self.grids, self.terms, self.interp = self._model(de)
+        self.preview_de = de*preview
+        self._preview   = None
+
+    def __reduce__(self):
+        # for worker processes: rebuilt from the tests and settings, nothing cached
+        return functools.partial(type(self), **self.config), (self.props, self.tests)
+
+    def _model(self, de):
+        grids   = RaggedSets([np.linspace(0, e.max(), max(int(e.max()/de), 2)) for e in self.e_data])
+        terms   = JCTerms(grids, self.er, self.T, self.props['Tr'], self.props['Tm'], self.props['er0'])
+        return grids, terms, InterpOperator(grids, self.e_data, self.s_data)
+
+    def resolution(self, preview=False):
+        """`(grids, terms, interp)` at full or preview resolution (built on first use)."""
+        if not preview:
+            return self.grids, self.terms, self.interp
+        if self._preview is None:
+            self._preview = self._model(self.preview_de)
+        return self._preview
+
+    @property
+    def p0(self):
+        return [self.props[name] for name in JC_NAMES]
+
+    def model(self, A, B, n, C, m, preview=False):
+        """Per-set model stress on `grids` (views into one flat buffer)."""
+        return self.resolution(preview)[1](A, B, n, C, m)
+
+    def layout(self):
+        return {'s': ((self.grids.flat.size,), 'f8')}
+
+    def outputs(self, arrays=None):
+        """Flat stress buffer for `curves` (in `arrays`, a SharedSlots slot, if given)."""
+        return np.empty(self.grids.flat.size) if arrays is None else arrays['s']
+
+    def curves(self, p, out=None, cancelled=None, preview=False):
+        """`model(*p)` written into the front of `out`; per-set views."""
+        grids, terms, _ = self.resolution(preview)
+        return terms(*p, out=None if out is None else out[:grids.flat.size])
+
+    def errors(self, s, preview=False):
+        """Per-set `(rms, max)` of data - model at the data strains."""
+        return self.resolution(preview)[2].errors(s)
+
+    def _unmap(self):
+        self.tests      = _in_memory(self.tests)
+        self.e_data, self.s_data, self.er, self.T = (self.tests.E, self.tests.S,
+                                                     self.tests.rate, self.tests.T)
+        self.grids, self.terms, self.interp = self._model(self.de)
+        self._preview   = None
+
+    def save(self, path, values, **meta):
+        """Checkpoint the tests, props, constants `values` ({name: value})
+        with their model curves and errors; `meta` (JSON-able) is kept too."""
+        _release(self, path)
+        s           = self.model(*(values[name] for name in JC_NAMES))
+        rms, emax   = self.errors(s)
+        arrays      = {'model/E': self.grids.flat, 'model/E_offsets': self.grids.offsets,
+                       'model/S': np.concatenate(s), 'errors/rms': rms, 'errors/max': emax}
+        return _save(path, self, 'JC', dict(values), arrays, dict(meta, props=self.props))
+
+    @classmethod
+    def load(cls, path, mmap=True, **kwargs):
+        """Session from a `save` checkpoint file or a read Checkpoint (data
+        memory-mapped unless `mmap=False`); `kwargs` override the saved
+        settings.  The checkpoint is kept as `.checkpoint` (`meta['values']`
+        etc.), see `saved_model`."""
+        checkpoint  = _open(path, 'JC', mmap)
+        session     = cls(checkpoint.meta['props'], checkpoint.tests,
+                          **dict(checkpoint.meta['config'], **kwargs))
+        session.checkpoint = checkpoint
+        return session
+
+    def saved_model(self, values):
+        """The checkpointed model curves (per set, in memory) if the session
+        was loaded from a checkpoint saved at `values` (A, B, n, C, m) with
+        the same props and grids, else None."""
+        c = getattr(self, 'checkpoint', None)
+        if (c is None or 'model/S' not in c.arrays or c.meta['props'] != self.props
+                or [c.meta['values'][name] for name in JC_NAMES] != list(values)
+                or not np.array_equal(c.arrays['model/E_offsets'], self.grids.offsets)
+                or not np.array_equal(c.arrays['model/E'], self.grids.flat)):
+            return None
+        return self.grids.split(np.array(c.arrays['model/S']))
+
+    def fit(self, p0, lo, hi, **kwargs):
+        """`fit_JC` over every test; returns `(p, rms, results)`."""
+        return fit_JC(self.e_data, self.s_data, self.er, self.T, p0, lo, hi,
+                      self.props['Tr'], self.props['Tm'], self.props['er0'], **kwargs)
+
+
+class BCJSession:
+    """BCJ model over every test of a session.
+
+    params      : C01-C20 and the moduli
+    scale       : data stress to model units (1e6: MPa data, Pa model)
+    tol         : adaptive strain steps (see bcj.BCJ); grids then vary per update
+    driver      : BCJ(params, T, rate, emax, incnum, istate) to use; by default
+                  `bcj.select_driver`: the calibratinator.bcj port, checked
+                  against BCJ_Basic_v2 on these tests where that can be
+                  imported (BCJ_Basic_v2 if they differ, or with `basic`;
+                  adaptive `tol` always takes the port)
+    terms       : a BCJTerms port keeping the per-set factors
+    batch       : integrate all sets in lockstep (one vectorized run)
+    preview     : `preview=True` runs take `preview` times fewer increments
+                  (or a `preview` times looser tol)
+
+    Attributes as JCSession (tests, e_data, s_data in model units, rate, T).
+    Results are memoized in `cache` (ResultCache), so repeated parameter
+    states cost a lookup.  `prof` (a Profiler) may be replaced to time runs.
+    """
+
+    def __init__(self, params, datafiles, incnum=200, istate=1, tol=None, scale=1e6,
+                 cache=True, cache_size=512, cache_dir=None, driver=None, batch=True,
+                 preview=4, basic=False, terms=False):
+        self.params = dict(params)
+        self.config = dict(incnum=incnum, istate=istate, tol=tol, scale=scale, cache_size=cache_size,
+                           batch=batch, preview=preview, basic=basic, terms=terms)
+        self.tests  = tests = _tests(datafiles, scale, cache)
+        self.e_data, self.s_data, self.rate, self.T = tests.E, tests.S, tests.rate, tests.T
+        self.names  = tests.names
+        self.sets   = len(tests)
+        self.emax   = [e.max() for e in self.e_data]
+        self.incnum = incnum
+        self.istate = istate
+        self.kS     = 0 if istate == 1 else 3
+        self.scale  = scale
+        self.batch  = batch
+        self.kwargs = {} if tol is None else {'tol': tol}
+        self.preview_incnum = max(incnum//preview, 2)
+        self.preview_kwargs = {} if tol is None else {'tol': tol*preview}
+        self.BCJ    = driver if driver is not None else select_driver(
+            self.T, self.rate, basic, terms, self.params, self.emax, incnum, istate, tol)
+        self.cache  = ResultCache(cache_size, cache_dir)
+        self.run    = cached_BCJ(self.BCJ, self.cache)
+        self.prof   = Profiler(enabled=False)
+        self._interps   = []    # full and preview grids' operators
+
+    def __reduce__(self):
+        # for worker processes: rebuilt from the tests, settings and driver (the disk cache is shared)
+        return (functools.partial(type(self), driver=self.BCJ, cache_dir=self.cache.cachedir,
+                                  **self.config), (self.params, self.tests))
+
+    def new_curves(self):
+        return BCJCurves(self.sets, self.incnum + 1, self.kS)
+
+    def layout(self):
+        if self.kwargs:
+            raise ValueError('adaptive strain grids (tol) have no fixed curve layout')
+        return BCJCurves.layout(self.sets, self.incnum + 1)
+
+    def outputs(self, arrays=None):
+        """BCJCurves for `curves` (over `arrays`, a SharedSlots slot, if given)."""
+        if arrays is None: return self.new_curves()
+        return BCJCurves(self.sets, self.incnum + 1, self.kS, buffers=arrays)
+
+    def curves(self, params, out=None, cancelled=lambda: False, preview=False):
+        """Model curves of every set in `out` (a BCJCurves, new if None);
+        None if `cancelled()` turns true between sets."""
+        out     = self.new_curves() if out is None else out
+        prof    = self.prof
+        incnum  = self.preview_incnum if preview else self.incnum
+        kwargs  = self.preview_kwargs if preview else self.kwargs
+        if self.batch:  # one vectorized integration of every set missing from the cache
+            with prof.span('BCJ', sets=self.sets, preview=preview):
+                runs = self.run.sets(params, self.T, self.rate, self.emax, incnum,
+                                     self.istate, **kwargs)
+            for i, run in enumerate(runs):
+                out.store(i, *run)
+        else:
+            for i in range(self.sets):
+                if cancelled(): return None
+                with prof.span('BCJ', set=i, preview=preview):
+                    out.store(i, *self.run(params, self.T[i], self.rate[i], self.emax[i],
+                                           incnum, self.istate, **kwargs))
+        with prof.span('von_mises'):
+            out.finish()    # VM stress for all increments and all sets at once
+        return out
+
+    def errors(self, curves):
+        """Per-set `(rms, max)` VM error in data units; the interpolation to
+        the data strains is rebuilt only when the model grids change (the
+        last two are kept: full resolution and preview)."""
+        E = curves.rows('E')
+        for interp in self._interps:
+            if interp.matches(E): break
+        else:
+            interp = InterpOperator(E, self.e_data, self.s_data)
+            self._interps = [interp] + self._interps[:1]
+        rms, emax = interp.errors(curves.rows('VM'))
+        return rms/self.scale, emax/self.scale
+
+    def _unmap(self):
+        self.tests      = _in_memory(self.tests)
+        self.e_data, self.s_data, self.rate, self.T = (self.tests.E, self.tests.S,
+                                                       self.tests.rate, self.tests.T)
+        self._interps   = []
+        entries         = [(key, [np.array(a) for a in value]) for key, value in self.cache.entries()]
+        for _, value in entries:
+            for a in value: a.flags.writeable = False
+        self.cache.load(entries)
+
+    def save(self, path, values, **meta):
+        """Checkpoint the tests, params, current `values` (C01-C20 and
+        moduli), their curves and errors and every cached BCJ run (the run
+        at `values` is cached first), plus `meta` (JSON-able)."""
+        _release(self, path)
+        curves      = self.curves(values)
+        rms, emax   = self.errors(curves)
+        size        = max(curves.n.max(), 1)
+        arrays      = {'curves/' + f: getattr(curves, f)[:, :size] for f in curves.fields}
+        arrays.update({'curves/n': curves.n, 'errors/rms': rms, 'errors/max': emax})
+        entries     = self.cache.entries()
+        for i, (key, value) in enumerate(entries):
+            arrays.update(('cache/%d/%d' % (i, k), a) for k, a in enumerate(value))
+        meta        = dict(meta, params=self.params, cache=[[key, len(value)] for key, value in entries])
+        return _save(path, self, 'BCJ', dict(values), arrays, meta)
+
+    @classmethod
+    def load(cls, path, mmap=True, **kwargs):
+        """Session from a `save` checkpoint, its BCJ runs back in the cache
+        (memory-mapped unless `mmap=False`), so redrawing the saved state
+        integrates nothing.  `kwargs` override the saved settings (e.g.
+        `driver=`); the checkpoint is kept as `.checkpoint`."""
+        checkpoint  = _open(path, 'BCJ', mmap)
+        session     = cls(checkpoint.meta['params'], checkpoint.tests,
+                          **dict(checkpoint.meta['config'], **kwargs))
+        session.cache.load((key, [checkpoint.arrays['cache/%d/%d' % (i, k)] for k in range(n)])
+                           for i, (key, n) in enumerate(checkpoint.meta['cache']))
+        session.checkpoint = checkpoint
+        return session
+
+    def fit(self, params0, lo, hi, **kwargs):
+        """`fit_BCJ` over every test; returns `(params, cost)`."""
+        return fit_BCJ(self.BCJ, self.e_data, self.s_data, self.T, self.rate, params0, lo, hi,
+                       self.incnum, self.istate, **kwargs)
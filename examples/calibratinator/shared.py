@@ -0,0 +1,172 @@
+"""
+ Model outputs shared between compute workers and the GUI
+ --------------------------------
+- SharedSlots : triple-buffered named arrays in one shared memory segment,
+                with a generation counter per slot
+- SlotCompute : UpdateScheduler compute step that writes a session's curves
+                into a free slot - inline, or in a worker process so
+                only the slot number crosses the process boundary
+
+One writer and one reader: the writer never touches the slot last published
+nor the one the reader holds, so curves are written in place and read
+without copying or pickling.
+"""
+
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .parallel import worker_pool
+
+_ALIGN      = 64
+
+
+class SharedSlots:
+    """`slots` copies of the arrays in `layout` ({name: (shape, dtype)}).
+
+        slot = slots.acquire()          # writer: neither published nor being read
+        ...write slots[slot] in place...
+        slots.publish(slot)
+        arrays = slots.read(slot)       # reader: None if a newer slot was published
+
+    `header` (in the segment, so a forked process sees it) holds the
+    published slot, the slot being read and each slot's generation.  With
+    `shared=False` the arrays are ordinary process memory.  Slot bookkeeping
+    is done in the owning process only; pickled (e.g. as a worker's
+    initializer argument), shared slots attach to the same segment by `name`.
+    """
+
+    def __init__(self, layout, slots=3, shared=True, name=None):
+        self.layout     = {name: (tuple(shape), np.dtype(dtype)) for name, (shape, dtype) in layout.items()}
+        offsets, size   = {}, 0
+        for field, (shape, dtype) in self.layout.items():
+            offsets[field] = size
+            size   += -(-int(np.prod(shape))*dtype.itemsize//_ALIGN)*_ALIGN
+        head        = _ALIGN*(-(-(2 + slots)*8//_ALIGN))
+        total       = head + slots*size
+        self._owner = name is None
+        if not shared:
+            self._shm   = None
+        elif self._owner:
+            self._shm   = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        else:
+            self._shm   = shared_memory.SharedMemory(name)
+        buf         = self._shm.buf if shared else bytearray(max(total, 1))
+        self.header = np.ndarray((2 + slots,), np.int64, buf)    # published, reading, generations
+        if self._owner:
+            self.header[:2] = -1
+            self.header[2:] = 0
+        self._slots = [{name: np.ndarray(shape, dtype, buf, head + k*size + offsets[name])
+                        for name, (shape, dtype) in self.layout.items()} for k in range(slots)]
+        self._lock  = threading.Lock()
+        self.generation = 0
+
+    def __reduce__(self):
+        if self._shm is None:
+            raise TypeError('process-local SharedSlots cannot be pickled')
+        return SharedSlots, (self.layout, len(self._slots), True, self._shm.name)
+
+    @property
+    def name(self):
+        return None if self._shm is None else self._shm.name
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __getitem__(self, slot):
+        return self._slots[slot]
+
+    def acquire(self):
+        with self._lock:
+            busy = {int(self.header[0]), int(self.header[1])}
+            return next(k for k in range(len(self._slots)) if k not in busy)
+
+    def publish(self, slot):
+        with self._lock:
+            self.generation += 1
+            self.header[2 + slot] = self.generation
+            self.header[0] = slot
+
+    def read(self, slot):
+        """Hold `slot` for reading, if it is still the newest published one."""
+        with self._lock:
+            if slot != self.header[0]: return None
+            self.header[1] = slot
+        return self._slots[slot]
+
+    def close(self):
+        """Release the segment (it is freed once every view of it is gone);
+        only the creating process removes it."""
+        if self._shm is None: return
+        self.header = self._slots = None
+        try:
+            self._shm.close()
+        except BufferError:     # views still referenced elsewhere
+            pass
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+# ------------------------------------------------
+# Worker side: the session is rebuilt and the slots attached in the worker
+# ------------------------------------------------
+_worker     = {}
+
+
+def _attach(session, slots):
+    _worker.update(session=session, slots=slots,
+                   outputs=[session.outputs(slots[k]) for k in range(len(slots))])
+
+
+def _evaluate(args, slot, preview):
+    _worker['session'].curves(args, _worker['outputs'][slot], preview=preview)
+    return slot
+
+
+class SlotCompute:
+    """`compute(state, cancelled)` for an UpdateScheduler over a JC/BCJSession.
+
+    `state` is `(args, preview)` as sent by PreviewUpdates; the curves go into
+    a free slot of `session.outputs(...)` and the result is `(slot, preview)`
+    (None if cancelled).  On the GUI thread `read(result)` returns that slot's
+    outputs - a BCJCurves or a flat JC stress buffer - or None if a newer
+    result was published meanwhile.
+
+    With `process=True` the session is evaluated in one worker process (see
+    parallel.worker_pool; the session is pickled to it once) over
+    SharedSlots(session.layout()); otherwise inline on the calling
+    (scheduler) thread, over growable per-slot buffers.
+    """
+
+    def __init__(self, session, process=False, slots=3):
+        self.session    = session
+        self.process    = process
+        self.slots      = SharedSlots(session.layout() if process else {}, slots, shared=process)
+        self.outputs    = [session.outputs(self.slots[k] if process else None) for k in range(slots)]
+        self._pool      = None
+        if process:
+            self._pool  = worker_pool(1, initializer=_attach, initargs=(session, self.slots))
+            self._pool.submit(int).result()     # start it now, not on the first update
+
+    def __call__(self, state, cancelled=lambda: False):
+        args, preview = state
+        slot    = self.slots.acquire()
+        if self._pool is not None:
+            self._pool.submit(_evaluate, args, slot, preview).result()
+        elif self.session.curves(args, self.outputs[slot], cancelled, preview) is None:
+            return None
+        if cancelled(): return None
+        self.slots.publish(slot)
+        return slot, preview
+
+    def read(self, result):
+        if result is None or self.slots.read(result[0]) is None: return None
+        return self.outputs[result[0]]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self.slots.close()
@@ -0,0 +1,285 @@
+"""
+ Parameter sweeps
+ --------------------------------
+- grid_samples  : full-factorial grid over named constants
+- lhs_samples   : Latin-hypercube sample over the same box
+- sweep_JC      : per-set RMS error of thousands of JC constant sets, each
+                  chunk one broadcast (samples x data points) evaluation
+- sweep_BCJ     : the same for BCJ, chunks of samples across a worker pool
+- run_sweep     : stream either sweep into a (samples, names + sets + total)
+                  .npy file (memory-mapped), so the sweep never sits in memory
+- load_sweep    : that table back, memory-mapped, with its column names
+- heatmap       : lowest error per cell of a 2-D plane (e.g. A-B, C01-C02);
+                  plot_heatmap saves it as an image (matplotlib imported there only)
+- main          : command line, see `python -m calibratinator.sweep -h`
+
+Errors are RMS of (data - model) at the data strains, per set and over every
+set, in the data's units.  Constants not swept keep their props values.
+
+Example (from the examples/ directory):
+    python -m calibratinator.sweep JC Props_JC_4340.csv "4340/Data_*.csv" \\
+        -p A:700:1100 -p B:200:800 --grid 60 -o jc_AB.npy --plot A,B jc_AB.png
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+
+from .batch import SCALE
+from .bcj import run_sets, select_driver
+from .data import read_tests
+from .jc import stress_JC
+from .parallel import worker_pool
+from .postprocess import von_mises
+from .props import BCJ_PROPS, JC_PROPS, load_constants
+from .ragged import RaggedSets
+
+# Read-only arrays handed to each worker once by the pool initializer.
+_shared     = {}
+
+
+def _share(arrays):
+    _shared.clear()
+    _shared.update(arrays)
+
+
+def grid_samples(lo, hi, n):
+    """`(prod(n), k)` grid points; `n` is per constant or one count for all."""
+    n       = np.broadcast_to(n, len(lo))
+    axes    = [np.linspace(a, b, m) for a, b, m in zip(lo, hi, n)]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), -1).reshape(-1, len(lo))
+
+
+def lhs_samples(lo, hi, n, seed=None):
+    """`(n, k)` Latin-hypercube sample: each constant's range is cut into `n`
+    strata and every stratum is hit exactly once."""
+    lo, hi  = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+    rng     = np.random.default_rng(seed)
+    u       = (rng.permuted(np.tile(np.arange(n), (lo.size, 1)), axis=1).T
+               + rng.random((n, lo.size)))/n
+    return lo + (hi - lo)*u
+
+
+def _set_rms(r, data):
+    """Per-set and total RMS of residual rows `r` (samples, flat data points)."""
+    ss      = np.add.reduceat(r*r, data.offsets[:-1], axis=1)
+    total   = np.sqrt(ss.sum(1)/data.flat.size)
+    return np.column_stack([np.sqrt(ss/data.lengths), total])
+
+
+# ------------------------------------------------
+# Johnson-Cook
+# ------------------------------------------------
+def sweep_JC(e_data, s_data, er, T, props, names, samples, max_bytes=64 << 20):
+    """Errors of the JC model for every row of `samples` (values of `names`).
+
+    props   : every JC constant (A, B, n, C, m, Tr, Tm, er0); swept ones are
+              replaced per row
+    max_bytes bounds the (chunk, data points) work arrays.
+
+    Yields `(start, errors)` chunks in order, `errors` shaped (rows, sets + 1):
+    the per-set RMS and, last, the RMS over every set.
+    """
+    data    = RaggedSets(e_data)
+    s       = RaggedSets(s_data).flat
+    er_pt   = data.repeat(er)
+    T_pt    = data.repeat(T)
+    chunk   = max(1, int(max_bytes//(4*8*data.flat.size)))
+    col     = {name: k for k, name in enumerate(names)}
+    for start in range(0, len(samples), chunk):
+        rows    = np.asarray(samples[start:start + chunk], dtype=float)
+        p       = {k: rows[:, col[k], None] if k in col else props[k]
+                   for k in ('A', 'B', 'n', 'C', 'm', 'Tr', 'Tm', 'er0')}
+        model   = stress_JC(data.flat, er_pt, T_pt, p['A'], p['B'], p['n'], p['C'], p['m'],
+                            p['Tr'], p['Tm'], p['er0'])
+        yield start, _set_rms(s - model, data)
+
+
+# ------------------------------------------------
+# BCJ
+# ------------------------------------------------
+def _errors_BCJ(rows):
+    d       = _shared
+    out     = np.empty((len(rows), len(d['T']) + 1))
+    for k, x in enumerate(rows):
+        params  = dict(d['params'])
+        params.update(zip(d['names'], x))
+        runs    = run_sets(d['BCJ'], params, d['T'], d['er'], d['emax'], d['incnum'],
+                           d['istate'], **d['kwargs'])
+        r       = [s - np.interp(e, EF[d['kS']], von_mises(SF))
+                   for s, e, (EF, SF, alph, kap, tot) in zip(d['s'], d['e'], runs)]
+        out[k]  = _set_rms(np.concatenate(r)[None], d['data'])
+    return out
+
+
+def sweep_BCJ(e_data, s_data, T, er, params, names, samples, incnum, istate,
+              tol=None, chunk=16, workers=None, BCJ=None):
+    """Errors of the BCJ model for every row of `samples` (values of `names`),
+    `chunk` rows per task across `workers` processes.
+
+    params  : full parameter dict; swept constants are replaced per row
+    BCJ     : the driver (default `bcj.select_driver`: the port, checked
+              against BCJ_Basic_v2 where that can be imported)
+
+    Yields `(start, errors)` as `sweep_JC`; at most a few chunks per worker
+    are in flight, so memory stays bounded however many samples there are.
+    """
+    data    = RaggedSets(e_data)
+    emax    = [e.max() for e in data]
+    BCJ     = BCJ or select_driver(T, er, params=params, emax=emax, incnum=incnum,
+                                   istate=istate, tol=tol)
+    shared  = dict(BCJ=BCJ, names=list(names), params=dict(params),
+                   e=list(data), s=list(RaggedSets(s_data)), emax=emax,
+                   T=list(T), er=list(er), incnum=incnum, istate=istate,
+                   kwargs={} if tol is None else {'tol': tol},
+                   kS=0 if istate == 1 else 3, data=data)
+    starts  = range(0, len(samples), chunk)
+    tasks   = (np.asarray(samples[i:i + chunk], dtype=float) for i in starts)
+    workers = workers or os.cpu_count() or 1
+    with worker_pool(workers, initializer=_share, initargs=(shared,)) as pool:
+        pending = [pool.submit(_errors_BCJ, t) for t in itertools.islice(tasks, 2*workers)]
+        for start in starts:
+            errors = pending.pop(0).result()
+            pending.extend(pool.submit(_errors_BCJ, t) for t in itertools.islice(tasks, 1))
+            yield start, errors
+
+
+# ------------------------------------------------
+# Output
+# ------------------------------------------------
+def run_sweep(chunks, samples, names, setnames, path=None, scale=1.):
+    """Collect `(start, errors)` chunks beside their samples.
+
+    The table has one row per sample: the swept constants, the per-set RMS
+    and the total RMS (errors divided by `scale`, e.g. 1e6 for BCJ in MPa).
+    With `path` it is a .npy file filled chunk by chunk through a memory map,
+    with the column names in `<path>.json`; returns the table and the columns.
+    """
+    columns = list(names) + list(setnames) + ['total']
+    shape   = (len(samples), len(columns))
+    if path is None:
+        table = np.empty(shape)
+    else:
+        table = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=shape)
+        with open(path + '.json', 'w') as f:
+            json.dump(dict(columns=columns), f)
+    k       = len(names)
+    for start, errors in chunks:
+        stop = start + len(errors)
+        table[start:stop, :k] = samples[start:stop]
+        table[start:stop, k:] = errors/scale
+    if path is not None:
+        table.flush()
+    return table, columns
+
+
+def load_sweep(path):
+    """`(table, columns)` of a sweep written by `run_sweep` (memory-mapped)."""
+    with open(path + '.json') as f:
+        return np.load(path, mmap_mode='r'), json.load(f)['columns']
+
+
+def heatmap(x, y, z, bins=50):
+    """Lowest `z` per cell of a `bins` x `bins` grid over the (x, y) plane.
+
+    For a 2-D grid sweep this is the error surface itself; with more swept
+    constants it is the profile (best over the others).  Returns
+    `(xedges, yedges, H)`, `H[i, j]` for x-bin i, y-bin j (NaN if empty).
+    """
+    x, y, z = (np.asarray(v, dtype=float) for v in (x, y, z))
+    xe      = np.linspace(x.min(), x.max(), bins + 1)
+    ye      = np.linspace(y.min(), y.max(), bins + 1)
+    i       = np.clip(np.searchsorted(xe, x, 'right') - 1, 0, bins - 1)
+    j       = np.clip(np.searchsorted(ye, y, 'right') - 1, 0, bins - 1)
+    H       = np.full((bins, bins), np.inf)
+    np.minimum.at(H, (i, j), np.where(np.isfinite(z), z, np.inf))
+    H[np.isinf(H)] = np.nan
+    return xe, ye, H
+
+
+def plot_heatmap(table, columns, xname, yname, path, zname='total', bins=50):
+    """Save the `heatmap` of `zname` over (xname, yname) as an image."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    col     = {name: k for k, name in enumerate(columns)}
+    xe, ye, H = heatmap(table[:, col[xname]], table[:, col[yname]], table[:, col[zname]], bins)
+    fig, ax = plt.subplots()
+    mesh    = ax.pcolormesh(xe, ye, H.T, shading='flat', cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label='RMS error, %s (MPa)' % zname)
+    best    = np.nanargmin(table[:, col[zname]])
+    ax.plot(table[best, col[xname]], table[best, col[yname]], 'r+', ms=12)
+    ax.set_xlabel(xname)
+    ax.set_ylabel(yname)
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+    return path
+
+
+def main(argv=None):
+    parser  = argparse.ArgumentParser(prog='python -m calibratinator.sweep',
+                                      description='Model error over a grid or Latin-hypercube sample of constants.')
+    parser.add_argument('model', choices=('JC', 'BCJ'))
+    parser.add_argument('props', help='props .csv or file.json:query (e.g. BCJ/4340/DK)')
+    parser.add_argument('data', help='glob of Data_*.csv')
+    parser.add_argument('-p', '--param', action='append', required=True, metavar='NAME:LO:HI',
+                        help='swept constant and its range (repeatable)')
+    sample  = parser.add_mutually_exclusive_group(required=True)
+    sample.add_argument('--grid', type=int, metavar='N', help='N points per swept constant')
+    sample.add_argument('--lhs', type=int, metavar='N', help='N Latin-hypercube samples')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--const', action='append', default=[], metavar='NAME=VALUE',
+                        help='set or override a constant (e.g. Tr=295 for JSON JC entries)')
+    parser.add_argument('-o', '--out', default='sweep.npy', help='output table (.npy)')
+    parser.add_argument('--plot', nargs=2, metavar=('X,Y', 'PNG'), help='save a heatmap of the total error')
+    parser.add_argument('-j', '--workers', type=int, help='BCJ worker processes')
+    parser.add_argument('--chunk', type=int, default=16, help='BCJ samples per task')
+    parser.add_argument('--incnum', type=int, default=200, help='BCJ strain increments')
+    parser.add_argument('--istate', type=int, default=1, choices=(1, 2), help='1 = tension, 2 = torsion')
+    parser.add_argument('--tol', type=float, help='BCJ adaptive step tolerance (e.g. 1e-3)')
+    parser.add_argument('--basic', action='store_true',
+                        help='BCJ: BCJ_Basic_v2 instead of the (checked) calibratinator.bcj port')
+    args    = parser.parse_args(argv)
+
+    _, props = load_constants(args.props, JC_PROPS if args.model == 'JC' else BCJ_PROPS)
+    props.update({k: float(v) for k, _, v in (c.partition('=') for c in args.const)})
+    swept   = [p.split(':') for p in args.param]
+    names   = [p[0] for p in swept]
+    lo      = [float(p[1]) for p in swept]
+    hi      = [float(p[2]) for p in swept]
+    for name in names:
+        if name not in props: parser.error('unknown constant %r' % name)
+    samples = grid_samples(lo, hi, args.grid) if args.grid else lhs_samples(lo, hi, args.lhs, args.seed)
+
+    datafiles = sorted(glob.glob(args.data))
+    if not datafiles:
+        parser.error('no data files match %r' % args.data)
+    tests   = read_tests(datafiles, SCALE[args.model])
+    e_data, s_data, er, T, setnames = tests.E, tests.S, tests.rate, tests.T, tests.names
+    if args.model == 'JC':
+        chunks = sweep_JC(e_data, s_data, er, T, props, names, samples)
+    else:
+        chunks = sweep_BCJ(e_data, s_data, T, er, props, names, samples, args.incnum,
+                           args.istate, args.tol, args.chunk, args.workers,
+                           BCJ=select_driver(T, er, args.basic, params=props,
+                                             emax=[e.max() for e in e_data], incnum=args.incnum,
+                                             istate=args.istate, tol=args.tol))
+    table, columns = run_sweep(chunks, samples, names, setnames, args.out, SCALE[args.model])
+    best    = np.nanargmin(table[:, -1])
+    print('%d samples -> %s' % (len(samples), args.out))
+    print('best total RMS %.4g MPa at %s' % (table[best, -1], ', '.join(
+          '%s=%.6g' % (name, v) for name, v in zip(names, table[best]))))
+    if args.plot:
+        xname, yname = args.plot[0].split(',')
+        print('heatmap ->', plot_heatmap(table, columns, xname, yname, args.plot[1],
+                                         bins=args.grid or 50))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+ Incremental model terms
+ --------------------------------
+- TermCache : named sub-expressions of a model, each tagged with the constants
+              it reads and recomputed only when one of those constants changes
+"""
+
+import threading
+from collections import Counter
+
+
+class TermCache:
+    """Memo of model terms keyed on their own constants.
+
+    `define(name, consts, fn)` registers a term; `get(name, c)` returns
+    `fn(c)` for the constants mapping `c`, reusing the stored value while
+    `c[k]` is unchanged for every `k` in `consts`.  Terms may `get` other
+    terms, in which case `consts` should list the union of their constants.
+    `recomputed` counts evaluations per term.
+    """
+
+    def __init__(self):
+        self._defs      = {}
+        self._vals      = {}
+        self._keys      = {}
+        self._lock      = threading.RLock()
+        self.recomputed = Counter()
+
+    def define(self, name, consts, fn):
+        self._defs[name] = (tuple(consts), fn)
+        self.invalidate(name)
+
+    def consts(self, name):
+        return self._defs[name][0]
+
+    def get(self, name, c):
+        consts, fn = self._defs[name]
+        key = tuple(c[k] for k in consts)
+        with self._lock:
+            if self._keys.get(name) != key:
+                self._vals[name] = fn(c)
+                self._keys[name] = key
+                self.recomputed[name] += 1
+            return self._vals[name]
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:    self._keys.clear()
+            else:               self._keys.pop(name, None)
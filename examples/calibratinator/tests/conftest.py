@@ -0,0 +1,13 @@
+import pytest
+
+from calibratinator.bench import reference_props
+
+
+@pytest.fixture(scope='session')
+def jc_props():
+    return reference_props()[0]
+
+
+@pytest.fixture(scope='session')
+def bcj_props():
+    return reference_props()[1]
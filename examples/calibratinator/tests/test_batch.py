@@ -0,0 +1,19 @@
+import csv
+import glob
+import os
+
+import numpy as np
+
+from calibratinator.batch import run_material
+from calibratinator.bench import write_sets
+
+
+def test_batch_jc_coarse_grid(tmp_path):
+    datafiles, jc_props, _ = write_sets(str(tmp_path), 2, 30)
+    out     = run_material('JC', jc_props, datafiles, str(tmp_path/'out'), de=10.)
+    with open(out['curves']) as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 1 + 2                        # de past the largest strain: two points per set
+    assert np.isfinite(out['rms'])
+    assert sorted(map(os.path.basename, glob.glob(str(tmp_path/'out'/'*')))) == \
+        sorted(map(os.path.basename, (out['props'], out['curves'])))
@@ -0,0 +1,131 @@
+import sys
+import types
+import warnings
+
+import numpy as np
+import pytest
+
+from calibratinator.bcj import (BCJ, BCJ_NAMES, BCJ_jac_sets, BCJ_sets, BCJTerms, bcj_factors, bcj_strain_control_sets,
+                                 run_sets, select_driver, shear_modulus)
+from calibratinator.fit import fit_BCJ
+from calibratinator.postprocess import von_mises
+
+T       = np.array([295., 500., 700.])
+RATE    = np.array([1e-3, 1., 1e3])
+EMAX    = np.array([.2, .3, .25])
+
+
+def _fake_basic(monkeypatch, driver):
+    module  = types.ModuleType('BCJ_Basic_v2')
+    module.BCJ = driver
+    monkeypatch.setitem(sys.modules, 'BCJ_Basic_v2', module)
+    return module
+
+
+def test_select_driver_port(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'BCJ_Basic_v2', None)     # import fails
+    with pytest.warns(UserWarning, match='cannot be imported'):
+        assert select_driver([295.], [1.], basic=True) is BCJ
+    with pytest.warns(UserWarning, match='not checked'):
+        assert select_driver([295.], [1.], params={}, emax=[.2]) is BCJ
+    assert select_driver([295.], [1.]) is BCJ
+    terms = select_driver([295., 500.], [1., 1e3], terms=True)
+    assert isinstance(terms, BCJTerms)
+
+
+def test_select_driver_checks_port(monkeypatch, bcj_props):
+    _fake_basic(monkeypatch, BCJ)                               # agrees with the port
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        driver  = select_driver(T, RATE, terms=True, params=bcj_props, emax=EMAX, incnum=50)
+    assert isinstance(driver, BCJTerms)
+    assert select_driver(T, RATE, basic=True) is BCJ
+
+
+def test_select_driver_falls_back(monkeypatch, bcj_props):
+    def other(params, T, rate, emax, incnum, istate):
+        out     = BCJ(params, T, rate, emax, incnum, istate)
+        return (out[0], out[1]*1.01) + tuple(out[2:])
+    module  = _fake_basic(monkeypatch, other)
+    with pytest.warns(UserWarning, match='differs from BCJ_Basic_v2'):
+        assert select_driver(T, RATE, params=bcj_props, emax=EMAX, incnum=50) is module.BCJ
+    # adaptive steps only exist in the port
+    assert select_driver(T, RATE, params=bcj_props, emax=EMAX, tol=1e-3) is BCJ
+
+
+def test_terms_matches_BCJ(bcj_props):
+    terms   = BCJTerms([295., 500.], [1., 1e3])
+    for T, rate in ((295., 1.), (500., 1e3)):
+        for a, b in zip(terms(bcj_props, T, rate, 0.25, 100, 1), BCJ(bcj_props, T, rate, 0.25, 100, 1)):
+            np.testing.assert_allclose(a, b, rtol=1e-12, atol=0.)
+
+
+@pytest.mark.parametrize('istate', [1, 2])
+def test_lockstep_matches_per_set(bcj_props, istate):
+    runs    = BCJ_sets(bcj_props, T, RATE, EMAX, 100, istate)
+    for run, t, r, e in zip(runs, T, RATE, EMAX):
+        for a, b in zip(run, BCJ(bcj_props, t, r, e, 100, istate)):
+            np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12*np.abs(b).max())
+
+
+def test_lockstep_ragged_increments(bcj_props):
+    incnum  = [40, 100, 7]
+    runs    = bcj_strain_control_sets(bcj_factors(bcj_props, T, RATE), shear_modulus(bcj_props),
+                                      RATE, EMAX, incnum, 1)
+    for run, t, r, e, n in zip(runs, T, RATE, EMAX, incnum):
+        assert run[0].shape == (6, n + 1)
+        for a, b in zip(run, BCJ(bcj_props, t, r, e, n, 1)):
+            np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12*np.abs(b).max())
+
+
+def test_jac_matches_finite_differences(bcj_props):
+    params  = dict(bcj_props, C19=2e7, C20=100.)                   # Y_adj active
+    runs    = BCJ_jac_sets(params, T, RATE, EMAX, 100, 1)
+    for j, name in enumerate(BCJ_NAMES):
+        h       = 1e-3*abs(params[name])
+        up      = BCJ_sets(dict(params, **{name: params[name] + h}), T, RATE, EMAX, 100, 1)
+        dn      = BCJ_sets(dict(params, **{name: params[name] - h}), T, RATE, EMAX, 100, 1)
+        for key, k in (('SF', 1), ('alph', 2), ('kap', 3)):
+            an      = [J[key][..., j] for _, J in runs]
+            fd      = [(u[k] - d[k])/(2*h) for u, d in zip(up, dn)]
+            scale   = max(np.abs(a).max() for a in an)
+            for a, f in zip(an, fd):
+                np.testing.assert_allclose(a, f, rtol=0., atol=1e-3*scale, err_msg='%s %s' % (key, name))
+
+
+@pytest.mark.parametrize('t, r', [(295., 1.), (700., 1e3)])
+def test_adaptive_grid(bcj_props, t, r):
+    ref     = BCJ(bcj_props, t, r, .25, 20000, 1)
+    scale   = np.abs(ref[1][0]).max()
+    err     = {}
+    for tol in (1e-3, 1e-4):
+        EF, SF  = BCJ(bcj_props, t, r, .25, 200, 1, tol=tol)[:2]
+        e       = EF[0]
+        assert e[0] == 0. and e[-1] == pytest.approx(.25, rel=1e-12)
+        assert np.all(np.diff(e) > 0.) and np.diff(e).max() <= .25/20*(1. + 1e-12)
+        err[tol] = (e.size, np.abs(SF[0] - np.interp(e, ref[0][0], ref[1][0])).max()/scale)
+        assert err[tol][1] < 20*tol                                 # tol is per step
+    assert err[1e-4][0] > err[1e-3][0] and err[1e-4][1] < err[1e-3][1]
+
+
+def test_adaptive_sets_per_set(bcj_props):
+    runs    = BCJ_sets(bcj_props, T, RATE, EMAX, 200, 1, tol=1e-3)
+    for run, t, r, e in zip(runs, T, RATE, EMAX):
+        for a, b in zip(run, BCJ(bcj_props, t, r, e, 200, 1, tol=1e-3)):
+            np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize('polish', [False, True])
+def test_fit_BCJ_recovers_constants(bcj_props, polish):
+    e       = [np.linspace(.005, emax, 30) for emax in EMAX]
+    runs    = run_sets(BCJ, bcj_props, T, RATE, EMAX, 50, 1)
+    s       = [np.interp(ei, out[0][0], von_mises(out[1])) for ei, out in zip(e, runs)]
+    free    = ('C03', 'C09')
+    lo      = np.array([bcj_props[name]*(.7 if name in free else 1.) for name in BCJ_NAMES])
+    hi      = np.array([bcj_props[name]*(1.3 if name in free else 1.) for name in BCJ_NAMES])
+    p0      = dict(bcj_props, **{name: 1.2*bcj_props[name] for name in free})
+    params, cost = fit_BCJ(BCJ, e, s, T, RATE, p0, lo, hi, 50, 1, popsize=8, maxgen=30,
+                           workers=1, seed=0, polish=polish)
+    assert cost < (1e-20 if polish else 1e-8)
+    for name in BCJ_NAMES:
+        assert params[name] == pytest.approx(bcj_props[name], rel=1e-8 if polish else 1e-3), name
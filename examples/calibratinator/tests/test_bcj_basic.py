@@ -0,0 +1,24 @@
+"""The calibratinator.bcj port against BCJ_Basic_v2, where it can be imported:
+props calibrated against the lab module must draw and fit the same."""
+
+import numpy as np
+import pytest
+
+from calibratinator.bcj import BCJ, select_driver
+
+basic = pytest.importorskip('BCJ_Basic_v2')
+
+
+@pytest.mark.parametrize('istate', [1, 2])
+@pytest.mark.parametrize('T, rate', [(295., 1e-3), (500., 1.), (730., 1e3)])
+def test_port_matches_basic(bcj_props, T, rate, istate):
+    port    = BCJ(bcj_props, T, rate, 0.3, 200, istate)
+    ref     = basic.BCJ(bcj_props, T, rate, 0.3, 200, istate)
+    for name, a, b in zip(('EF', 'SF', 'alph', 'kap', 'tot'), port, ref):
+        np.testing.assert_allclose(a, b, rtol=1e-6, atol=1e-9*np.abs(b).max(), err_msg=name)
+
+
+def test_port_is_default(bcj_props):
+    T, rate = [295., 500., 730.], [1e-3, 1., 1e3]
+    assert select_driver(T, rate, params=bcj_props, emax=[.3]*3) is BCJ
+    assert select_driver(T, rate, basic=True) is basic.BCJ
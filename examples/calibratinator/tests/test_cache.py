@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from calibratinator.cache import ResultCache, cached_BCJ, content_key
+
+
+def value(k):
+    return (np.arange(3.) + k, np.full(2, float(k)))
+
+
+def test_lru_eviction_order():
+    cache   = ResultCache(maxsize=3)
+    for k in 'abc':
+        cache.put(k, value(ord(k)))
+    assert cache.get('a') is not None                   # a is now the most recent
+    cache.put('d', value(0))
+    assert [key for key, _ in cache.entries()] == ['c', 'a', 'd']   # b, least recent, went first
+    assert cache.get('b') is None
+    cache.put('e', value(0))
+    assert [key for key, _ in cache.entries()] == ['a', 'd', 'e']
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 1
+
+
+def test_disk_round_trip(tmp_path):
+    cache   = ResultCache(maxsize=1, cachedir=str(tmp_path))
+    cache.put('a', value(1))
+    cache.put('b', value(2))                            # a leaves memory, stays on disk
+    assert len(cache) == 1
+    fresh   = ResultCache(cachedir=str(tmp_path))       # a restarted session
+    for c in (cache, fresh):
+        got = c.get('a')
+        assert c.disk_hits == 1 and len(got) == 2
+        for a, b in zip(got, value(1)):
+            np.testing.assert_array_equal(a, b)
+            assert not a.flags.writeable
+    assert fresh.get('a') is got is not None and fresh.hits == 1   # now in memory
+    (tmp_path/'b.npz').write_bytes(b'not an npz')
+    assert fresh.get('b') is None                       # unreadable: recomputed
+    fresh.clear(disk=True)
+    assert not list(tmp_path.glob('*.npz'))
+
+
+def test_key_changes_with_props(bcj_props):
+    conditions  = (295., 1., .2, 50, 1)
+    key         = content_key('BCJ', bcj_props, *conditions)
+    assert key == content_key('BCJ', dict(reversed(list(bcj_props.items()))), *conditions)
+    assert key == content_key('BCJ', {k: np.float64(v) for k, v in bcj_props.items()}, *conditions)
+    changed     = dict(bcj_props, C03=np.nextafter(bcj_props['C03'], np.inf))
+    assert key != content_key('BCJ', changed, *conditions)
+    assert key != content_key('BCJ', bcj_props, 296., *conditions[1:])
+
+
+def test_cached_driver_reruns_on_new_props(bcj_props):
+    calls   = []
+
+    def BCJ(params, T, rate, emax, incnum, istate):
+        calls.append(params['C03'])
+        return value(params['C03'])
+
+    run     = cached_BCJ(BCJ, ResultCache())
+    run(bcj_props, 295., 1., .2, 50, 1)
+    run(dict(bcj_props), 295., 1., .2, 50, 1)
+    changed = dict(bcj_props, C03=2*bcj_props['C03'])
+    out     = run(changed, 295., 1., .2, 50, 1)
+    assert calls == [bcj_props['C03'], changed['C03']]
+    np.testing.assert_array_equal(out[1], value(changed['C03'])[1])
+    with pytest.raises(ValueError):
+        out[0][0] = 0.                                  # shared between hits: read-only
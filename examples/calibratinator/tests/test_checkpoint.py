@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from calibratinator.bench import write_sets
+from calibratinator.checkpoint import read_checkpoint, write_checkpoint
+from calibratinator.props import BCJ_NAMES, JC_NAMES, read_props
+from calibratinator import session as session_module
+from calibratinator.session import BCJSession, JCSession
+
+
+@pytest.fixture
+def sets(tmp_path):
+    return write_sets(str(tmp_path), 3, 50)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_arrays_round_trip(tmp_path, mmap):
+    arrays  = {'a': np.arange(7.), 'b/c': np.ones((3, 5), np.int32), 'empty': np.zeros(0),
+               'rec': np.array([(1., 'x')], dtype=[('v', 'f8'), ('n', 'U4')])}
+    path    = write_checkpoint(str(tmp_path/'x.ckpt'), {'k': [1, 'two']}, arrays)
+    back    = read_checkpoint(path, mmap)
+    assert back.meta == {'k': [1, 'two']}
+    assert back.mapped == mmap
+    for name, a in arrays.items():
+        np.testing.assert_array_equal(back.arrays[name], a)
+    assert back.group('b') == {'c': back.arrays['b/c']}
+
+
+@pytest.fixture(params=[True, False], ids=['posix', 'windows'])
+def replace_mapped(request, monkeypatch):
+    """Save over a mapped checkpoint as POSIX does, or release the maps first as on Windows."""
+    monkeypatch.setattr(session_module, '_REPLACE_MAPPED', request.param)
+    return request.param
+
+
+def test_jc_resume_then_save(tmp_path, sets, replace_mapped):
+    datafiles, jc_props, _ = sets
+    _, props    = read_props(jc_props)
+    session     = JCSession(props, datafiles, cache=False)
+    values      = {name: props[name] for name in JC_NAMES}
+    path        = session.save(str(tmp_path/'jc.ckpt'), values, view=[0, 1])
+    s           = session.model(*values.values())
+    rms         = session.errors(s)[0]
+    for _ in range(2):      # resume (mapped) and save over the same file, twice
+        resumed = JCSession.load(path)
+        assert resumed.checkpoint.mapped
+        assert resumed.checkpoint.meta['values'] == values
+        assert resumed.checkpoint.meta['view'] == [0, 1]
+        np.testing.assert_array_equal(resumed.checkpoint.arrays['errors/rms'], rms)
+        np.testing.assert_array_equal(resumed.s_data.flat, session.s_data.flat)
+        saved_s = resumed.saved_model(list(values.values()))
+        assert not any(isinstance(a, np.memmap) for a in saved_s)
+        np.testing.assert_array_equal(np.concatenate(saved_s), np.concatenate(s))
+        resumed.save(path, values, view=[0, 1])
+        assert resumed.checkpoint.mapped == replace_mapped
+        np.testing.assert_array_equal(resumed.s_data.flat, session.s_data.flat)
+        np.testing.assert_array_equal(resumed.errors(resumed.model(*values.values()))[0], rms)
+    assert JCSession.load(path).saved_model([1., 2., 3., 4., 5.]) is None   # other constants
+    assert JCSession(props, datafiles, cache=False).saved_model(list(values.values())) is None
+
+
+def test_bcj_resume_then_save(tmp_path, sets, replace_mapped):
+    datafiles, _, bcj_props = sets
+    _, params   = read_props(bcj_props)
+    session     = BCJSession(params, datafiles, incnum=50, cache=False, basic=False)
+    path        = session.save(str(tmp_path/'bcj.ckpt'), params)
+    VM          = session.curves(params).VM.copy()
+    for _ in range(2):
+        resumed = BCJSession.load(path)
+        assert resumed.checkpoint.mapped
+        curves  = resumed.curves(params)
+        assert resumed.cache.stats()['misses'] == 0     # every run came from the checkpoint
+        np.testing.assert_array_equal(curves.VM, VM)
+        assert {k: resumed.checkpoint.meta['values'][k] for k in BCJ_NAMES} == \
+               {k: params[k] for k in BCJ_NAMES}
+        resumed.save(path, params)
+        assert resumed.checkpoint.mapped == replace_mapped
+        np.testing.assert_array_equal(resumed.curves(params).VM, VM)
+        assert resumed.cache.stats()['misses'] == 0
+
+
+def test_mapped_session_outlives_replaced_file(tmp_path, sets, monkeypatch):
+    monkeypatch.setattr(session_module, '_REPLACE_MAPPED', True)
+    datafiles, jc_props, _ = sets
+    _, props    = read_props(jc_props)
+    values      = {name: props[name] for name in JC_NAMES}
+    path        = JCSession(props, datafiles, cache=False).save(str(tmp_path/'jc.ckpt'), values)
+    mapped      = JCSession.load(path)
+    data        = np.array(mapped.s_data.flat)
+    other       = dict(values, A=values['A'] + 1.)
+    mapped.save(path, other)
+    np.testing.assert_array_equal(mapped.s_data.flat, data)      # still the old file's pages
+    assert read_checkpoint(path).meta['values'] == other
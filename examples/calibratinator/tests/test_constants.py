@@ -0,0 +1,82 @@
+import json
+import warnings
+
+import pytest
+
+from calibratinator.constants import DEFAULT_PATH, ConstantsStore
+from calibratinator.props import BCJ_PROPS, OPTIONAL, complete_props, read_constants
+
+DOC = {
+    'JC': {'4340': {'params': {'A': 792e6}, 'bibtex': {'authors': 'Johnson and Cook', 'year': '1985'}}},
+    'BCJ': {'BCJMetal': {
+        'DK': {'4340': {'params': {'C01': 1.}, 'bibtex': {'authors': 'Daniel S. Kenney', 'year': '2023'}},
+               'Al6061': {'params': {'C01': 2.}, 'bibtex': {'authors': 'Daniel S. Kenney', 'year': '2023'}}},
+        'Bammann1990Modeling': {'4340': {'params': {'C01': 3.},
+                                         'bibtex': {'authors': 'Joby M. Anthony III', 'year': '2024'}}}}},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path/'plasticityconstants.json'
+    path.write_text(json.dumps(DOC, indent=2))
+    return ConstantsStore(str(path))
+
+
+def paths(store, query):
+    return sorted(e['path'] for e in store.find(query))
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('BCJ/4340/DK',             ['BCJ/BCJMetal/DK/4340']),          # model/material/author key
+    ('bcj/4340/dk',             ['BCJ/BCJMetal/DK/4340']),          # case-insensitive
+    ('BCJ/4340/Bammann',        ['BCJ/BCJMetal/Bammann1990Modeling/4340']),  # author key prefix
+    ('BCJMetal/DK',             ['BCJ/BCJMetal/DK/4340', 'BCJ/BCJMetal/DK/Al6061']),  # variant
+    ('4340/2024',               ['BCJ/BCJMetal/Bammann1990Modeling/4340']),  # year
+    ('Kenney/Al6061',           ['BCJ/BCJMetal/DK/Al6061']),        # bibtex authors
+    ('JC/4340',                 ['JC/4340']),                       # no author key
+    ('BCJ/BCJMetal/DK/4340',    ['BCJ/BCJMetal/DK/4340']),          # full path
+    ('BCJ/4340/Smith',          []),
+])
+def test_find(store, query, expected):
+    assert paths(store, query) == expected
+
+
+def test_short_parts_skip_bibtex_authors(store):
+    assert paths(store, 'BCJ/4340/an') == []                        # 'an' is in 'Johnson and Cook', 'Anthony'
+
+
+def test_get_and_journal(store):
+    assert store.get('JC/4340') == ('Johnson and Cook 1985', {'A': 792e6})
+    with pytest.raises(KeyError):
+        store.get('BCJ/4340')
+    store.add('BCJ/BCJMetal/DK/4340', {'C01': 4.}, {'authors': 'Daniel S. Kenney', 'year': '2026'})
+    assert store.get('BCJ/4340/DK') == ('Daniel S. Kenney 2026', {'C01': 4.})
+    assert paths(store, 'BCJ/4340') == ['BCJ/BCJMetal/Bammann1990Modeling/4340', 'BCJ/BCJMetal/DK/4340']
+
+
+def test_get_prefers_exact_path(store):
+    store.add('JC/4340/KD', {'A': 800e6}, {'authors': 'KD', 'year': '2026'})   # an author level JC lacks
+    assert paths(store, 'JC/4340') == ['JC/4340', 'JC/4340/KD']
+    assert store.lookup('JC/4340')['path'] == 'JC/4340'
+    assert store.get('JC/4340') == ('Johnson and Cook 1985', {'A': 792e6})
+    store.add('JC/4340', {'A': 810e6}, {'authors': 'KD', 'year': '2026'})       # what JC Store_Author writes
+    assert store.get('JC/4340') == ('KD 2026', {'A': 810e6})
+
+
+@pytest.mark.parametrize('path', [e['path'] for e in ConstantsStore(DEFAULT_PATH).entries
+                                  if e['model'] == 'BCJ'])
+def test_bcj_entries_complete(path):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        _, props = read_constants(DEFAULT_PATH, path, BCJ_PROPS)
+    assert complete_props(props, BCJ_PROPS, path) is props         # nothing else missing
+    assert set(BCJ_PROPS) <= set(props)
+    for w in caught:
+        assert set(str(w.message).split(' lacks ')[1].split(';')[0].split(', ')) <= set(OPTIONAL)
+
+
+def test_complete_props_rejects_missing():
+    with pytest.warns(UserWarning, match='C19, C20'):
+        with pytest.raises(KeyError, match='C01'):
+            complete_props({'C02': 1.}, ('C01', 'C02', 'C19', 'C20'), 'BCJ/x')
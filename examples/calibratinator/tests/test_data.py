@@ -0,0 +1,40 @@
+import numpy as np
+
+from calibratinator import data                     # TestSets by module: pytest would collect the name
+from calibratinator.bench import write_sets
+from calibratinator.ragged import RaggedSets
+
+
+def test_tests_in_flat_buffers(tmp_path):
+    datafiles, _, _ = write_sets(str(tmp_path), 4, 25)
+    datafiles.append(str(tmp_path/'Data_short.csv'))
+    with open(datafiles[-1], 'w') as f:
+        f.write('Strain,Stress,Strain Rate,Temperature,Name\n0.01,500,0.1,400,short\n0.02,510\n')
+    tests   = data.read_tests(datafiles, 1e6, cachedir=str(tmp_path/'cache'))
+    assert len(tests) == 5 and list(tests.E.lengths) == [25]*4 + [2]
+    for i, f in enumerate(datafiles):
+        e, s, rate, T, name = data.read_data(f, 1e6, cache=False)
+        assert np.shares_memory(tests.E[i], tests.E.flat)
+        np.testing.assert_array_equal(tests.E[i], e)
+        np.testing.assert_array_equal(tests.S[i], s)
+        assert (tests.rate[i], tests.T[i], tests.names[i]) == (rate, T, name)
+    assert len(list((tmp_path/'cache').glob('*.npy.json'))) == 5
+    cached  = data.read_tests(datafiles, 1e6, cachedir=str(tmp_path/'cache'))
+    back    = data.TestSets.from_arrays(cached.arrays())
+    assert back.E.flat is cached.E.flat and back.cond is cached.cond
+    for key, a in tests.arrays().items():
+        np.testing.assert_array_equal(back.arrays()[key], a)
+    shared  = RaggedSets(tests.E)
+    assert shared.flat is tests.E.flat and shared.offsets is tests.E.offsets
+
+
+def test_read_data_same_arrays_cached_or_not(tmp_path):
+    datafile = write_sets(str(tmp_path), 1, 30)[0][0]
+    parsed  = data.read_data(datafile, 1e6, cachedir=str(tmp_path/'cache'))      # writes the sidecar
+    cached  = data.read_data(datafile, 1e6, cachedir=str(tmp_path/'cache'))
+    plain   = data.read_data(datafile, 1e6, cache=False)
+    for out in (parsed, cached, plain):
+        for a, b in zip(out[:2], plain[:2]):
+            assert type(a) is np.ndarray and a.flags.writeable
+            np.testing.assert_array_equal(a, b)
+        assert out[2:] == plain[2:]
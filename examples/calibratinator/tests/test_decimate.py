@@ -0,0 +1,57 @@
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from calibratinator.decimate import DecimatedLines, minmax_indices
+
+
+@pytest.fixture
+def walk():
+    rng     = np.random.default_rng(0)
+    x       = np.sort(rng.random(200000))
+    return x, np.cumsum(rng.standard_normal(x.size))
+
+
+@pytest.mark.parametrize('view', ['full', 'zoomed'])
+def test_minmax_envelope(walk, view):
+    x, y    = walk
+    xlim    = (0., 1.) if view == 'full' else (.3, .35)
+    ylim    = (y.min(), y.max()) if view == 'full' else (np.percentile(y, 20), np.percentile(y, 80))
+    buckets = 300
+    k       = minmax_indices(x, y, xlim, ylim, buckets)
+    inside  = np.flatnonzero((x >= xlim[0]) & (x <= xlim[1]) & (y >= ylim[0]) & (y <= ylim[1]))
+    assert k.size <= 2*buckets + 2 and np.all(np.diff(k) > 0)
+    assert k[0] == inside[0] and k[-1] == inside[-1]            # endpoints kept
+    # every pixel column spans the same y range as the full series there
+    def envelope(idx):
+        col = ((x[idx] - xlim[0])*(buckets/(xlim[1] - xlim[0]))).astype(np.intp)
+        lo  = np.full(buckets + 1, np.inf)
+        hi  = np.full(buckets + 1, -np.inf)
+        np.minimum.at(lo, col, y[idx])
+        np.maximum.at(hi, col, y[idx])
+        return lo, hi
+    for a, b in zip(envelope(k), envelope(inside)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_short_series_untouched():
+    x       = np.linspace(0., 1., 50)
+    np.testing.assert_array_equal(minmax_indices(x, x, (0., 1.), (0., 1.), 100), np.arange(50))
+
+
+def test_lines_follow_the_view(walk):
+    x, y    = walk
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    line,   = ax.plot(x, y, '.')
+    ax.set_xlim(0., 1.)
+    ax.set_ylim(y.min(), y.max())
+    d       = DecimatedLines(ax, [line], [x], [y])
+    width   = int(ax.bbox.width)
+    assert d.points == len(line.get_xdata()) <= 2*width + 2
+    ax.set_xlim(.5, .5 + 1e-4)                                  # zoomed in: every point in view
+    inside  = (x >= .5) & (x <= .5 + 1e-4)
+    np.testing.assert_array_equal(line.get_xdata(), x[inside])
+    plt.close(fig)
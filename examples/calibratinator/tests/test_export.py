@@ -0,0 +1,67 @@
+import csv
+
+import numpy as np
+import pytest
+
+from calibratinator.export import export_curves
+
+NAMES   = ['a', 'bb', 'c']
+E       = [np.linspace(0, .1, n) for n in (7, 3, 0)]
+VM      = [1e6*(100. + e) for e in E]
+VM[0][2] = np.nan                                               # a genuine NaN stays 'nan'
+
+
+@pytest.mark.parametrize('chunk', [2, 65536])
+def test_csv_ragged(tmp_path, chunk):
+    path    = export_curves(str(tmp_path/'c.csv'), NAMES, {'E': E, 'VM': VM}, ('E', 'VM'),
+                            scale=1e6, chunk=chunk)
+    with open(path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['strain-a', 'VMstress-a', 'strain-bb', 'VMstress-bb', 'strain-c', 'VMstress-c']
+    assert len(rows) == 1 + 7
+    for k, (e, s) in enumerate(zip(E, VM)):
+        col_e   = [r[2*k] for r in rows[1:]]
+        col_s   = [r[2*k + 1] for r in rows[1:]]
+        assert col_e[len(e):] == col_s[len(e):] == ['']*(7 - len(e))          # blank past the end
+        np.testing.assert_array_equal([float(v) for v in col_e[:len(e)]], e)
+        np.testing.assert_allclose([float(v) for v in col_s[:len(e)]], s/1e6, rtol=1e-15)
+    assert rows[3][1] == 'nan'
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.npz'])
+def test_repeated_names(tmp_path, ext):
+    path    = export_curves(str(tmp_path/('c' + ext)), ['a', 'a', 'a_2'], {'E': E}, ('E',))
+    if ext == '.csv':
+        with open(path) as f:
+            assert next(csv.reader(f)) == ['strain-a', 'strain-a_2', 'strain-a_2_2']
+    else:
+        with np.load(path) as z:
+            assert list(z['names']) == ['a', 'a_2', 'a_2_2']
+            for name, e in zip(z['names'], E):
+                np.testing.assert_array_equal(z['strain-' + name], e)
+
+
+@pytest.mark.parametrize('ext', ['.npz', '.h5', '.parquet'])
+def test_binary_ragged(tmp_path, ext):
+    path    = str(tmp_path/('c' + ext))
+    if ext == '.h5':
+        h5py    = pytest.importorskip('h5py')
+    elif ext == '.parquet':
+        pq      = pytest.importorskip('pyarrow.parquet')
+    export_curves(path, NAMES, {'E': E, 'VM': VM}, ('E', 'VM'), {'VM': 'S'}, scale=1e6, chunk=2)
+    for name, e, s in zip(NAMES, E, VM):
+        if ext == '.npz':
+            with np.load(path) as z:
+                assert list(z['names']) == NAMES
+                got_e, got_s = z['strain-' + name], z['S-' + name]
+        elif ext == '.h5':
+            with h5py.File(path, 'r') as h5:
+                got_e, got_s = h5[name]['strain'][()], h5[name]['S'][()]
+        else:
+            t       = pq.read_table(path).to_pydict()
+            rows    = [i for i, n in enumerate(t['set']) if n == name]
+            got_e   = np.array([t['strain'][i] for i in rows])
+            got_s   = np.array([t['S'][i] for i in rows])
+        np.testing.assert_array_equal(got_e, e)
+        np.testing.assert_allclose(got_s, s/1e6, rtol=1e-15)
+
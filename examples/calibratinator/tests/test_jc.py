@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from calibratinator.fit import _lm, fit_JC
+from calibratinator.jc import stress_JC, stress_JC_jac, stress_JC_sets
+from calibratinator.props import JC_NAMES, JC_PROPS
+
+RATE    = np.array([1e-3, 1., 50., 2e3])
+TEMP    = np.array([295., 400., 650., 900.])
+
+
+@pytest.fixture
+def points():
+    e       = np.concatenate([np.linspace(0., .3, 40)]*len(RATE))
+    return e, np.repeat(RATE, 40), np.repeat(TEMP, 40)
+
+
+def test_jac_matches_finite_differences(jc_props, points):
+    e, er, T    = points
+    p           = np.array([jc_props[name] for name in JC_NAMES])
+    fixed       = [jc_props[name] for name in ('Tr', 'Tm', 'er0')]
+    s, J        = stress_JC_jac(e, er, T, *p, *fixed)
+    np.testing.assert_allclose(s, stress_JC(e, er, T, *p, *fixed), rtol=1e-13)
+    for k in range(len(p)):
+        h           = 1e-6*abs(p[k])
+        up, dn      = p.copy(), p.copy()
+        up[k]      += h
+        dn[k]      -= h
+        fd          = (stress_JC(e, er, T, *up, *fixed) - stress_JC(e, er, T, *dn, *fixed))/(2*h)
+        np.testing.assert_allclose(J[k], fd, rtol=1e-6, atol=1e-9*np.abs(s).max(), err_msg=JC_NAMES[k])
+
+
+def test_sets_match_pointwise(jc_props):
+    grids   = [np.linspace(0., .3, n) for n in (5, 17, 2, 30)]
+    args    = [jc_props[name] for name in JC_PROPS]
+    S       = stress_JC_sets(grids, RATE, TEMP, *args)
+    for g, s, r, t in zip(grids, S, RATE, TEMP):
+        np.testing.assert_allclose(s, stress_JC(g, r, t, *args), rtol=1e-14)
+
+
+def test_lm_without_iterations():
+    residual    = lambda p: (np.array([1. - p[0]]), np.array([[1.]]))
+    p, cost, it = _lm(residual, [3.], -10., 10., 0, 1e-10)
+    assert (list(p), cost, it) == ([3.], 4., 0)
+    p, cost, it = _lm(residual, [3.], -10., 10., 50, 1e-10)
+    assert abs(p[0] - 1.) < 1e-6 and it > 0
+
+
+def test_fit_recovers_constants(jc_props):
+    e       = [np.linspace(.002, .25, 60) for _ in RATE]
+    args    = [jc_props[name] for name in JC_PROPS]
+    s       = [stress_JC(ei, r, t, *args) for ei, r, t in zip(e, RATE, TEMP)]
+    p_true  = np.array(args[:5])
+    lo, hi  = .5*p_true, 1.5*p_true
+    p, rms, results = fit_JC(e, s, RATE, TEMP, .9*p_true, lo, hi, *args[5:], starts=2, workers=1, seed=0)
+    assert len(results) == 2
+    assert rms < 1e-6*max(np.abs(si).max() for si in s)
+    np.testing.assert_allclose(p, p_true, rtol=1e-5)
+
+
+def test_fit_keeps_n_m_positive(jc_props):
+    e       = [np.linspace(.002, .25, 60) for _ in RATE]
+    args    = [jc_props[name] for name in JC_PROPS]
+    s       = [stress_JC(ei, r, t, *args) for ei, r, t in zip(e, RATE, TEMP)]
+    p_true  = np.array(args[:5])
+    lo, hi  = p_true - [300., 400., 1., .1, .5], p_true + [300., 400., 1., .1, .5]   # the GUI's slider ranges
+    lo[[2, 4]] = -1.
+    p, rms, results = fit_JC(e, s, RATE, TEMP, p_true, lo, hi, *args[5:], starts=6, workers=1, seed=1)
+    assert all(res[0][2] > 0 and res[0][4] > 0 and np.isfinite(res[1]) for res in results)
+    np.testing.assert_allclose(p, p_true, rtol=1e-5)
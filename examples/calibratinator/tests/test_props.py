@@ -0,0 +1,21 @@
+import warnings
+
+import pytest
+
+from calibratinator.props import JC_PROPS, load_constants, read_props, write_props
+
+
+def test_round_trip_and_unknown_rows(tmp_path, jc_props):
+    path    = str(tmp_path/'Props_JC_x.csv')
+    write_props(path, 'note', dict(jc_props, extra=1.), JC_PROPS + ('extra',))
+    with open(path, 'a') as f:
+        f.write('Units,MPa\n')                                     # non-numeric unknown row
+    with pytest.warns(UserWarning, match='extra'):
+        comment, props = read_props(path, JC_PROPS)
+    assert comment == 'note' and props == jc_props                 # unknown rows skipped
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        write_props(path, 'note', dict(jc_props, extra=1.), JC_PROPS + ('extra',))
+        assert read_props(path) == (comment, dict(jc_props, extra=1.))  # no names: no check
+        write_props(path, 'note', jc_props, JC_PROPS)
+        assert load_constants(path, JC_PROPS) == ('note', jc_props)
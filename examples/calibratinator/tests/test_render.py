@@ -0,0 +1,52 @@
+import matplotlib
+import numpy as np
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.widgets import Slider
+
+from calibratinator.render import BlitRenderer
+from calibratinator.scheduler import UpdateScheduler
+
+
+def test_blit_matches_full_draw():
+    fig     = plt.figure()
+    ax      = fig.add_axes([.1, .3, .8, .6])
+    x       = np.linspace(0, 1, 50)
+    ax.scatter(x, x**2, s=4)
+    line,   = ax.plot(x, x)
+    sliders = [Slider(fig.add_axes([.2, .05 + .08*i, .6, .04]), 'k%d' % i, 0., 2., valinit=1.)
+               for i in range(2)]
+    sliders[0].on_changed(lambda val: line.set_ydata(x**val))
+    r       = BlitRenderer(fig, [line])
+    r.watch(sliders)
+    assert all(sl.ax.get_animated() and not sl.track.get_animated() for sl in sliders)
+    fig.canvas.draw()
+    for val in (.3, 1.7, 1.2):
+        sliders[0].set_val(val)
+        sliders[1].set_val(2. - val)
+    assert r.blits == 6 and r.full_draws == 1
+    blitted = np.array(fig.canvas.buffer_rgba())
+    for a in r.artists:
+        a.set_animated(False)
+    r.artists = []                                      # the draw_event hook would paint them twice
+    fig.canvas.draw()
+    np.testing.assert_array_equal(blitted, np.array(fig.canvas.buffer_rgba()))
+    plt.close(fig)
+
+
+def test_scheduler_draws_one_frame_per_change():
+    fig     = plt.figure()
+    x       = np.linspace(0, 1, 50)
+    line,   = fig.add_axes([.1, .3, .8, .6]).plot(x, x)
+    slider  = Slider(fig.add_axes([.2, .1, .6, .04]), 'k', 0., 2., valinit=1.)
+    r       = BlitRenderer(fig, [line])
+    r.watch([slider], repaint=False)
+    s       = UpdateScheduler(lambda val, cancelled: x**val, line.set_ydata, threaded=False, draw=r.update)
+    slider.on_changed(s.submit)
+    fig.canvas.draw()
+    for val in (.3, 1.7, 1.2):
+        slider.set_val(val)
+    assert r.blits == 3 and r.full_draws == 1
+    np.testing.assert_array_equal(line.get_ydata(), x**1.2)
+    plt.close(fig)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from calibratinator.residuals import InterpOperator
+
+
+def test_matches_np_interp():
+    rng     = np.random.default_rng(0)
+    grids   = [np.sort(rng.uniform(0., .3, n)) for n in (50, 2, 1, 13)]
+    points  = [rng.uniform(-.05, .35, m) for m in (30, 7, 4, 1)]    # beyond both grid ends too
+    model   = [np.sin(20*g) + 1. for g in grids]
+    values  = [np.cos(x) for x in points]
+    op      = InterpOperator(grids, points, values)
+    want    = [np.interp(x, g, y) for x, g, y in zip(points, grids, model)]
+    np.testing.assert_allclose(op(model), np.concatenate(want), rtol=1e-14)
+    np.testing.assert_array_equal(op(np.concatenate(model)), op(model))
+    dmodel  = [np.column_stack([y, 2*y, g]) for y, g in zip(model, grids)]
+    for k in range(3):
+        np.testing.assert_allclose(op.jac(dmodel)[:, k], op([d[:, k] for d in dmodel]), rtol=1e-14)
+    resid   = [v - w for v, w in zip(values, want)]
+    np.testing.assert_allclose(op.residual(model), np.concatenate(resid), rtol=1e-13, atol=1e-15)
+    rms, emax = op.errors(model)
+    np.testing.assert_allclose(rms, [np.sqrt(np.mean(r**2)) for r in resid], rtol=1e-12)
+    np.testing.assert_allclose(emax, [np.abs(r).max() for r in resid], rtol=1e-12)
+    assert op.matches(grids) and not op.matches(grids[:-1])
+    assert not op.matches(grids[:-1] + [grids[-1] + 1e-9])
@@ -0,0 +1,80 @@
+import threading
+
+import matplotlib
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+
+from calibratinator.scheduler import PreviewUpdates, UpdateScheduler
+
+
+def test_latest_state_wins():
+    started, release = threading.Event(), threading.Event()
+    computed, applied = [], []
+
+    def compute(state, cancelled):
+        computed.append(state)
+        if state == 0:                                  # hold the worker while more states arrive
+            started.set()
+            release.wait(5.)
+        return state, cancelled()
+
+    s   = UpdateScheduler(compute, applied.append)
+    s.submit(0)
+    assert started.wait(5.)
+    for state in (1, 2, 3):
+        s.submit(state)
+    assert s.depth == 4
+    release.set()
+    assert s.wait(5.)
+    assert computed == [0, 3]                           # 1 and 2 were replaced while waiting
+    assert applied == [(3, False)]                      # 0 finished stale: never applied
+    assert s.depth == 0 and not s.poll()
+    s.close()
+
+
+def test_wait_applies_pending_state():
+    applied = []
+    s   = UpdateScheduler(lambda state, cancelled: 2*state, applied.append)
+    s.submit(21)
+    assert s.wait(5.) and applied == [42]
+    assert not s.wait(5.)                               # nothing new
+    s.close()
+
+
+def test_inline_and_draw():
+    applied, draws = [], []
+    s   = UpdateScheduler(lambda state, cancelled: state, applied.append, threaded=False,
+                          draw=lambda: draws.append(len(applied)))
+    s.submit('a')
+    s.submit('b')
+    assert applied == ['a', 'b'] and draws == [1, 2]    # one draw per applied result
+    assert not s.poll() and draws == [1, 2]             # nothing new: no draw
+
+
+def test_preview_then_refine():
+    fig     = plt.figure()
+    applied = []
+    s       = UpdateScheduler(lambda state, cancelled: state, applied.append, threaded=False)
+    p       = PreviewUpdates(s, fig, idle=60.)
+    for k in range(3):
+        p.submit(k)                                     # a drag: coarse states only
+    assert applied == [(0, True), (1, True), (2, True)]
+    assert p.refine() and applied[-1] == (2, False)     # then the newest at full resolution
+    assert not p.refine() and len(applied) == 4         # once
+    p.submit(3)
+    fig.canvas.callbacks.process('button_release_event',
+                                 MouseEvent('button_release_event', fig.canvas, 0, 0, button=1))
+    assert applied[-2:] == [(3, True), (3, False)]      # releasing the mouse refines
+    plt.close(fig)
+
+
+def test_preview_disabled():
+    fig     = plt.figure()
+    applied = []
+    s       = UpdateScheduler(lambda state, cancelled: state, applied.append, threaded=False)
+    p       = PreviewUpdates(s, fig, enabled=False)
+    p.submit('a')
+    assert applied == [('a', False)] and not p.refine()
+    plt.close(fig)
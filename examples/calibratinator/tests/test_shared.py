@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+
+from calibratinator.parallel import worker_pool
+from calibratinator.shared import SharedSlots
+
+LAYOUT  = {'a': ((64, 1024), 'f8'), 'n': ((), 'i8')}
+_worker = {}
+
+
+def _attach(slots):
+    _worker['slots'] = slots
+
+
+def _write(slot, k):
+    frame   = _worker['slots'][slot]
+    for row in frame['a']:              # row by row: a reader inside the slot would see a mix
+        row[:] = k
+    frame['n'][...] = k
+    return slot
+
+
+def test_frames_cross_a_worker_whole():
+    slots   = SharedSlots(LAYOUT)
+    seen, torn = [], []
+    done    = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            frame = slots.read(int(slots.header[0]))
+            if frame is None: continue
+            k = int(frame['n'])
+            if not (frame['a'] == k).all(): torn.append(k)
+            seen.append(k)
+
+    with worker_pool(1, initializer=_attach, initargs=(slots,)) as pool:
+        t = threading.Thread(target=reader)
+        t.start()
+        for k in range(1, 101):
+            slot = slots.acquire()
+            assert slot not in (slots.header[0], slots.header[1])
+            assert pool.submit(_write, slot, k).result() == slot
+            slots.publish(slot)
+        done.set()
+        t.join()
+    assert not torn and seen and np.all(np.diff(seen) >= 0)
+    frame   = slots.read(int(slots.header[0]))
+    assert int(frame['n']) == 100 and (frame['a'] == 100).all()
+    assert slots.header[2 + int(slots.header[0])] == slots.generation == 100
+    del frame
+    slots.close()
+
+
+def test_writer_skips_published_and_read_slots():
+    slots   = SharedSlots(LAYOUT, shared=False)
+    a       = slots.acquire()
+    slots.publish(a)
+    assert slots.read(a) is not None                    # the reader holds a
+    b       = slots.acquire()
+    assert b != a
+    slots.publish(b)
+    assert slots.acquire() not in (a, b)                # a is being read, b is the newest
+    assert slots.read(a) is None                        # a is stale now
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from calibratinator.jc import stress_JC
+from calibratinator.props import JC_PROPS
+from calibratinator.sweep import grid_samples, lhs_samples, sweep_JC
+
+RATE    = np.array([1e-3, 1., 2e3])
+TEMP    = np.array([295., 500., 800.])
+
+
+@pytest.fixture
+def tests(jc_props):
+    e       = [np.linspace(.002, .25, n) for n in (40, 25, 60)]    # ragged sets
+    s       = [stress_JC(ei, r, t, *(jc_props[name] for name in JC_PROPS)) + 5e6*np.sin(40*ei)
+               for ei, r, t in zip(e, RATE, TEMP)]
+    return e, s
+
+
+def collect(chunks):
+    starts, errors = zip(*chunks)
+    return starts, np.concatenate(errors)
+
+
+def test_chunked_matches_unchunked(jc_props, tests):
+    e, s    = tests
+    names   = ['A', 'n', 'm']
+    p       = np.array([jc_props[name] for name in names])
+    samples = lhs_samples(.8*p, 1.2*p, 23, seed=0)
+    points  = sum(len(ei) for ei in e)
+    starts, chunked = collect(sweep_JC(e, s, RATE, TEMP, jc_props, names, samples,
+                                       max_bytes=4*8*points*5))              # 5 rows per chunk
+    assert starts == (0, 5, 10, 15, 20)
+    _, whole = collect(sweep_JC(e, s, RATE, TEMP, jc_props, names, samples))
+    assert chunked.shape == whole.shape == (23, len(e) + 1)
+    np.testing.assert_array_equal(chunked, whole)
+    # one sample by hand
+    props   = dict(jc_props, **dict(zip(names, samples[7])))
+    r       = [si - stress_JC(ei, er, t, *(props[name] for name in JC_PROPS))
+               for ei, si, er, t in zip(e, s, RATE, TEMP)]
+    expect  = [np.sqrt(np.mean(ri**2)) for ri in r] + [np.sqrt(np.mean(np.concatenate(r)**2))]
+    np.testing.assert_allclose(chunked[7], expect, rtol=1e-12)
+
+
+def test_samples():
+    g       = grid_samples([0., 10.], [1., 20.], [3, 2])
+    np.testing.assert_array_equal(g, [[0, 10], [0, 20], [.5, 10], [.5, 20], [1, 10], [1, 20]])
+    lhs     = lhs_samples([0., -1.], [1., 1.], 10, seed=1)
+    for k, (lo, hi) in enumerate([(0., 1.), (-1., 1.)]):
+        strata  = np.floor((lhs[:, k] - lo)/(hi - lo)*10)
+        np.testing.assert_array_equal(np.sort(strata), np.arange(10))   # each stratum once